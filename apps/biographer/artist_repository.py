@@ -0,0 +1,111 @@
+"""
+Acceso de solo lectura a la colección `artists` para los scripts por lotes.
+
+Cada caso de uso pide únicamente los campos que necesita (proyección) y lee el
+cursor en lotes de ARTIST_CURSOR_BATCH_SIZE documentos (por defecto 1000). Los
+documentos se convierten al vuelo en `ArtistRecord`, una clase con
+`__slots__` que ocupa bastante menos memoria que el dict del documento, así
+que el script nunca tiene a la vez en memoria todos los documentos completos.
+
+Los atributos de `ArtistRecord` que no se han proyectado valen None y se
+pueden asignar (p. ej. `artist.seo_sentence = ...` tras generarla).
+
+Los artistas pendientes de perfil, de corrección o de completar no se leen con una consulta
+sino que se reclaman de una cola con leases (job_queue.py), para que varios
+procesos puedan trabajar a la vez sin repetir artistas.
+"""
+import os
+import popularity
+from job_queue import JobQueue
+
+# Atributo del registro -> campo del documento en MongoDB
+FIELD_PATHS = {
+    "id": "_id",
+    "name": "name",
+    "event_count": "eventCount",
+    "popularity_tier": "popularityTier",
+    "profile_status": "profileStatus",
+    "profile_page_url": "profilePageUrl",
+    "image_url": "meta.main_artist_image_url",
+    "short_bio": "short_bio",
+    "seo_sentence": "seo_sentence",
+    "seo_sentence_hash": "seo_sentence_hash",
+}
+
+# Campos de cada caso de uso (`id` se incluye siempre)
+PENDING_FIELDS = ("name", "event_count")
+INDEX_FIELDS = (
+    "name", "profile_status", "profile_page_url", "image_url",
+    "event_count", "popularity_tier", "seo_sentence", "seo_sentence_hash",
+)
+BACKFILL_FIELDS = ("name", "profile_page_url", "short_bio", "image_url")
+
+class ArtistRecord:
+    """Fila compacta de un artista con los campos proyectados."""
+    __slots__ = tuple(FIELD_PATHS)
+
+    def __init__(self, **values):
+        for attribute in self.__slots__:
+            setattr(self, attribute, values.get(attribute))
+
+    @classmethod
+    def from_document(cls, document, fields):
+        record = cls(id=document["_id"])
+        for attribute in fields:
+            value = document
+            for key in FIELD_PATHS[attribute].split('.'):
+                value = value.get(key) if isinstance(value, dict) else None
+            setattr(record, attribute, value)
+        return record
+
+    def __repr__(self):
+        return f"ArtistRecord(id={self.id!r}, name={self.name!r})"
+
+def projection(fields):
+    """Proyección de MongoDB para los atributos `fields`."""
+    return {FIELD_PATHS[attribute]: 1 for attribute in fields}
+
+def iter_artists(collection, query, fields, sort=None, limit=0, batch_size=None):
+    """Recorre los artistas de `query` como `ArtistRecord`, leyendo el cursor por lotes."""
+    batch_size = batch_size or int(os.getenv("ARTIST_CURSOR_BATCH_SIZE", "1000"))
+    cursor = collection.find(query, projection(fields), batch_size=batch_size, limit=limit)
+    if sort:
+        cursor = cursor.sort(sort)
+    for document in cursor:
+        yield ArtistRecord.from_document(document, fields)
+
+def profile_queue(collection):
+    """Cola de artistas sin página de perfil, de más a menos eventos (biographer.py)."""
+    return JobQueue(collection, "profile", {"hasProfilePage": {"$ne": True}}, sort=[("eventCount", -1)])
+
+def correction_queue(collection):
+    """Cola de artistas con página pero sin estado de perfil, de más a menos eventos (corrector_biografias.py)."""
+    return JobQueue(collection, "correction", {"hasProfilePage": True, "profileStatus": {"$exists": False}},
+                    sort=[("eventCount", -1)])
+
+def enrichment_queue(collection):
+    """
+    Cola de perfiles publicados a los que les faltan vídeos o imagen por falta de
+    cuota (`quotaSkipped`), de más a menos eventos (biographer.py).
+    """
+    return JobQueue(collection, "enrichment", {"hasProfilePage": True, "quotaSkipped.0": {"$exists": True}},
+                    sort=[("eventCount", -1)])
+
+def claim_artists(queue, limit, fields):
+    """Reserva hasta `limit` artistas de `queue` y los devuelve como `ArtistRecord`."""
+    return [ArtistRecord.from_document(document, fields) for document in queue.claim_many(limit, projection(fields))]
+
+def find_index_artists(collection):
+    """Artistas con página de perfil, de más a menos eventos (índice de artistas)."""
+    return list(iter_artists(collection, popularity.PROFILE_QUERY, INDEX_FIELDS, sort=[("eventCount", -1)]))
+
+def find_artists_missing_bio(collection):
+    """Perfiles completos a los que les falta la bio corta o la imagen (backfill_short_bios.py)."""
+    query = {
+        "profileStatus": "complete",
+        "$or": [
+            {"short_bio": {"$exists": False}},
+            {"meta.main_artist_image_url": {"$exists": False}}
+        ]
+    }
+    return list(iter_artists(collection, query, BACKFILL_FIELDS))
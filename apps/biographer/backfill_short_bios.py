@@ -1,18 +1,24 @@
 import os
 import sys
-import time
 import re
+import argparse
 from dotenv import load_dotenv
 import pymongo
-import requests
+from pymongo import UpdateOne
+import http_client
+import wordpress_api
 from bs4 import BeautifulSoup
 from pathlib import Path
+import gemini_client
+from bulk_writer import BulkWriter
+import artist_repository
+from quota_ledger import QuotaLedger
 
 # Carga las variables de entorno
 env_path = Path(__file__).parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
-def get_config():
+def get_config(generate_missing=False):
     """Carga la configuración desde las variables de entorno."""
     config = {
         "MONGO_URI": os.getenv("MONGO_URI"),
@@ -28,20 +34,27 @@ def get_config():
             
     if config["WP_URL"]:
         config["WP_URL"] = config["WP_URL"].rstrip('/')
+
+    # Solo con --generate-missing: las bios cortas que no estén en WordPress se generan con Gemini
+    if generate_missing:
+        config["GEMINI_API_KEY"] = os.getenv("GEMINI_API_KEY")
+        if not config["GEMINI_API_KEY"]:
+            print("Error: --generate-missing necesita la variable de entorno GEMINI_API_KEY.")
+            sys.exit(1)
         
     return config
 
+def parse_args():
+    """Lee los argumentos de línea de comandos."""
+    parser = argparse.ArgumentParser(description="Rellena la bio corta y la imagen de los artistas desde sus páginas de WordPress.")
+    parser.add_argument("--generate-missing", action="store_true",
+                        help="Genera con Gemini (gasta cuota) las bios cortas que no estén en WordPress.")
+    return parser.parse_args()
+
 def get_artists_to_update(db):
     """Obtiene artistas con perfil completo a los que les falta la bio corta o la imagen."""
     print("Buscando artistas para actualizar...")
-    query = {
-        "profileStatus": "complete",
-        "$or": [
-            {"short_bio": {"$exists": False}},
-            {"meta.main_artist_image_url": {"$exists": False}}
-        ]
-    }
-    artists = list(db.artists.find(query))
+    artists = artist_repository.find_artists_missing_bio(db.artists)
     print(f"Se encontraron {len(artists)} artistas para actualizar.")
     return artists
 
@@ -52,54 +65,64 @@ def extract_slug_from_url(url):
     except:
         return None
 
-def extract_info_from_api(slug, artist_name, config):
-    """Extrae la bio corta y la URL de la imagen usando la API REST de WordPress."""
-    wp_api_url = f"{config['WP_URL']}/wp-json/wp/v2/pages"
-    auth = (config['WP_USER'], config['WP_PASSWORD'])
-    params = {'slug': slug}
-    
+def extract_info_from_page(page, artist_name):
+    """Extrae la bio corta y la URL de la imagen del contenido de una página de WordPress."""
+    content_html = page.get('content', {}).get('rendered', '')
+    if not content_html:
+        return None
     try:
-        response = requests.get(wp_api_url, auth=auth, params=params, timeout=30)
-        response.raise_for_status()
-        pages = response.json()
-        
-        if pages:
-            content_html = pages[0].get('content', {}).get('rendered', '')
-            if content_html:
-                soup = BeautifulSoup(content_html, 'html.parser')
-                
-                # Extract short bio
-                short_bio = None
-                h2_artist = soup.find('h2', string=re.compile(artist_name, re.IGNORECASE))
-                if h2_artist:
-                    p_tag = h2_artist.find_next_sibling('p')
-                    if p_tag and p_tag.text:
-                        short_bio = p_tag.text.strip()
-
-                # Extract image url
-                main_image_url = None
-                img_tag = soup.find('img')
-                if img_tag and img_tag.has_attr('src'):
-                    main_image_url = img_tag['src']
-                
-                return {"short_bio": short_bio, "main_image_url": main_image_url}
-                        
-    except requests.exceptions.RequestException as e:
-        print(f"  - Error al llamar a la API de WordPress para el slug '{slug}': {e}")
+        soup = BeautifulSoup(content_html, 'html.parser')
+
+        # Extract short bio
+        short_bio = None
+        h2_artist = soup.find('h2', string=re.compile(re.escape(artist_name), re.IGNORECASE))
+        if h2_artist:
+            p_tag = h2_artist.find_next_sibling('p')
+            if p_tag and p_tag.text:
+                short_bio = p_tag.text.strip()
+
+        # Extract image url
+        main_image_url = None
+        img_tag = soup.find('img')
+        if img_tag and img_tag.has_attr('src'):
+            main_image_url = img_tag['src']
+
+        return {"short_bio": short_bio, "main_image_url": main_image_url}
     except Exception as e:
-        print(f"  - Error al procesar la respuesta de la API para el slug '{slug}': {e}")
-        
+        print(f"  - Error al procesar el contenido de la página '{page.get('slug')}': {e}")
     return None
 
+def generate_short_biography(artist_name, model):
+    """Genera una biografía corta de una frase (reintento individual de los lotes)."""
+    print(f"Generando biografía CORTA para {artist_name}...")
+    prompt = f"Resume la carrera del artista flamenco {artist_name} en una sola frase impactante y concisa de no más de 25 palabras."
+    try:
+        return gemini_client.generate_text(model, prompt).strip()
+    except Exception as e:
+        print(f"  - Error al generar la biografía corta de {artist_name}: {e}")
+        return None
+
+def generate_missing_short_bios(artists, config):
+    """Genera por lotes con Gemini las bios cortas que no se han podido extraer de WordPress."""
+    model = gemini_client.get_model(config['GEMINI_API_KEY'])
+    instruction = "Para cada artista flamenco de la lista, resume su carrera en una sola frase impactante y concisa de no más de 25 palabras."
+    return gemini_client.generate_batch(
+        model, [artist.name for artist in artists], instruction,
+        fallback=lambda name: generate_short_biography(name, model)
+    )
+
 def main():
     """Flujo principal del script."""
+    args = parse_args()
     print("--- Iniciando script para rellenar datos de artistas (vía API) ---")
-    config = get_config()
+    config = get_config(args.generate_missing)
     
     try:
         client = pymongo.MongoClient(config['MONGO_URI'])
         db = client[config['DB_NAME']]
         artists_collection = db["artists"]
+        # Solo registra el gasto en el presupuesto diario compartido (quota_ledger.py)
+        QuotaLedger(db).install()
         print("Conectado a MongoDB.")
     except pymongo.errors.ConnectionFailure as e:
         print(f"Error de conexión a MongoDB: {e}")
@@ -112,11 +135,20 @@ def main():
         client.close()
         return
 
+    # Una sola pasada por lotes a la API en lugar de una petición (y una pausa) por artista
+    slugs = {
+        artist.id: extract_slug_from_url(artist.profile_page_url)
+        for artist in artists_to_update if artist.profile_page_url
+    }
+    pages_by_slug = wordpress_api.fetch_pages_by_slugs(config, slugs.values())
+
     updated_count = 0
+    still_missing_bio = []
+    writer = BulkWriter(artists_collection)
     for artist in artists_to_update:
-        artist_name = artist.get("name", "ID Desconocido")
-        artist_id = artist["_id"]
-        profile_url = artist.get("profilePageUrl")
+        artist_name = artist.name or "ID Desconocido"
+        artist_id = artist.id
+        profile_url = artist.profile_page_url
         
         if not profile_url:
             print(f"  - El artista {artist_name} no tiene URL de perfil. Saltando.")
@@ -124,38 +156,55 @@ def main():
 
         print(f"\nProcesando a: {artist_name}...")
         
-        slug = extract_slug_from_url(profile_url)
+        slug = slugs.get(artist_id)
         
         if not slug:
             print(f"  - No se pudo extraer el slug de la URL: {profile_url}")
             continue
             
-        extracted_info = extract_info_from_api(slug, artist_name, config)
+        page = pages_by_slug.get(slug)
+        extracted_info = extract_info_from_page(page, artist_name) if page else None
         
         if extracted_info:
             update_set = {}
-            if extracted_info["short_bio"] and not artist.get("short_bio"):
+            if extracted_info["short_bio"] and not artist.short_bio:
                 update_set["short_bio"] = extracted_info["short_bio"]
                 print(f"  - Biografía corta encontrada: \"{extracted_info['short_bio']}\"" )
+            elif not artist.short_bio:
+                still_missing_bio.append(artist)
 
-            if extracted_info["main_image_url"] and not artist.get("meta", {}).get("main_artist_image_url"):
+            if extracted_info["main_image_url"] and not artist.image_url:
                 update_set["meta"] = {"main_artist_image_url": extracted_info["main_image_url"]}
                 print(f"  - Imagen encontrada: {extracted_info['main_image_url']}")
 
             if update_set:
-                artists_collection.update_one(
+                writer.add(UpdateOne(
                     {"_id": artist_id},
                     {"$set": update_set}
-                )
-                print(f"  -> Base de datos actualizada para {artist_name}.")
+                ))
+                print(f"  -> Actualización encolada para {artist_name}.")
                 updated_count += 1
             else:
                 print("  - Los datos ya estaban presentes en la base de datos.")
         else:
             print("  - No se pudo encontrar información en la página (vía API).")
-            
-        time.sleep(0.5) # Pausa breve para no saturar la API
+            if not artist.short_bio:
+                still_missing_bio.append(artist)
+
+    if still_missing_bio and not args.generate_missing:
+        print(f"\n{len(still_missing_bio)} artistas siguen sin biografía corta (usa --generate-missing para generarlas con Gemini).")
+    elif still_missing_bio:
+        print(f"\nGenerando con Gemini {len(still_missing_bio)} biografías cortas que no estaban en WordPress...")
+        generated = generate_missing_short_bios(still_missing_bio, config)
+        for artist in still_missing_bio:
+            short_bio = generated.get(artist.name)
+            if short_bio:
+                writer.add(UpdateOne({"_id": artist.id}, {"$set": {"short_bio": short_bio}}))
+        print(f"  -> {len(generated)} biografías cortas generadas.")
 
+    writer.close()
+    writer.print_stats()
+    http_client.print_stats()
     print(f"\n--- Proceso Finalizado ---")
     print(f"Se han actualizado {updated_count} de {len(artists_to_update)} artistas.")
     
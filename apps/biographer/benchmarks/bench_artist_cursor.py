@@ -0,0 +1,94 @@
+"""
+Mide la memoria máxima (RSS) de cargar los artistas del índice sobre una
+colección sintética de 100.000 artistas (por defecto) en un mongod local:
+
+- documentos: `list(find(query))` con los documentos completos (como antes).
+- proyección: la misma consulta con la proyección del índice, como dicts.
+- registros: `artist_repository.find_index_artists` (proyección + ArtistRecord).
+
+Cada modo se ejecuta en un proceso aparte para que el pico de memoria de uno no
+afecte a los demás. La colección se crea en la base BENCH_DB_NAME (por defecto
+"bench_artist_cursor") de MONGO_URI (por defecto mongodb://localhost:27017) y
+solo se vuelve a rellenar si no tiene el número de artistas pedido.
+
+Uso: python apps/biographer/benchmarks/bench_artist_cursor.py [num_artistas]
+"""
+import os
+import sys
+import time
+import random
+import resource
+import subprocess
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import pymongo
+import artist_repository
+import popularity
+
+MODES = ("documentos", "proyección", "registros")
+
+def get_collection():
+    client = pymongo.MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    return client[os.getenv("BENCH_DB_NAME", "bench_artist_cursor")]["artists"]
+
+def make_artist(i):
+    """Documento con el tamaño aproximado de un perfil completo real."""
+    return {
+        "name": f"Artista {i}",
+        "eventCount": random.randint(0, 200),
+        "popularityTier": random.randint(0, 3),
+        "hasProfilePage": True,
+        "profilePageUrl": f"https://afland.es/artista-{i}/",
+        "profileStatus": "complete",
+        "wpPageId": 100000 + i,
+        "short_bio": f"Artista {i} es una de las voces más personales del flamenco actual. " * 2,
+        "seo_sentence": f"Descubre la trayectoria de Artista {i}, una de las voces del flamenco actual.",
+        "seo_sentence_hash": "%064x" % random.getrandbits(256),
+        "long_bio_html": f"<p>Biografía de Artista {i}.</p>" + "<p>" + "Flamenco y compás. " * 150 + "</p>",
+        "video_urls": [f"https://www.youtube.com/watch?v={i:011d}"] * 3,
+        "meta": {"main_artist_image_url": f"https://afland.es/wp-content/uploads/artista-{i}.jpg"},
+    }
+
+def seed(collection, count):
+    if collection.count_documents({}) == count:
+        return
+    print(f"Creando {count} artistas sintéticos...")
+    collection.drop()
+    for start in range(0, count, 5000):
+        collection.insert_many([make_artist(i) for i in range(start, min(start + 5000, count))])
+    collection.create_index([("hasProfilePage", 1), ("eventCount", -1)])
+
+def peak_rss_mb():
+    # En Linux ru_maxrss viene en KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_mode(mode):
+    """Carga los artistas con `mode` y devuelve (filas, segundos, RSS base, RSS máximo)."""
+    collection = get_collection()
+    collection.find_one()  # conexión abierta antes de medir la base
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "documentos":
+        artists = list(collection.find(popularity.PROFILE_QUERY).sort("eventCount", -1))
+    elif mode == "proyección":
+        fields = artist_repository.projection(artist_repository.INDEX_FIELDS)
+        artists = list(collection.find(popularity.PROFILE_QUERY, fields).sort("eventCount", -1))
+    else:
+        artists = artist_repository.find_index_artists(collection)
+    return len(artists), time.perf_counter() - start, baseline, peak_rss_mb()
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--mode":
+        rows, elapsed, baseline, peak = run_mode(sys.argv[2])
+        print(f"{sys.argv[2]:>12} {rows:>8} {elapsed:>8.2f}s {baseline:>9.1f}MB {peak:>9.1f}MB {peak - baseline:>9.1f}MB")
+        return
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    seed(get_collection(), count)
+    print(f"{'modo':>12} {'filas':>8} {'tiempo':>9} {'RSS base':>11} {'RSS máx':>11} {'aumento':>11}")
+    for mode in MODES:
+        subprocess.run([sys.executable, __file__, "--mode", mode], check=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Compara el coste de preparar una búsqueda de YouTube / Custom Search construyendo
+el cliente con `build()` en cada llamada (comportamiento anterior) frente a
+reutilizar el cliente de `google_clients`.
+
+No hace peticiones de red: solo mide construir el servicio y preparar la
+petición, que es la sobrecarga que se paga antes de cada búsqueda.
+
+Uso: python apps/biographer/benchmarks/bench_google_clients.py [iteraciones]
+"""
+import sys
+import time
+from pathlib import Path
+from googleapiclient.discovery import build
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import google_clients
+
+API_KEY = "benchmark-key"
+
+def prepare_requests(youtube, customsearch):
+    youtube.search().list(q="Camarón en directo", part='snippet', type='video', maxResults=3)
+    customsearch.cse().list(q="Camarón flamenco retrato", cx="cx", searchType='image', num=1)
+
+def bench_build_per_call(iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        youtube = build('youtube', 'v3', developerKey=API_KEY)
+        customsearch = build("customsearch", "v1", developerKey=API_KEY)
+        prepare_requests(youtube, customsearch)
+    return time.perf_counter() - start
+
+def bench_cached_clients(iterations):
+    start = time.perf_counter()
+    first_call = None
+    for _ in range(iterations):
+        prepare_requests(google_clients.youtube(API_KEY), google_clients.custom_search(API_KEY))
+        if first_call is None:
+            first_call = time.perf_counter() - start
+    return time.perf_counter() - start, first_call
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    per_call = bench_build_per_call(iterations)
+    cached_total, cached_first = bench_cached_clients(iterations)
+    print(f"Iteraciones: {iterations}")
+    print(f"build() en cada llamada: {per_call * 1000:.1f} ms en total, {per_call * 1000 / iterations:.2f} ms por búsqueda")
+    print(f"Clientes reutilizados:   {cached_total * 1000:.1f} ms en total "
+          f"(arranque {cached_first * 1000:.1f} ms, después {(cached_total - cached_first) * 1000 / max(1, iterations - 1):.2f} ms por búsqueda)")
+
+if __name__ == "__main__":
+    main()
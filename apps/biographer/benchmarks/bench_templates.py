@@ -0,0 +1,71 @@
+"""
+Mide el tiempo de renderizar el índice de artistas con `templates` (una f-string
+por tarjeta y un único `"".join`) para tamaños crecientes de catálogo (hasta
+10.000 artistas por defecto) y lo compara con la construcción anterior, que
+concatenaba cada tarjeta con `cards_html +=`.
+
+Si el renderizado es lineal, el tiempo por artista se mantiene constante al
+crecer el catálogo.
+
+Uso: python apps/biographer/benchmarks/bench_templates.py [max_artistas]
+"""
+import gc
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import templates
+
+def make_cards(count):
+    return [
+        {
+            "artist_name": f"Artista {i}",
+            "profile_url": f"https://afland.es/artista-{i}/",
+            "image_url": f"https://afland.es/wp-content/uploads/artista-{i}.jpg",
+            "short_bio": f"Descubre la trayectoria de Artista {i}, una de las voces del flamenco actual.",
+            "flames": "🔥" * (i % 4),
+        }
+        for i in range(count)
+    ]
+
+def render_concatenating(cards):
+    """Construcción anterior: una f-string por tarjeta concatenada con +=."""
+    cards_html = ""
+    for card in cards:
+        cards_html += f"""
+        <div class="artist-card">
+            <img src="{card['image_url']}" alt="Imagen de {card['artist_name']}" class="artist-card-image">
+            <div class="artist-card-flames">{card['flames']}</div>
+            <div class="artist-card-content">
+                <h3 class="artist-card-title">{card['artist_name']}</h3>
+                <p class="artist-card-bio">{card['short_bio']}</p>
+                <a href="{card['profile_url']}" class="artist-card-button">Ver Biografía Completa</a>
+            </div>
+        </div>
+        """
+    return f"{templates.INDEX_STYLES}<div class='artist-grid'>{cards_html}</div>"
+
+def best_of(function, cards, repeat=5):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        html = function(cards)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(html)
+
+def main():
+    max_artists = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    sizes = [max_artists // 8, max_artists // 4, max_artists // 2, max_artists]
+    print(f"{'artistas':>9} {'templates':>12} {'µs/artista':>11} {'+= (antes)':>12} {'µs/artista':>11} {'HTML':>10}")
+    for size in sizes:
+        cards = make_cards(size)
+        rendered, length = best_of(templates.render_artist_index, cards)
+        concatenated, _ = best_of(render_concatenating, cards)
+        print(f"{size:>9} {rendered * 1000:>10.1f}ms {rendered * 1e6 / size:>11.2f} "
+              f"{concatenated * 1000:>10.1f}ms {concatenated * 1e6 / size:>11.2f} {length / 1e6:>8.1f}MB")
+
+if __name__ == "__main__":
+    main()
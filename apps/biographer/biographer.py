@@ -1,14 +1,26 @@
 import os
 import sys
-import time
-import json
 import datetime
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from dotenv import load_dotenv
 import pymongo
-import requests
-import google.generativeai as genai
-from googleapiclient.discovery import build
+from pymongo import UpdateOne, UpdateMany
+import wordpress_api
+import http_client
+import google_clients
+import image_search
+import rate_limiter
+import gemini_client
+import disk_cache
+import templates
+from bulk_writer import BulkWriter
+import artist_repository
+import rerender_profiles
+from page_catalog import PageCatalog
+from publish_state import PublishState
+from quota_ledger import QuotaLedger
 
 # Carga las variables de entorno desde la carpeta del script
 env_path = Path(__file__).parent / '.env'
@@ -37,244 +49,327 @@ def get_config():
         
     return config
 
-def clean_gemini_response(text):
-    """Limpia los caracteres extraños y marcadores de código de la respuesta de Gemini."""
-    text = text.replace('```json', '').replace('```', '').strip()
-    cleaned_text = text.replace('«`html', '').replace('`»', '').strip()
-    cleaned_text = cleaned_text.replace('```html', '').replace('```', '').strip()
-    return cleaned_text
-
-def verify_artist_existence(artist_name, api_key):
-    """Verifica con Gemini si existe información pública sobre un artista."""
-    print(f"Verificando existencia de información para {artist_name}...")
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    prompt = f"Basándote en tu conocimiento público, ¿existe información verificable y suficiente para escribir una biografía detallada sobre un/a artista de flamenco llamado/a '{artist_name}'? Responde únicamente con un objeto JSON con dos claves: 'artistExists' (true o false) y 'confidence' ('high', 'medium', o 'low')."
-    response = model.generate_content(prompt)
-    
+# Esquema de la respuesta única de Gemini con el perfil completo del artista.
+ARTIST_PROFILE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "artistExists": {"type": "boolean"},
+        "confidence": {"type": "string"},
+        "long_bio_html": {"type": "string"},
+        "short_bio": {"type": "string"},
+        "image_queries": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["artistExists", "confidence", "long_bio_html", "short_bio", "image_queries"],
+}
+
+def is_valid_artist_profile(data):
+    """Un perfil es válido si, cuando el artista existe, trae las dos biografías."""
+    if not isinstance(data, dict) or not isinstance(data.get("artistExists"), bool):
+        return False
+    if data["artistExists"]:
+        return bool(data.get("long_bio_html", "").strip()) and bool(data.get("short_bio", "").strip())
+    return True
+
+def generate_artist_profile(artist_name, api_key):
+    """
+    Obtiene con una sola llamada a Gemini (salida JSON con esquema) la verificación
+    de existencia, la biografía larga en HTML, la biografía corta y las consultas
+    de búsqueda de imágenes del artista.
+    """
+    print(f"Generando perfil completo con Gemini para {artist_name}...")
+    model = gemini_client.get_model(api_key)
+    prompt = f"""Actúa como un periodista musical y biógrafo experto en flamenco. Primero evalúa si, basándote en tu conocimiento público, existe información verificable y suficiente para escribir una biografía detallada sobre un/a artista de flamenco llamado/a '{artist_name}'.
+Devuelve un objeto JSON con estas claves:
+- "artistExists": true o false según esa evaluación.
+- "confidence": 'high', 'medium' o 'low'.
+- "long_bio_html": si artistExists es true, una biografía detallada y factual en HTML. Estructúrala usando subtítulos <h2> para las secciones clave, como 'Inicios y Formación', 'Estilo e Influencias', 'Trayectoria y Colaboraciones' y 'Discografía o Espectáculos Relevantes'. Incluye únicamente el HTML de los párrafos y los subtítulos. No utilices frases genéricas o de relleno, céntrate solo en información verificable y no incluyas frases al final invitando a visitar redes sociales. Si artistExists es false, una cadena vacía.
+- "short_bio": si artistExists es true, un resumen de su carrera en una sola frase impactante y concisa de no más de 25 palabras. Si es false, una cadena vacía.
+- "image_queries": una lista de 5 prompts de búsqueda para Google Images que maximicen la probabilidad de encontrar una imagen de retrato de alta calidad, artística y profesional del artista (por ejemplo, "{artist_name} primer plano blanco y negro")."""
     try:
-        # Limpiar y parsear la respuesta JSON
-        cleaned_response = clean_gemini_response(response.text)
-        data = json.loads(cleaned_response)
-        print(f"Verificación completada: {data}")
-        return data
-    except (json.JSONDecodeError, KeyError) as e:
-        print(f"Error al decodificar la respuesta de verificación de Gemini: {e}")
-        print(f"Respuesta recibida: {response.text}")
-        return {"artistExists": False, "confidence": "low"} # Fallback seguro
-
-def generate_long_biography(artist_name, api_key):
-    """Genera una biografía larga y estructurada usando Gemini."""
-    print(f"Generando biografía LARGA para {artist_name}..." )
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    prompt = f"""Actúa como un periodista musical y biógrafo experto en flamenco. Tu tarea es investigar en tu base de conocimiento y escribir una biografía detallada y factual sobre el artista {artist_name}.
-REGLA DE ESTRUCTURA CRÍTICA: Tu respuesta debe ser un bloque de código HTML. Estructura la biografía usando subtítulos <h2> para las secciones clave. Utiliza subtítulos como 'Inicios y Formación', 'Estilo e Influencias', 'Trayectoria y Colaboraciones', y 'Discografía o Espectáculos Relevantes'.
-REGLA DE CONTENIDO CRÍTICA: No utilices frases genéricas o de relleno. Céntrate solo en información verificable y no incluyas frases al final invitando a visitar redes sociales.
-La salida debe ser únicamente el HTML de los párrafos y los subtítulos."""
-    response = model.generate_content(prompt)
-    return clean_gemini_response(response.text)
-
-def generate_short_biography(artist_name, api_key):
-    """Genera una biografía corta de una frase usando Gemini."""
-    print(f"Generando biografía CORTA para {artist_name}...")
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    prompt = f"Resume la carrera del artista flamenco {artist_name} en una sola frase impactante y concisa de no más de 25 palabras."
-    response = model.generate_content(prompt)
-    return clean_gemini_response(response.text)
+        profile = gemini_client.generate_json(model, prompt, ARTIST_PROFILE_SCHEMA, validate=is_valid_artist_profile)
+        print(f"Perfil generado: artistExists={profile['artistExists']}, confidence={profile.get('confidence')}")
+        return profile
+    except ValueError as e:
+        # Solo una respuesta que no es JSON o no cumple el esquema acaba en placeholder;
+        # los errores de la API se propagan para que el trabajo falle y se reintente
+        print(f"Respuesta de Gemini no válida para {artist_name}: {e}")
+        return {"artistExists": False, "confidence": "low", "long_bio_html": "", "short_bio": "", "image_queries": []}
 
 def find_youtube_videos(artist_name, api_key):
     """Busca videos de YouTube del artista."""
     print(f"Buscando vídeos de {artist_name} en YouTube...")
-    youtube = build('youtube', 'v3', developerKey=api_key)
+    youtube = google_clients.youtube(api_key)
     request = youtube.search().list(q=f"{artist_name} en directo", part='snippet', type='video', maxResults=3)
+    rate_limiter.acquire("youtube")
     response = request.execute()
     video_urls = [f"https://www.youtube.com/watch?v={item['id']['videoId']}" for item in response.get('items', [])]
     print(f"Se encontraron {len(video_urls)} vídeos.")
     return video_urls
 
-def generate_image_search_queries(artist_name, api_key):
-    """Usa Gemini para generar consultas de búsqueda de imágenes de alta calidad."""
-    print(f"Generando consultas de búsqueda de imágenes con IA para {artist_name}...")
-    try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        prompt = f"""
-        Eres un experto en búsqueda de imágenes. Para el artista flamenco '{artist_name}', genera una lista de 5 prompts de búsqueda para Google Images que maximicen la probabilidad de encontrar una imagen de retrato de alta calidad, artística y profesional.
-        Responde únicamente con un objeto JSON que contenga una clave "queries" con un array de strings.
-        Ejemplo de respuesta: {{"queries": ["{artist_name} primer plano blanco y negro", "{artist_name} actuando en directo con guitarra", "{artist_name} retrato artistico flamenco"]}}
-        """
-        response = model.generate_content(prompt)
-        data = json.loads(clean_gemini_response(response.text))
-        if "queries" in data and isinstance(data["queries"], list):
-            print(f"  ✅ Consultas generadas por IA: {data['queries']}")
-            return data["queries"]
-    except Exception as e:
-        print(f"  - Error al generar consultas con IA: {e}. Usando consultas por defecto.")
-    return None
-
-def find_main_image(artist_name, api_key, cx_id):
-    """Busca una imagen principal usando Google Custom Search con varias consultas."""
-    print(f"Buscando imagen principal para {artist_name} con consultas mejoradas...")
-    
-    # Primero, intenta generar queries con IA
-    search_queries = generate_image_search_queries(artist_name, os.getenv("GEMINI_API_KEY"))
-
-    # Si falla la IA o no devuelve nada, usa las de por defecto
-    if not search_queries:
-        search_queries = [
-        f"{artist_name} flamenco retrato primer plano",
-        f"{artist_name} actuando en directo",
-        f"{artist_name} flamenco"
-    ]
-    
-    service = build("customsearch", "v1", developerKey=api_key)
-    
-    for query in search_queries:
-        try:
-            print(f"  - Intentando con la consulta: '{query}'")
-            res = service.cse().list(q=query, cx=cx_id, searchType='image', num=1).execute()
-            if 'items' in res and len(res['items']) > 0:
-                image_url = res['items'][0]['link']
-                print(f"  ✅ Imagen encontrada con éxito.")
-                return image_url
-        except Exception as e:
-            print(f"    - Error en la consulta: {e}")
-            continue
-            
-    print("  - No se encontró ninguna imagen tras varios intentos.")
-    return None
-
-def create_wordpress_page(config, artist_name, short_bio, long_bio_html, main_image_url, video_urls):
-    """Publica una nueva página completa en WordPress."""
-    print("Construyendo contenido COMPLETO y publicando en WordPress...")
-    wp_api_url = f"{config['WP_URL']}/wp-json/wp/v2/pages"
-
-    videos_html = "<h2>Actuaciones Destacadas</h2>"
-    if video_urls:
-        for url in video_urls:
-            if "watch?v=" in url:
-                embed_url = url.replace("watch?v=", "embed/")
-                videos_html += f'''<div style="position: relative; padding-bottom: 56.25%; height: 0; overflow: hidden; margin-bottom: 1em;">
-<iframe src="{embed_url}" style="position: absolute; top: 0; left: 0; width: 100%; height: 100%;" frameborder="0" allowfullscreen></iframe>
-</div>'''
-
-    image_html = ""
-    if main_image_url:
-        image_html = f'''<div class="wp-block-column" style="flex-basis:33.33%"><figure class="wp-block-image size-large"><img src="{main_image_url}" alt="{artist_name}"/></figure></div>'''
-    
-    column_style = "66.66%" if main_image_url else "100%"
-    text_column_style = f"flex-basis:{column_style};"
-    if main_image_url:
-        text_column_style += " margin-left: 20px;"
-
-    gutenberg_content = f"""
-<style>
-h1.entry-title {{ color: #000000 !important; }}
-.artist-profile-content p {{color: #333333 !important;}}
-.artist-profile-content h2 {{color: #26145F !important;}}
-.artist-title-box {{ background-color: #26145F; border-radius: 15px; padding: 20px; margin-bottom: 20px; }}
-.artist-title-box h2 {{ color: #FFFFFF !important; }}
-.artist-title-box p {{ color: #FFFFFF !important; font-style:italic; font-weight:700; }}
-</style>
-<div class="wp-block-group artist-profile-content">
-  <div class="wp-block-columns">
-    {image_html}
-    <div class="wp-block-column" style="{text_column_style}">
-      <div class="artist-title-box">
-        <h2>{artist_name}</h2>
-        <p>{short_bio}</p>
-      </div>
-    </div>
-  </div>
-  <hr class="wp-block-separator has-alpha-channel-opacity"/>
-  {long_bio_html}
-  {videos_html}
-</div>
-"""
-    data = {
-        "title": artist_name, "status": "publish", "content": gutenberg_content,
+def plan_quota(ledger, artists):
+    """
+    Reserva la cuota de YouTube y Custom Search de cada artista, empezando por los
+    de más eventos. Si el presupuesto diario no alcanza para todos, los últimos se
+    quedan sin vídeos y/o sin búsqueda de imagen en lugar de fallar a mitad del lote.
+    """
+    max_image_queries = int(os.getenv("IMAGE_SEARCH_MAX_QUERIES", "5"))
+    budgets = {}
+    for artist in sorted(artists, key=lambda artist: artist.event_count or 0, reverse=True):
+        budgets[artist.id] = {
+            "youtube": ledger.reserve("youtube", ledger.cost("youtube")),
+            "custom_search": ledger.reserve("custom_search", max_image_queries, minimum=1),
+        }
+    return budgets
+
+def release_quota(ledger, budget):
+    """Devuelve las reservas de un artista ya procesado (su gasto real ya está en el ledger)."""
+    for api, units in budget.items():
+        ledger.release(api, units)
+
+def find_videos_within_budget(artist_name, config, budget, skipped):
+    """Vídeos de YouTube del artista, o ninguno si no le queda cuota."""
+    if not budget.get("youtube"):
+        print(f"Sin cuota de YouTube para {artist_name}: se omiten los vídeos.")
+        skipped.append("youtube")
+        return []
+    return find_youtube_videos(artist_name, config['GOOGLE_API_KEY'])
+
+def find_image_within_budget(artist_name, config, image_queries, budget, skipped):
+    """Imagen principal con como mucho las consultas reservadas, o None si no le queda cuota."""
+    max_queries = budget.get("custom_search", 0)
+    if not max_queries:
+        print(f"Sin cuota de Custom Search para {artist_name}: se omite la búsqueda de imagen.")
+        skipped.append("image_search")
+        return None
+    queries = (image_queries or image_search.default_search_queries(artist_name))[:max_queries]
+    return image_search.find_main_image(artist_name, config['GOOGLE_API_KEY'], config['CUSTOM_SEARCH_ENGINE_ID'], queries)
+
+def build_wordpress_page_data(artist_name, short_bio, long_bio_html, main_image_url, video_urls):
+    """Construye los datos de una nueva página completa de WordPress."""
+    print("Construyendo contenido COMPLETO para WordPress...")
+    return {
+        "title": artist_name, "status": "publish",
+        "content": templates.render_profile(artist_name, short_bio, long_bio_html, main_image_url, video_urls),
         "wf_page_folders": [40], "meta": {"main_artist_image_url": main_image_url or ""}
     }
-    
-    auth = (config['WP_USER'], config['WP_PASSWORD'])
-    try:
-        response = requests.post(wp_api_url, auth=auth, json=data, headers={"Content-Type": "application/json"}, timeout=30)
-        
-        if response.status_code == 201:
-            page_data = response.json()
-            print(f"¡Página para {artist_name} creada! URL: {page_data['link']}")
-            return page_data['link']
-        else:
-            print(f"Error al publicar en WordPress para {artist_name}: {response.status_code}")
-            print(response.text)
-            return None
-    except requests.exceptions.RequestException as e:
-        print(f"Error al publicar en WordPress: {e}")
-        return None
 
-def create_wordpress_placeholder_page(config, artist_name, main_image_url):
-    """Publica una página 'placeholder' en WordPress."""
-    print(f"Creando página PLACEHOLDER para {artist_name}...")
-    wp_api_url = f"{config['WP_URL']}/wp-json/wp/v2/pages"
-    image_url = main_image_url or "https://buscador.afland.es/assets/flamenco-placeholder.webp"
-
-    verified_image_html = f'<figure class="wp-block-image size-large artist-placeholder-image"><img src="{image_url}" alt="Imagen no disponible"/></figure>'
-
-    placeholder_text = f"""
-<p>En Andalucía Flamenco Land, estamos continuamente comprobando y verificando datos y biografías de los artistas flamencos de todo el mundo.</p>
-<p>Actualmente no disponemos de información biográfica detallada para <strong>{artist_name}</strong>. Nuestro equipo está trabajando para ampliar nuestro archivo.</p>
-<p>Mientras tanto, te invitamos a buscar sus próximas actuaciones y eventos en nuestro buscador especializado:</p>
-<div class="wp-block-buttons"><div class="wp-block-button is-style-fill"><a class="wp-block-button__link has-white-color has-vivid-red-background-color has-text-color has-background" href="https://buscador.afland.es/?q={artist_name.replace(' ', '%20')}" target="_blank" rel="noreferrer noopener">Buscar eventos de {artist_name}</a></div></div>
-"""
-
-    gutenberg_content_placeholder = f"""
-<style>
-h1.entry-title {{ color: #000000 !important; }}
-.artist-placeholder-image {{
-    max-width: 300px;
-    margin: auto;
-}}
-.artist-profile-content p {{color: #333333 !important;}}
-.artist-title-box {{ background-color: #26145F; border-radius: 15px; padding: 20px; margin-bottom: 20px; }}
-.artist-title-box h2 {{ color: #FFFFFF !important; }}
-</style>
-<div class="wp-block-group artist-profile-content">
-    <div class="artist-title-box">
-        <h2>{artist_name}</h2>
-    </div>
-  {verified_image_html}
-  {placeholder_text}
-</div>
-"""
-    data = {
-        "title": artist_name, "status": "publish", "content": gutenberg_content_placeholder,
+def build_wordpress_placeholder_page_data(artist_name, main_image_url):
+    """Construye los datos de una página 'placeholder' de WordPress."""
+    print(f"Construyendo página PLACEHOLDER para {artist_name}...")
+    image_url = main_image_url or templates.PLACEHOLDER_PAGE_IMAGE_URL
+    return {
+        "title": artist_name, "status": "publish",
+        "content": templates.render_placeholder(artist_name, image_url),
         "wf_page_folders": [40], "meta": {"main_artist_image_url": image_url}
     }
 
-    auth = (config['WP_USER'], config['WP_PASSWORD'])
-    try:
-        response = requests.post(wp_api_url, auth=auth, json=data, headers={"Content-Type": "application/json"}, timeout=30)
+def enrich_future_events(writers, artist_name, main_image_url):
+    """Encola la nueva imagen del artista en todos sus eventos futuros."""
+    print(f"Enriqueciendo eventos futuros de {artist_name} con la nueva imagen...")
+    today = datetime.datetime.utcnow().isoformat()
+    writers["events"].add(UpdateMany(
+        {
+            "artist": artist_name,
+            "date": {"$gte": today}
+        },
+        {"$set": {"artistImageUrl": main_image_url}}
+    ))
+
+def register_published_page(artist, writers, page, profile_status, short_bio, main_image_url, long_bio_html=None, video_urls=None):
+    """
+    Encola en MongoDB las actualizaciones del artista y sus eventos tras publicar su página.
+    Los campos del perfil se guardan para poder volver a renderizarlo sin la IA (rerender_profiles.py).
+    """
+    artist_name = artist.name
+    update_set = {
+        "hasProfilePage": True,
+        "profilePageUrl": page['link'],
+        "wpPageId": page['id'],
+        "profileStatus": profile_status
+    }
+    if short_bio:
+        update_set["short_bio"] = short_bio
+    if long_bio_html:
+        update_set["long_bio_html"] = long_bio_html
+    if video_urls is not None:
+        update_set["video_urls"] = video_urls
+    if main_image_url:
+        update_set["meta"] = {"main_artist_image_url": main_image_url}
 
-        if response.status_code == 201:
-            page_data = response.json()
-            print(f"¡Página placeholder para {artist_name} creada! URL: {page_data['link']}")
-            return page_data['link']
-        else:
-            print(f"Error al publicar placeholder en WordPress para {artist_name}: {response.status_code}")
-            print(response.text)
-            return None
-    except requests.exceptions.RequestException as e:
-        print(f"Error al publicar placeholder en WordPress: {e}")
-        return None
+    if main_image_url:
+        enrich_future_events(writers, artist_name, main_image_url)
+
+    writers["artists"].add(UpdateOne(
+        {"_id": artist.id},
+        {"$set": update_set}
+    ))
+    print(f"Actualización de {artist_name} con estado '{profile_status}' encolada para la base de datos.")
+
+def process_artist(artist, config, writers, queue, budget):
+    """
+    Genera el perfil de un artista y encola su página en `writers["pages"]`
+    (PageBatchWriter). Cuando WordPress confirma la creación, las
+    actualizaciones de MongoDB se encolan en `writers["artists"]` y
+    `writers["events"]` (BulkWriter), y el trabajo del artista en `queue`
+    (JobQueue) se marca como terminado; si falla, como fallido.
+
+    Las búsquedas de vídeos e imagen solo se hacen con la cuota reservada en
+    `budget` (ver plan_quota); las omitidas se guardan en `quotaSkipped` y se
+    hacen más adelante con complete_skipped_profiles.
+    """
+    artist_name = artist.name
+    print(f"--- Procesando a: {artist_name} (ID: {artist.id}) ---")
+
+    # 1. Verificación y generación de textos con una única llamada a Gemini
+    profile = generate_artist_profile(artist_name, config['GEMINI_API_KEY'])
+    artist_exists = profile["artistExists"]
+    image_queries = [q for q in profile.get("image_queries", []) if isinstance(q, str) and q.strip()]
+
+    short_bio = None
+    long_bio_html = None
+    video_urls = None
+    skipped = []
+
+    if artist_exists:
+        # CASO A: El artista existe, crear perfil completo
+        print(f"Información encontrada para {artist_name}. Creando perfil completo.")
+        long_bio_html = profile["long_bio_html"].strip()
+        short_bio = profile["short_bio"].strip()
+        video_urls = find_videos_within_budget(artist_name, config, budget, skipped)
+        main_image_url = find_image_within_budget(artist_name, config, image_queries, budget, skipped)
+
+        page_data = build_wordpress_page_data(artist_name, short_bio, long_bio_html, main_image_url, video_urls)
+        profile_status = "complete"
+
+    else:
+        # CASO B: El artista no existe o no hay info, crear placeholder
+        print(f"No se encontró información suficiente para {artist_name}. Creando perfil placeholder.")
+        main_image_url = find_image_within_budget(artist_name, config, image_queries, budget, skipped)
+
+        page_data = build_wordpress_placeholder_page_data(artist_name, main_image_url)
+        profile_status = "placeholder"
+
+    # 2. Publicar en WordPress y, si se crea la página, actualizar la base de datos
+    def on_published(status, response_data):
+        if status != 201:
+            print(f"Error al publicar en WordPress para {artist_name}: {status}")
+            queue.fail(artist.id, f"WordPress respondió {status}")
+            return
+        print(f"¡Página para {artist_name} creada! URL: {response_data['link']}")
+        register_published_page(artist, writers, response_data, profile_status, short_bio, main_image_url, long_bio_html, video_urls)
+        writers["artists"].add(UpdateOne({"_id": artist.id}, {"$set": {**queue.done_update(), "quotaSkipped": skipped}}))
+
+    writers["pages"].create_page(page_data, on_published)
+    return profile_status
+
+def complete_skipped_profile(artist, config, writers, queue, publish_state, budget):
+    """
+    Hace las búsquedas que se omitieron por falta de cuota (`quotaSkipped`) con la
+    cuota reservada en `budget`, reescribe la página desde los campos guardados
+    (rerender_profiles.build_page_update) y guarda lo obtenido. El trabajo de
+    `queue` solo se marca como terminado si ya no queda nada omitido; si no, el
+    artista vuelve a la cola al terminar la ejecución.
+    """
+    artist_name = artist["name"]
+    missing = artist.get("quotaSkipped") or []
+    print(f"--- Completando a: {artist_name} (omitido: {', '.join(missing)}) ---")
+    skipped = []
+    update_set = {}
+    if "youtube" in missing:
+        video_urls = find_videos_within_budget(artist_name, config, budget, skipped)
+        if "youtube" not in skipped:
+            artist["video_urls"] = update_set["video_urls"] = video_urls
+    if "image_search" in missing:
+        main_image_url = find_image_within_budget(artist_name, config, None, budget, skipped)
+        if main_image_url:
+            artist["meta"] = update_set["meta"] = {"main_artist_image_url": main_image_url}
+            enrich_future_events(writers, artist_name, main_image_url)
+
+    def register():
+        update_set["quotaSkipped"] = skipped
+        if not skipped:
+            update_set.update(queue.done_update())
+        writers["artists"].add(UpdateOne({"_id": artist["_id"]}, {"$set": update_set}))
+
+    page_update = rerender_profiles.build_page_update(artist)
+    if not page_update or not artist.get("wpPageId"):
+        print(f"No se puede reescribir la página de {artist_name}: se guardan solo los campos.")
+        register()
+        return
+
+    def on_updated(status, page_data):
+        if status != 200:
+            print(f"Error al actualizar la página de {artist_name}: {status}")
+            queue.fail(artist["_id"], f"WordPress respondió {status}")
+            return
+        publish_state.record(f"wp_page:{artist['wpPageId']}", page_update)
+        register()
+
+    writers["pages"].update_page(artist["wpPageId"], page_update, on_updated)
+
+def complete_skipped_profiles(db, config, ledger, limit):
+    """
+    Completa, con la cuota que quede hoy, hasta `limit` perfiles publicados sin
+    vídeos o sin imagen por falta de cuota, empezando por los de más eventos.
+    Se detiene en cuanto un artista no consigue ninguna de las cuotas que necesita.
+    """
+    queue = artist_repository.enrichment_queue(db["artists"])
+    publish_state = PublishState(db)
+    writers = {
+        "pages": wordpress_api.PageBatchWriter(config),
+        "artists": BulkWriter(db["artists"]),
+        "events": BulkWriter(db["events"]),
+    }
+    max_image_queries = int(os.getenv("IMAGE_SEARCH_MAX_QUERIES", "5"))
+    fields = {**rerender_profiles.PROFILE_FIELDS, "quotaSkipped": 1}
+    with queue:
+        try:
+            for _ in range(limit):
+                artist = queue.claim(fields)
+                if not artist:
+                    break
+                missing = artist.get("quotaSkipped") or []
+                budget = {}
+                if "youtube" in missing:
+                    budget["youtube"] = ledger.reserve("youtube", ledger.cost("youtube"))
+                if "image_search" in missing:
+                    budget["custom_search"] = ledger.reserve("custom_search", max_image_queries, minimum=1)
+                if not any(budget.values()):
+                    # El artista reclamado vuelve a la cola al salir
+                    print("No queda cuota para completar más perfiles.")
+                    release_quota(ledger, budget)
+                    break
+                try:
+                    complete_skipped_profile(artist, config, writers, queue, publish_state, budget)
+                except Exception as e:
+                    print(f"!! ERROR al completar a {artist['name']}: {e}")
+                    queue.fail(artist["_id"], e)
+                finally:
+                    release_quota(ledger, budget)
+        finally:
+            # Las páginas van primero: al confirmarse encolan las escrituras en MongoDB
+            for writer in writers.values():
+                writer.close()
+    queue.print_stats()
+
+def parse_args():
+    """Lee los argumentos de línea de comandos."""
+    parser = argparse.ArgumentParser(description="Genera perfiles de artistas pendientes y los publica en WordPress.")
+    parser.add_argument("--workers", type=int, default=1, help="Número de artistas a procesar en paralelo (por defecto: 1).")
+    parser.add_argument("--limit", type=int, default=5, help="Número máximo de artistas a procesar en esta ejecución (por defecto: 5).")
+    parser.add_argument("--no-cache", action="store_true", help="Ignora las respuestas de Gemini cacheadas y las regenera.")
+    parser.add_argument("--skip-index", action="store_true", help="No regenera el índice al terminar (p. ej. en ejecuciones en paralelo).")
+    return parser.parse_args()
 
 def main():
     """Flujo principal del script para procesar artistas en lote."""
+    args = parse_args()
     config = get_config()
+    if args.no_cache:
+        disk_cache.set_bypass(True)
     
     try:
-        client = pymongo.MongoClient(config['MONGO_URI'])
+        client = pymongo.MongoClient(config['MONGO_URI'], maxPoolSize=max(10, args.workers * 2))
         db = client[config['DB_NAME']]
         artists_collection = db["artists"]
         print("Conectado a MongoDB.")
@@ -283,97 +378,67 @@ def main():
         sys.exit(1)
 
     try:
-        artists_to_process_cursor = artists_collection.find({"hasProfilePage": {"$ne": True}}).sort("eventCount", -1).limit(5)
-        artists_to_process = list(artists_to_process_cursor)
-        artist_count = len(artists_to_process)
-
-        if artist_count == 0:
-            print("No hay nuevos artistas para procesar.")
-        else:
-            print(f"Se encontraron {artist_count} artistas. Procesando en lote...")
-            for artist in artists_to_process:
+        ledger = QuotaLedger(db).install()
+        queue = artist_repository.profile_queue(artists_collection)
+        with queue:
+            # Una llamada a Gemini por artista: no se reservan más artistas de los que permite la cuota diaria
+            gemini_budget = ledger.reserve("gemini", args.limit, minimum=1)
+            # Cada artista queda reservado para este proceso (lease): otras ejecuciones en paralelo no lo repiten.
+            # Solo _id, nombre y eventCount: el resto del perfil lo genera process_artist
+            artists_to_process = artist_repository.claim_artists(queue, gemini_budget, artist_repository.PENDING_FIELDS)
+            artist_count = len(artists_to_process)
+            ledger.release("gemini", gemini_budget - artist_count)
+
+            if not gemini_budget:
+                print("No queda cuota diaria de Gemini. No se procesan artistas.")
+            elif artist_count == 0:
+                print("No hay nuevos artistas para procesar.")
+            else:
+                workers = max(1, min(args.workers, artist_count))
+                print(f"Se reservaron {artist_count} artistas. Procesando en lote con {workers} worker(s)...")
+                # Las páginas van primero: al cerrarse, sus callbacks encolan escrituras en MongoDB
+                writers = {
+                    # El catálogo evita duplicar páginas si un lote falla por la red
+                    "pages": wordpress_api.PageBatchWriter(config, catalog=PageCatalog(db, config)),
+                    "artists": BulkWriter(artists_collection, batch_size=100, flush_interval=10),
+                    "events": BulkWriter(db["events"], batch_size=100, flush_interval=10),
+                }
+                budgets = plan_quota(ledger, artists_to_process)
+                # Las pausas entre artistas las sustituyen los limitadores por API (rate_limiter).
                 try:
-                    artist_name = artist["name"]
-                    print(f"--- Procesando a: {artist_name} (ID: {artist['_id']}) ---")
-
-                    # 1. Verificación previa con Gemini
-                    verification_data = verify_artist_existence(artist_name, config['GEMINI_API_KEY'])
-                    artist_exists = verification_data.get("artistExists", False)
-
-                    new_page_url = None
-                    profile_status = "failed"
-                    short_bio = None
-                    main_image_url = None
-
-                    if artist_exists:
-                        # CASO A: El artista existe, crear perfil completo
-                        print(f"Información encontrada para {artist_name}. Creando perfil completo.")
-                        long_bio_html = generate_long_biography(artist_name, config['GEMINI_API_KEY'])
-                        short_bio = generate_short_biography(artist_name, config['GEMINI_API_KEY'])
-                        video_urls = find_youtube_videos(artist_name, config['GOOGLE_API_KEY'])
-                        main_image_url = find_main_image(artist_name, config['GOOGLE_API_KEY'], config['CUSTOM_SEARCH_ENGINE_ID'])
-                        
-                        new_page_url = create_wordpress_page(
-                            config, artist_name, short_bio, long_bio_html, main_image_url, video_urls
-                        )
-                        if new_page_url:
-                            profile_status = "complete"
-
-                    else:
-                        # CASO B: El artista no existe o no hay info, crear placeholder
-                        print(f"No se encontró información suficiente para {artist_name}. Creando perfil placeholder.")
-                        main_image_url = find_main_image(artist_name, config['GOOGLE_API_KEY'], config['CUSTOM_SEARCH_ENGINE_ID'])
-                        
-                        new_page_url = create_wordpress_placeholder_page(config, artist_name, main_image_url)
-                        if new_page_url:
-                            profile_status = "placeholder"
-
-                    # 3. Actualizar la base de datos si la publicación fue exitosa
-                    if new_page_url:
-                        update_set = {
-                            "hasProfilePage": True, 
-                            "profilePageUrl": new_page_url,
-                            "profileStatus": profile_status
-                        }
-                        if short_bio:
-                            update_set["short_bio"] = short_bio
-                        if main_image_url:
-                            update_set["meta"] = {"main_artist_image_url": main_image_url}
-
-                        # --- INICIO: Enriquecer eventos existentes del artista ---
-                        if main_image_url:
-                            print(f"Enriqueciendo eventos futuros de {artist_name} con la nueva imagen...")
-                            events_collection = db["events"]
-                            today = datetime.datetime.utcnow().isoformat()
-                            
-                            # Actualizar todos los eventos futuros de este artista
-                            update_result = events_collection.update_many(
-                                {
-                                    "artist": artist_name,
-                                    "date": {"$gte": today}
-                                },
-                                {"$set": {"artistImageUrl": main_image_url}}
-                            )
-                            print(f"  -> {update_result.modified_count} eventos actualizados.")
-                        # --- FIN: Enriquecer eventos existentes del artista ---
-
-                        artists_collection.update_one(
-                            {"_id": artist["_id"]},
-                            {"$set": update_set}
-                        )
-                        print(f"Base de datos actualizada para {artist_name} con estado '{profile_status}'.")
-
-                    print("Pausando 15 segundos antes del siguiente artista...")
-                    time.sleep(15)
-
-                except Exception as e:
-                    print(f"!! ERROR al procesar a {artist.get('name', 'ID desconocido')}: {e}")
-                    continue
-
-            print("Procesamiento del lote finalizado.")
-
-        print("\n--- Regenerando el índice de artistas ---")
-        os.system("python apps/biographer/generate_artist_index.py")
+                    with ThreadPoolExecutor(max_workers=workers) as executor:
+                        futures = {executor.submit(process_artist, artist, config, writers, queue, budgets[artist.id]): artist for artist in artists_to_process}
+                        for future in as_completed(futures):
+                            artist = futures[future]
+                            try:
+                                future.result()
+                            except Exception as e:
+                                print(f"!! ERROR al procesar a {artist.name or 'ID desconocido'}: {e}")
+                                queue.fail(artist.id, e)
+                            release_quota(ledger, {"gemini": 1, **budgets[artist.id]})
+                finally:
+                    # Se envía lo pendiente aunque falle el lote: las páginas ya publicadas deben quedar registradas
+                    for writer in writers.values():
+                        writer.close()
+
+                print("Procesamiento del lote finalizado.")
+                for writer in writers.values():
+                    writer.print_stats()
+                rate_limiter.print_stats()
+                gemini_client.print_cache_stats()
+                http_client.print_stats()
+
+        queue.print_stats()
+
+        # Los perfiles publicados sin vídeos o sin imagen por falta de cuota se completan con la que quede
+        complete_skipped_profiles(db, config, ledger, args.limit)
+        ledger.print_stats()
+
+        if args.skip_index:
+            print("\nSe omite la regeneración del índice (--skip-index).")
+        else:
+            print("\n--- Regenerando el índice de artistas ---")
+            os.system("python apps/biographer/generate_artist_index.py")
 
     except Exception as e:
         print(f"Ocurrió un error general durante la ejecución: {e}")
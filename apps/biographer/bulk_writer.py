@@ -0,0 +1,82 @@
+"""
+Buffer de escrituras para MongoDB.
+
+En lugar de enviar un `update_one`/`update_many` por artista, los scripts añaden
+las operaciones (`UpdateOne`, `UpdateMany`, ...) a un `BulkWriter`, que las
+envía como `bulk_write` no ordenados cuando se acumulan `batch_size`
+operaciones o han pasado `flush_interval` segundos desde el último envío. Al
+cerrar el writer se envía lo pendiente y quedan disponibles las estadísticas
+de la ejecución.
+"""
+import time
+import threading
+import pymongo
+
+class BulkWriter:
+    """Acumula operaciones de escritura de una colección y las envía por lotes."""
+
+    def __init__(self, collection, batch_size=500, flush_interval=5.0):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._operations = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self.stats = {
+            "operations": 0, "batches": 0, "matched": 0, "modified": 0,
+            "upserted": 0, "inserted": 0, "errors": 0,
+        }
+
+    def add(self, operation):
+        """Añade una operación y envía el lote si se ha alcanzado el tamaño o el tiempo máximo."""
+        with self._lock:
+            self._operations.append(operation)
+            due = (len(self._operations) >= self.batch_size
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+            if due:
+                self._flush_locked()
+
+    def flush(self):
+        """Envía las operaciones pendientes."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._operations:
+            return
+        operations, self._operations = self._operations, []
+        self.stats["operations"] += len(operations)
+        self.stats["batches"] += 1
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+            self._record(result.bulk_api_result)
+        except pymongo.errors.BulkWriteError as e:
+            self._record(e.details)
+            self.stats["errors"] += len(e.details.get("writeErrors", []))
+            print(f"Error en la escritura por lotes en '{self.collection.name}': {len(e.details.get('writeErrors', []))} operaciones fallidas.")
+        except pymongo.errors.PyMongoError as e:
+            self.stats["errors"] += len(operations)
+            print(f"Error en la escritura por lotes en '{self.collection.name}': {e}")
+
+    def _record(self, details):
+        self.stats["matched"] += details.get("nMatched", 0)
+        self.stats["modified"] += details.get("nModified", 0)
+        self.stats["upserted"] += details.get("nUpserted", 0)
+        self.stats["inserted"] += details.get("nInserted", 0)
+
+    def close(self):
+        """Envía lo pendiente y devuelve las estadísticas de escritura."""
+        self.flush()
+        return self.stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def print_stats(self):
+        stats = self.stats
+        print(f"--- Escrituras en '{self.collection.name}': {stats['operations']} operaciones en {stats['batches']} lotes "
+              f"({stats['modified']} modificados, {stats['upserted'] + stats['inserted']} creados, {stats['errors']} errores) ---")
@@ -1,13 +1,22 @@
 import os
 import sys
-import time
 import json
 import re
+from functools import partial
 from dotenv import load_dotenv
 import pymongo
 import requests
-import google.generativeai as genai
-from googleapiclient.discovery import build
+import http_client
+import google_clients
+import image_search
+import rate_limiter
+import gemini_client
+import templates
+import wordpress_api
+from page_catalog import PageCatalog
+from publish_state import PublishState
+import artist_repository
+from quota_ledger import QuotaLedger
 from pathlib import Path
 
 # Carga las variables de entorno desde la carpeta del script
@@ -54,12 +63,11 @@ def strip_html(html_string):
 def verify_artist_existence(artist_name, api_key):
     """Verifica con Gemini si existe información pública sobre un artista."""
     print(f"Verificando existencia de información para {artist_name}...")
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-1.5-flash')
+    model = gemini_client.get_model(api_key)
     prompt = f"Basándote en tu conocimiento público, ¿existe información verificable y suficiente para escribir una biografía detallada sobre un/a artista de flamenco llamado/a '{artist_name}'? Responde únicamente con un objeto JSON con dos claves: 'artistExists' (true o false) y 'confidence' ('high', 'medium', o 'low')."
     try:
-        response = model.generate_content(prompt)
-        data = json.loads(clean_gemini_response(response.text))
+        response_text = gemini_client.generate_text(model, prompt, validate=gemini_client.is_json_response)
+        data = json.loads(clean_gemini_response(response_text))
         print(f"Verificación completada: {data}")
         return data
     except (json.JSONDecodeError, Exception) as e:
@@ -69,30 +77,27 @@ def verify_artist_existence(artist_name, api_key):
 def reformat_biography(artist_name, raw_text, api_key):
     """Usa Gemini para reformatear un texto plano a una biografía HTML estructurada."""
     print(f"Reformateando biografía para {artist_name}...")
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-1.5-flash')
+    model = gemini_client.get_model(api_key)
     prompt = f"""Actúa como un editor de contenido. Toma el siguiente texto biográfico sobre {artist_name} y reestructúralo en formato HTML. No inventes información nueva. Utiliza subtítulos <h2> para las secciones clave como 'Inicios y Formación', 'Estilo e Influencias', y 'Trayectoria y Colaboraciones'. La salida debe ser únicamente el HTML de los párrafos y los subtítulos.
 
 TEXTO A FORMATEAR:
 {raw_text}"""
-    response = model.generate_content(prompt)
-    return clean_gemini_response(response.text)
+    return clean_gemini_response(gemini_client.generate_text(model, prompt))
 
 def generate_short_biography(artist_name, api_key):
     """Genera una biografía corta de una frase."""
     print(f"Generando biografía CORTA para {artist_name}...")
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-1.5-flash')
+    model = gemini_client.get_model(api_key)
     prompt = f"Resume la carrera del artista flamenco {artist_name} en una sola frase impactante y concisa de no más de 25 palabras."
-    response = model.generate_content(prompt)
-    return clean_gemini_response(response.text)
+    return clean_gemini_response(gemini_client.generate_text(model, prompt))
 
 def find_youtube_videos(artist_name, api_key):
     """Busca videos de YouTube del artista."""
     print(f"Buscando vídeos de {artist_name} en YouTube...")
     try:
-        youtube = build('youtube', 'v3', developerKey=api_key)
+        youtube = google_clients.youtube(api_key)
         request = youtube.search().list(q=f"{artist_name} en directo", part='snippet', type='video', maxResults=3)
+        rate_limiter.acquire("youtube")
         response = request.execute()
         video_urls = [f"https://www.youtube.com/watch?v={item['id']['videoId']}" for item in response.get('items', [])]
         print(f"Se encontraron {len(video_urls)} vídeos.")
@@ -105,15 +110,14 @@ def generate_image_search_queries(artist_name, api_key):
     """Usa Gemini para generar consultas de búsqueda de imágenes de alta calidad."""
     print(f"Generando consultas de búsqueda de imágenes con IA para {artist_name}...")
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        model = gemini_client.get_model(api_key)
         prompt = f"""
         Eres un experto en búsqueda de imágenes. Para el artista flamenco '{artist_name}', genera una lista de 5 prompts de búsqueda para Google Images que maximicen la probabilidad de encontrar una imagen de retrato de alta calidad, artística y profesional.
         Responde únicamente con un objeto JSON que contenga una clave "queries" con un array de strings.
         Ejemplo de respuesta: {{"queries": ["{artist_name} primer plano blanco y negro", "{artist_name} actuando en directo con guitarra", "{artist_name} retrato artistico flamenco"]}}
         """
-        response = model.generate_content(prompt)
-        data = json.loads(clean_gemini_response(response.text))
+        response_text = gemini_client.generate_text(model, prompt, validate=gemini_client.is_json_response)
+        data = json.loads(clean_gemini_response(response_text))
         if "queries" in data and isinstance(data["queries"], list):
             print(f"  ✅ Consultas generadas por IA: {data['queries']}")
             return data["queries"]
@@ -121,151 +125,79 @@ def generate_image_search_queries(artist_name, api_key):
         print(f"  - Error al generar consultas con IA: {e}. Usando consultas por defecto.")
     return None
 
-def find_main_image(artist_name, api_key, cx_id):
-    """Busca una imagen principal usando Google Custom Search con varias consultas."""
-    print(f"Buscando imagen principal para {artist_name} con consultas mejoradas...")
-    
-    # Primero, intenta generar queries con IA
-    search_queries = generate_image_search_queries(artist_name, os.getenv("GEMINI_API_KEY"))
-
-    # Si falla la IA o no devuelve nada, usa las de por defecto
-    if not search_queries:
-        search_queries = [
-        f"{artist_name} flamenco retrato primer plano",
-        f"{artist_name} actuando en directo",
-        f"{artist_name} flamenco"
-    ]
-    
-    service = build("customsearch", "v1", developerKey=api_key)
-    
-    for query in search_queries:
-        try:
-            print(f"  - Intentando con la consulta: '{query}'")
-            res = service.cse().list(q=query, cx=cx_id, searchType='image', num=1).execute()
-            if 'items' in res and len(res['items']) > 0:
-                image_url = res['items'][0]['link']
-                print(f"  ✅ Imagen encontrada con éxito.")
-                return image_url
-        except Exception as e:
-            print(f"    - Error en la consulta: {e}")
-            continue
-            
-    print("  - No se encontró ninguna imagen tras varios intentos.")
-    return None
-
-def get_page_by_title(config, artist_name):
-    """Obtiene los datos de una página de WordPress por su título."""
+def get_page_by_title(config, catalog, artist_name):
+    """Obtiene los datos de una página de WordPress por su título, resuelto en el catálogo local."""
     print(f"Buscando página en WordPress para '{artist_name}'...")
-    wp_api_url = f"{config['WP_URL']}/wp-json/wp/v2/pages"
-    auth = (config['WP_USER'], config['WP_PASSWORD'])
-    params = {'search': artist_name, 'per_page': 1}
-    try:
-        response = requests.get(wp_api_url, auth=auth, params=params, timeout=30)
-        response.raise_for_status()
-        pages = response.json()
-        if pages and pages[0]['title']['rendered'] == artist_name:
-            print(f"Página encontrada con ID: {pages[0]['id']}")
-            return pages[0]
-    except requests.exceptions.RequestException as e:
-        print(f"Error al buscar página en WordPress: {e}")
+    entry = catalog.find_by_title(artist_name)
+    if entry:
+        try:
+            page = wordpress_api.get_page(config, entry['_id'], context='edit')
+            print(f"Página encontrada con ID: {page['id']}")
+            return page
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                catalog.forget(entry['_id'])
+            print(f"Error al obtener la página de WordPress: {e}")
+        except requests.exceptions.RequestException as e:
+            print(f"Error al obtener la página de WordPress: {e}")
     print("No se encontró una página coincidente.")
     return None
 
-def update_wordpress_page(config, page_id, title, content, meta):
-    """Actualiza una página existente en WordPress."""
-    print(f"Actualizando página {page_id} en WordPress...")
-    wp_api_url = f"{config['WP_URL']}/wp-json/wp/v2/pages/{page_id}"
-    auth = (config['WP_USER'], config['WP_PASSWORD'])
+def update_wordpress_page(pages_writer, publish_state, current_page, title, content, meta, on_updated, on_failed=None):
+    """
+    Encola la actualización de una página existente en WordPress; `on_updated(url)`
+    se llama al confirmarse, o directamente si el contenido no ha cambiado, y
+    `on_failed(status)` si WordPress responde con error.
+    """
+    page_id = current_page['id']
     data = {"title": title, "content": content, "meta": meta}
-    
-    try:
-        response = requests.post(wp_api_url, auth=auth, json=data, headers={"Content-Type": "application/json"}, timeout=30)
-        
-        if response.status_code == 200:
-            page_data = response.json()
+    artifact_key = f"wp_page:{page_id}"
+    if publish_state.is_unchanged(artifact_key, data):
+        on_updated(current_page['link'])
+        return
+
+    print(f"Encolando actualización de la página {page_id} en WordPress...")
+
+    def callback(status, page_data):
+        if status == 200:
             print(f"¡Página para {title} actualizada! URL: {page_data['link']}")
-            return page_data['link']
+            publish_state.record(artifact_key, data)
+            on_updated(page_data['link'])
         else:
-            print(f"Error al actualizar en WordPress para {title}: {response.status_code}")
-            print(response.text)
-            return None
-    except requests.exceptions.RequestException as e:
-        print(f"Error al actualizar página en WordPress: {e}")
-        return None
-
-# --- LÓGICA DE CONSTRUCCIÓN DE CONTENIDO ---
-
-def build_complete_content(artist_name, short_bio, long_bio_html, main_image_url, video_urls):
-    """Construye el HTML para una página de perfil completa."""
-    videos_html = "<h2>Actuaciones Destacadas</h2>"
-    if video_urls:
-        for url in video_urls:
-            embed_url = url.replace("watch?v=", "embed/")
-            videos_html += f'''<div style="position: relative; padding-bottom: 56.25%; height: 0; overflow: hidden; margin-bottom: 1em;">
-<iframe src="{embed_url}" style="position: absolute; top: 0; left: 0; width: 100%; height: 100%;" frameborder="0" allowfullscreen></iframe>
-</div>'''
-
-    image_html = ""
-    if main_image_url:
-        image_html = f'''<div class="wp-block-column" style="flex-basis:33.33%"><figure class="wp-block-image size-large"><img src="{main_image_url}" alt="{artist_name}"/></figure></div>'''
-    
-    column_style = "66.66%" if main_image_url else "100%"
-
-    return f"""
-<style>
-h1.entry-title {{ color: #000000 !important; }}
-.artist-profile-content p {{color: #333333 !important;}}
-.artist-profile-content h2 {{color: #26145F !important;}}
-.artist-title-box {{ background-color: #26145F; border-radius: 15px; padding: 20px; margin-bottom: 20px; }}
-.artist-title-box h2 {{ color: #FFFFFF !important; }}
-.artist-title-box p {{ color: #FFFFFF !important; font-style:italic; font-weight:700; }}
-</style>
-<div class="wp-block-group artist-profile-content">
-  <div class="wp-block-columns">
-    {image_html}
-    <div class="wp-block-column" style="flex-basis:{column_style}">
-      <div class="artist-title-box">
-        <h2>{artist_name}</h2>
-        <p>{short_bio}</p>
-      </div>
-    </div>
-  </div>
-  <hr class="wp-block-separator has-alpha-channel-opacity"/>
-  {long_bio_html}
-  {videos_html}
-</div>
-"""
-
-def build_placeholder_content(artist_name):
-    """Construye el HTML para una página placeholder."""
-    image_url = "https://buscador.afland.es/assets/flamenco-placeholder.webp"
-    verified_image_html = f'<figure class="wp-block-image size-large artist-placeholder-image"><img src="{image_url}" alt="Imagen no disponible"/></figure>'
-
-    placeholder_text = f"""
-<p>En Andalucía Flamenco Land, estamos continuamente comprobando y verificando datos y biografías de los artistas flamencos de todo el mundo.</p>
-<p>Actualmente no disponemos de información biográfica detallada para <strong>{artist_name}</strong>. Nuestro equipo está trabajando para ampliar nuestro archivo.</p>
-<p>Mientras tanto, te invitamos a buscar sus próximas actuaciones y eventos en nuestro buscador especializado:</p>
-<div class="wp-block-buttons"><div class="wp-block-button is-style-fill"><a class="wp-block-button__link has-white-color has-vivid-red-background-color has-text-color has-background" href="https://buscador.afland.es/?q={artist_name.replace(' ', '%20')}" target="_blank" rel="noreferrer noopener">Buscar eventos de {artist_name}</a></div></div>
-"""
-    return f"""
-<style>
-h1.entry-title {{ color: #000000 !important; }}
-.artist-placeholder-image {{
-    max-width: 300px;
-    margin: auto;
-}}
-.artist-profile-content p {{color: #333333 !important;}}
-.artist-title-box {{ background-color: #26145F; border-radius: 15px; padding: 20px; margin-bottom: 20px; }}
-.artist-title-box h2 {{ color: #FFFFFF !important; }}
-</style>
-<div class="wp-block-group artist-profile-content">
-    <div class="artist-title-box">
-        <h2>{artist_name}</h2>
-    </div>
-  {verified_image_html}
-  {placeholder_text}
-</div>
-"""
+            print(f"Error al actualizar en WordPress para {title}: {status}")
+            if on_failed:
+                on_failed(status)
+
+    pages_writer.update_page(page_id, data, callback)
+
+def register_corrected_profile(artists_collection, artist, profile_status, short_bio, new_meta, updated_url,
+                               page_id=None, long_bio_html=None, video_urls=None, queue=None):
+    """
+    Actualiza en MongoDB el artista cuya página se ha corregido, con los campos de
+    su perfil, y marca como terminado su trabajo en `queue` (JobQueue).
+    """
+    update_set = {
+        "profileStatus": profile_status,
+        "profilePageUrl": updated_url
+    }
+    if page_id:
+        update_set["wpPageId"] = page_id
+    if short_bio:
+        update_set["short_bio"] = short_bio
+    if long_bio_html:
+        update_set["long_bio_html"] = long_bio_html
+    if video_urls is not None:
+        update_set["video_urls"] = video_urls
+    if new_meta.get("main_artist_image_url"):
+        update_set["meta"] = new_meta
+    if queue:
+        update_set.update(queue.done_update())
+
+    artists_collection.update_one(
+        {"_id": artist["_id"]},
+        {"$set": update_set}
+    )
+    print(f"Base de datos actualizada para {artist['name']} con estado '{profile_status}'.")
 
 # --- FLUJO PRINCIPAL ---
 
@@ -282,81 +214,112 @@ def main():
         print(f"Error de conexión a MongoDB: {e}")
         sys.exit(1)
 
+    pages_writer = None
+    publish_state = None
     try:
-        # Busca artistas con página pero sin el estado de perfil actualizado
-        query = {"hasProfilePage": True, "profileStatus": {"$exists": False}}
-        artists_to_process = list(artists_collection.find(query).limit(5))
-        artist_count = len(artists_to_process)
-
-        if artist_count == 0:
-            print("No hay artistas para corregir.")
-        else:
-            print(f"Se encontraron {artist_count} artistas para corregir. Procesando...")
-            for artist in artists_to_process:
-                artist_name = artist["name"]
-                print(f"--- Procesando a: {artist_name} (ID: {artist['_id']}) ---")
-
-                page_data = get_page_by_title(config, artist_name)
-                if not page_data:
-                    print("No se encontró la página en WordPress. Saltando artista.")
-                    continue
-                
-                page_id = page_data['id']
-                verification = verify_artist_existence(artist_name, config['GEMINI_API_KEY'])
-                
-                new_content = ""
-                new_meta = {}
-                profile_status = "failed"
-                short_bio = None
-
-                if verification.get("artistExists"):
-                    # CASO A: El artista existe -> Reformatear y enriquecer
-                    print("Artista verificado. Reformateando y enriqueciendo perfil.")
-                    
-                    raw_content = page_data.get('content', {}).get('raw', '')
-                    raw_text = strip_html(raw_content)
-
-                    long_bio_html = reformat_biography(artist_name, raw_text, config['GEMINI_API_KEY'])
-                    short_bio = generate_short_biography(artist_name, config['GEMINI_API_KEY'])
-                    video_urls = find_youtube_videos(artist_name, config['GOOGLE_API_KEY'])
-                    main_image_url = find_main_image(artist_name, config['GOOGLE_API_KEY'], config['CUSTOM_SEARCH_ENGINE_ID'])
-                    
-                    new_content = build_complete_content(artist_name, short_bio, long_bio_html, main_image_url, video_urls)
-                    new_meta = {"main_artist_image_url": main_image_url or ""}
-                    profile_status = "complete"
-                else:
-                    # CASO B: No hay info -> Crear placeholder
-                    print("Artista no verificado. Creando perfil placeholder.")
-                    new_content = build_placeholder_content(artist_name)
-                    new_meta = {"main_artist_image_url": "https://buscador.afland.es/assets/flamenco-placeholder.webp"}
-                    profile_status = "placeholder"
-
-                # Actualizar WordPress
-                updated_url = update_wordpress_page(config, page_id, artist_name, new_content, new_meta)
-
-                if updated_url:
-                    # Actualizar MongoDB
-                    update_set = {
-                        "profileStatus": profile_status,
-                        "profilePageUrl": updated_url
+        catalog = PageCatalog(db, config)
+        pages_writer = wordpress_api.PageBatchWriter(config)
+        publish_state = PublishState(db)
+        catalog.sync()
+
+        ledger = QuotaLedger(db).install()
+        queue = artist_repository.correction_queue(artists_collection)
+        with queue:
+            # Reserva (lease) artistas con página pero sin el estado de perfil actualizado
+            artists_to_process = queue.claim_many(5, {"name": 1})
+            artist_count = len(artists_to_process)
+
+            if artist_count == 0:
+                print("No hay artistas para corregir.")
+            else:
+                print(f"Se encontraron {artist_count} artistas para corregir. Procesando...")
+                # Sin pausas entre artistas: cada llamada a Gemini, YouTube, Custom Search y WordPress pasa por rate_limiter
+                for artist in artists_to_process:
+                    artist_name = artist["name"]
+                    print(f"--- Procesando a: {artist_name} (ID: {artist['_id']}) ---")
+
+                    page_data = get_page_by_title(config, catalog, artist_name)
+                    if not page_data:
+                        print("No se encontró la página en WordPress. Saltando artista.")
+                        queue.fail(artist["_id"], "Página no encontrada en WordPress")
+                        continue
+
+                    # Hasta 4 llamadas a Gemini por artista; sin cuota se para el lote y el resto vuelve a la cola
+                    if not ledger.reserve("gemini", 4):
+                        print("No queda cuota diaria de Gemini. Se detiene el lote.")
+                        break
+                    budget = {
+                        "gemini": 4,
+                        "youtube": ledger.reserve("youtube", ledger.cost("youtube")),
+                        "custom_search": ledger.reserve("custom_search", 5, minimum=1),
                     }
-                    if short_bio:
-                        update_set["short_bio"] = short_bio
-                    if new_meta.get("main_artist_image_url"):
-                        update_set["meta"] = new_meta
-
-                    artists_collection.update_one(
-                        {"_id": artist["_id"]},
-                        {"$set": update_set}
-                    )
-                    print(f"Base de datos actualizada para {artist_name} con estado '{profile_status}'.")
-
-                print("Pausando 15 segundos...")
-                time.sleep(15)
+                    # Las reservas se devuelven aunque falle el artista: lo no gastado vuelve al presupuesto del día
+                    try:
+                        verification = verify_artist_existence(artist_name, config['GEMINI_API_KEY'])
+
+                        new_content = ""
+                        new_meta = {}
+                        profile_status = "failed"
+                        short_bio = None
+                        long_bio_html = None
+                        video_urls = None
+
+                        if verification.get("artistExists"):
+                            # CASO A: El artista existe -> Reformatear y enriquecer
+                            print("Artista verificado. Reformateando y enriqueciendo perfil.")
+
+                            raw_content = page_data.get('content', {}).get('raw', '')
+                            raw_text = strip_html(raw_content)
+
+                            long_bio_html = reformat_biography(artist_name, raw_text, config['GEMINI_API_KEY'])
+                            short_bio = generate_short_biography(artist_name, config['GEMINI_API_KEY'])
+                            if budget["youtube"]:
+                                video_urls = find_youtube_videos(artist_name, config['GOOGLE_API_KEY'])
+                            else:
+                                print("Sin cuota de YouTube: se omiten los vídeos.")
+                                video_urls = []
+                            if budget["custom_search"]:
+                                image_queries = generate_image_search_queries(artist_name, config['GEMINI_API_KEY'])
+                                main_image_url = image_search.find_main_image(artist_name, config['GOOGLE_API_KEY'], config['CUSTOM_SEARCH_ENGINE_ID'], (image_queries or image_search.default_search_queries(artist_name))[:budget["custom_search"]])
+                            else:
+                                print("Sin cuota de Custom Search: se omite la búsqueda de imagen.")
+                                main_image_url = None
+
+                            new_content = templates.render_profile(artist_name, short_bio, long_bio_html, main_image_url, video_urls)
+                            new_meta = {"main_artist_image_url": main_image_url or ""}
+                            profile_status = "complete"
+                        else:
+                            # CASO B: No hay info -> Crear placeholder
+                            print("Artista no verificado. Creando perfil placeholder.")
+                            new_content = templates.render_placeholder(artist_name)
+                            new_meta = {"main_artist_image_url": templates.PLACEHOLDER_PAGE_IMAGE_URL}
+                            profile_status = "placeholder"
+
+                        # Actualizar WordPress (por lotes) y, al confirmarse, MongoDB
+                        update_wordpress_page(
+                            pages_writer, publish_state, page_data, artist_name, new_content, new_meta,
+                            partial(register_corrected_profile, artists_collection, artist, profile_status, short_bio, new_meta,
+                                    page_id=page_data['id'], long_bio_html=long_bio_html, video_urls=video_urls, queue=queue),
+                            lambda status, artist_id=artist["_id"]: queue.fail(artist_id, f"WordPress respondió {status}")
+                        )
+                    finally:
+                        for api, units in budget.items():
+                            ledger.release(api, units)
+
+            # Las actualizaciones pendientes se envían antes de soltar los leases
+            pages_writer.close()
+        queue.print_stats()
+        ledger.print_stats()
 
     except Exception as e:
         print(f"Ocurrió un error general: {e}")
     finally:
+        if pages_writer:
+            pages_writer.close()
+            pages_writer.print_stats()
+        if publish_state:
+            publish_state.print_stats()
+        http_client.print_stats()
         if 'client' in locals() and client:
             client.close()
             print("Conexión a MongoDB cerrada.")
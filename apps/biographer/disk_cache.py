@@ -0,0 +1,127 @@
+"""
+Caché persistente en disco (SQLite) compartida por los scripts del biógrafo.
+
+Las entradas se agrupan por espacio de nombres (p. ej. "gemini"), caducan tras
+un TTL y, cuando un espacio supera su tamaño máximo, se eliminan las entradas
+usadas hace más tiempo (LRU). Con `BIOGRAPHER_CACHE_BYPASS=1` (o llamando a
+`set_bypass(True)`) se ignoran las lecturas pero se siguen guardando los
+resultados nuevos, de modo que la caché queda refrescada.
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = Path(__file__).parent / ".cache" / "biographer_cache.sqlite3"
+
+_bypass = os.getenv("BIOGRAPHER_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
+
+def set_bypass(enabled):
+    """Activa o desactiva la lectura de la caché para todo el proceso."""
+    global _bypass
+    _bypass = enabled
+
+def is_bypassed():
+    return _bypass
+
+class DiskCache:
+    """Almacén clave/valor JSON con TTL y expulsión LRU acotada por tamaño."""
+
+    def __init__(self, namespace, ttl_seconds, max_bytes, path=None):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.path = Path(path or os.getenv("BIOGRAPHER_CACHE_PATH") or DEFAULT_CACHE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (namespace, accessed_at)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Devuelve el valor guardado o None si no existe, ha caducado o hay bypass."""
+        if _bypass:
+            self.misses += 1
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is None or (self.ttl_seconds and now - row[1] > self.ttl_seconds):
+                if row is not None:
+                    self._conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key),
+            )
+            self._conn.commit()
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        """Guarda `value` (serializable a JSON) y aplica la expulsión LRU si hace falta."""
+        payload = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, payload, len(payload.encode("utf-8")), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+            self._conn.commit()
+
+    def _evict(self):
+        """Elimina las entradas menos usadas hasta volver a estar bajo `max_bytes`."""
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT key, size FROM entries WHERE namespace = ? ORDER BY accessed_at ASC", (self.namespace,)
+        )
+        to_delete = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            to_delete.append((self.namespace, key))
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", to_delete)
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_cache(namespace, ttl_seconds, max_bytes):
+    """Devuelve la instancia compartida de la caché para `namespace`."""
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache = DiskCache(namespace, ttl_seconds, max_bytes)
+            _caches[namespace] = cache
+        return cache
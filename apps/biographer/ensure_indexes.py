@@ -0,0 +1,216 @@
+"""
+Crea los índices que necesitan las consultas de los scripts del biographer y
+comprueba con `explain()` que ninguna de ellas recorre la colección entera
+(COLLSCAN).
+
+- INDEXES: índices compuestos y parciales de `artists` y `events`.
+- QUERIES: las consultas que hacen los scripts (filtro, orden y límite), con el
+  script del que salen. Si se añade una consulta nueva a un script, hay que
+  añadirla aquí.
+
+Nota: el índice `name` que crea el ojeador usa collation española, y las
+consultas por nombre del biographer (sin collation) no pueden usarlo; por eso
+se crea también `name_simple`.
+
+Uso:
+    python apps/biographer/ensure_indexes.py            # crea los índices y comprueba los planes
+    python apps/biographer/ensure_indexes.py --check    # solo comprueba los planes
+    python apps/biographer/ensure_indexes.py --seed 2000  # rellena una base local vacía antes de comprobar
+
+Sale con código 1 si alguna consulta usa COLLSCAN o no se pudo crear algún índice.
+"""
+import os
+import sys
+import random
+import argparse
+from pathlib import Path
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+import pymongo
+from pymongo import IndexModel, ASCENDING, DESCENDING
+import popularity
+import artist_repository
+import populate_event_sliders
+
+# Carga las variables de entorno desde la carpeta del script
+env_path = Path(__file__).parent / '.env'
+load_dotenv(dotenv_path=env_path)
+
+INDEXES = {
+    "artists": [
+        # biographer.py (pendientes por popularidad), índice, popularity.py, corrector_biografias.py
+        IndexModel([("hasProfilePage", ASCENDING), ("eventCount", DESCENDING)], name="profile_page_event_count"),
+        # Sliders de artistas, backfill_short_bios.py, rerender_profiles.py
+        IndexModel([("profileStatus", ASCENDING), ("eventCount", DESCENDING)], name="profile_status_event_count"),
+        # force_update_artist.py y populate_featured_artists.py buscan por nombre exacto, sin collation
+        IndexModel([("name", ASCENDING)], name="name_simple"),
+    ],
+    "events": [
+        # Actualización de los eventos futuros de un artista en biographer.py
+        IndexModel([("artist", ASCENDING), ("date", ASCENDING)], name="artist_date"),
+        # Slider de próximos eventos
+        IndexModel([("date", ASCENDING)], name="date"),
+        # Slider de destacados: solo una pequeña parte de los eventos lo son
+        IndexModel([("featured", ASCENDING)], name="featured_only",
+                   partialFilterExpression={"featured": True}),
+        # Slider de noches temáticas: los más recientes con plan de noche. MongoDB no
+        # admite índices parciales sobre `_id`, así que la clave empieza por el campo
+        # filtrado y solo los eventos con plan se ordenan por `_id`
+        IndexModel([("content.nightPlanMarkdown", ASCENDING), ("_id", DESCENDING)], name="night_plan_recent",
+                   partialFilterExpression={"content.nightPlanMarkdown": {"$exists": True}}),
+    ],
+}
+
+def build_queries():
+    """Consultas de los scripts: (script, colección, filtro, orden, límite)."""
+    today = datetime.now()
+    profile_queue = artist_repository.profile_queue(None)
+    correction_queue = artist_repository.correction_queue(None)
+    enrichment_queue = artist_repository.enrichment_queue(None)
+    slider_artists = {"profileStatus": "complete", "meta.main_artist_image_url": {"$exists": True, "$ne": ""}}
+    return [
+        # Reclamación de trabajos (find_one_and_update) de las colas de biographer.py y corrector_biografias.py
+        ("biographer.py", "artists", profile_queue.claim_filter(), profile_queue.sort, 1),
+        ("corrector_biografias.py", "artists", correction_queue.claim_filter(), correction_queue.sort, 1),
+        ("biographer.py (perfiles sin cuota)", "artists", enrichment_queue.claim_filter(), enrichment_queue.sort, 1),
+        ("generate_artist_index.py", "artists", popularity.PROFILE_QUERY, [("eventCount", DESCENDING)], 0),
+        ("popularity.py", "artists", {**popularity.PROFILE_QUERY, "eventCount": {"$gt": 0}}, None, 0),
+        ("generate_slider.py / populate_payload_sliders.py", "artists", slider_artists, [("eventCount", DESCENDING)], 10),
+        ("backfill_short_bios.py", "artists", {
+            "profileStatus": "complete",
+            "$or": [{"short_bio": {"$exists": False}}, {"meta.main_artist_image_url": {"$exists": False}}],
+        }, None, 0),
+        ("rerender_profiles.py", "artists",
+         {"hasProfilePage": True, "profileStatus": {"$in": ["complete", "placeholder"]}}, None, 0),
+        ("force_update_artist.py / populate_featured_artists.py", "artists", {"name": "Camarón de la Isla"}, None, 1),
+        ("biographer.py (eventos)", "events",
+         {"artist": "Camarón de la Isla", "date": {"$gte": today.strftime('%Y-%m-%d')}}, None, 0),
+    ] + [
+        # Cada rama $unionWith de populate_event_sliders.py se planifica como esta consulta
+        (f"populate_event_sliders.py ({title})", "events", query, list(sort.items()) if sort else None, 10)
+        for title, query, sort in populate_event_sliders.build_slider_queries()
+    ]
+
+def get_config():
+    """Carga y valida la configuración desde las variables de entorno."""
+    config = {
+        "MONGO_URI": os.getenv("MONGO_URI"),
+        "DB_NAME": os.getenv("DB_NAME", "duende-finder"),
+    }
+    for key, value in config.items():
+        if not value:
+            print(f"Error: La variable de entorno {key} no está configurada.")
+            sys.exit(1)
+    return config
+
+def parse_args():
+    """Lee los argumentos de línea de comandos."""
+    parser = argparse.ArgumentParser(description="Crea los índices del biographer y comprueba los planes de sus consultas.")
+    parser.add_argument("--check", action="store_true", help="No crea índices, solo comprueba los planes.")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Inserta N artistas (y 5N eventos) de prueba si las colecciones están vacías.")
+    return parser.parse_args()
+
+def ensure_indexes(db):
+    """Crea los índices que falten. Devuelve el número de índices que no se pudieron crear."""
+    failed = 0
+    for collection_name, indexes in INDEXES.items():
+        for index in indexes:
+            name = index.document["name"]
+            try:
+                db[collection_name].create_indexes([index])
+                print(f"  - {collection_name}.{name}: OK")
+            except pymongo.errors.OperationFailure as e:
+                # p. ej. un índice con las mismas claves y otro nombre creado a mano
+                failed += 1
+                print(f"  - {collection_name}.{name}: Error al crear el índice: {e}")
+    return failed
+
+def seed(db, artist_count):
+    """Rellena una base de datos vacía con datos sintéticos para que el planificador elija índices."""
+    if db.artists.estimated_document_count() or db.events.estimated_document_count():
+        print("Error: --seed solo se puede usar sobre una base de datos vacía.")
+        sys.exit(1)
+    print(f"Insertando {artist_count} artistas y {artist_count * 5} eventos de prueba...")
+    today = datetime.now()
+    artists = []
+    for i in range(artist_count):
+        artist = {"name": f"Artista {i}", "eventCount": random.randint(0, 50)}
+        if i % 3:
+            artist.update({
+                "hasProfilePage": True, "profilePageUrl": f"https://afland.es/artista-{i}/",
+                "profileStatus": random.choice(["complete", "complete", "placeholder"]),
+                "short_bio": "Bio", "meta": {"main_artist_image_url": f"https://example.com/{i}.jpg"},
+            })
+        artists.append(artist)
+    db.artists.insert_many(artists)
+    events = []
+    for i in range(artist_count * 5):
+        event = {
+            "artist": f"Artista {i % artist_count}",
+            "date": (today + timedelta(days=random.randint(-60, 120))).strftime('%Y-%m-%d'),
+        }
+        if i % 50 == 0:
+            event["featured"] = True
+        if i % 20 == 0:
+            event["content"] = {"nightPlanMarkdown": "## Plan de noche"}
+        events.append(event)
+    db.events.insert_many(events)
+
+def plan_stages(plan):
+    """Todas las etapas de un plan de `explain()` (también las de planes SBE anidados)."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from plan_stages(value)
+
+def check_query_plans(db):
+    """Ejecuta explain() sobre cada consulta. Devuelve las consultas que usan COLLSCAN."""
+    collscans = []
+    for script, collection_name, query, sort, limit in build_queries():
+        cursor = db[collection_name].find(query).limit(limit)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning_plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        stages = list(plan_stages(winning_plan))
+        status = "COLLSCAN" if "COLLSCAN" in stages else "OK"
+        print(f"  - [{status}] {script}: {collection_name} {query} -> {' > '.join(stages)}")
+        if status == "COLLSCAN":
+            collscans.append(script)
+    return collscans
+
+def main():
+    """Flujo principal del script."""
+    args = parse_args()
+    config = get_config()
+    try:
+        client = pymongo.MongoClient(config['MONGO_URI'])
+        db = client[config['DB_NAME']]
+        client.admin.command('ping')
+    except pymongo.errors.ConnectionFailure as e:
+        print(f"Error de conexión a MongoDB: {e}")
+        sys.exit(1)
+
+    if args.seed:
+        seed(db, args.seed)
+
+    failed = 0
+    if not args.check:
+        print("--- Creando índices ---")
+        failed = ensure_indexes(db)
+
+    print("--- Comprobando planes de consulta ---")
+    collscans = check_query_plans(db)
+    client.close()
+
+    if collscans or failed:
+        print(f"\n{len(collscans)} consultas con COLLSCAN y {failed} índices sin crear.")
+        sys.exit(1)
+    print("\nTodas las consultas usan índices.")
+
+if __name__ == "__main__":
+    main()
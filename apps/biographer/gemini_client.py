@@ -0,0 +1,185 @@
+"""
+Acceso compartido a Gemini para los scripts del biógrafo.
+
+Los modelos se obtienen con `get_model`, que configura la API una sola vez y
+reutiliza cada `GenerativeModel` durante todo el proceso.
+
+Todas las generaciones pasan por `generate_text`, que consulta primero la caché
+en disco (clave = modelo + hash del prompt) y solo llama a la API, respetando el
+limitador de tasa de Gemini, cuando no hay una respuesta válida guardada.
+
+Variables de entorno:
+- GEMINI_CACHE_TTL_DAYS: días de validez de una respuesta (por defecto 30).
+- GEMINI_CACHE_MAX_MB: tamaño máximo de la caché antes de expulsar por LRU (por defecto 100).
+- GEMINI_BATCH_SIZE: artistas por petición en `generate_batch` (por defecto 20).
+- BIOGRAPHER_CACHE_BYPASS=1: ignora la caché al leer (ver disk_cache).
+"""
+import os
+import json
+import hashlib
+import threading
+import google.generativeai as genai
+import disk_cache
+import rate_limiter
+
+DEFAULT_MODEL = 'gemini-1.5-flash'
+CACHE_NAMESPACE = "gemini"
+
+_models = {}
+_models_lock = threading.Lock()
+_configured_api_key = None
+
+# Salida estructurada de las peticiones por lotes: un objeto por artista.
+BATCH_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": {
+                "artist": {"type": "string"},
+                "text": {"type": "string"},
+            },
+            "required": ["artist", "text"],
+        },
+    },
+}
+
+def get_model(api_key, model_name=DEFAULT_MODEL):
+    """Devuelve un `GenerativeModel` reutilizable, configurando la API solo la primera vez."""
+    global _configured_api_key
+    with _models_lock:
+        if _configured_api_key != api_key:
+            genai.configure(api_key=api_key)
+            _configured_api_key = api_key
+            _models.clear()
+        model = _models.get(model_name)
+        if model is None:
+            model = genai.GenerativeModel(model_name)
+            _models[model_name] = model
+        return model
+
+def _get_cache():
+    ttl_days = float(os.getenv("GEMINI_CACHE_TTL_DAYS", "30"))
+    max_mb = float(os.getenv("GEMINI_CACHE_MAX_MB", "100"))
+    return disk_cache.get_cache(CACHE_NAMESPACE, ttl_days * 86400, int(max_mb * 1024 * 1024))
+
+def cache_key(model_name, prompt, generation_config=None):
+    """Clave direccionada por contenido: hash SHA-256 de modelo + prompt (+ configuración)."""
+    material = f"{model_name}\n{prompt}"
+    if generation_config:
+        material += "\n" + json.dumps(generation_config, sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+def generate_text(model, prompt, validate=None, generation_config=None):
+    """
+    Devuelve el texto generado por `model` para `prompt`, usando la caché.
+
+    Si se indica `validate`, una respuesta solo se guarda (y una entrada cacheada
+    solo se reutiliza) cuando `validate(texto)` es verdadero, para no perpetuar
+    respuestas que el llamador no sabe interpretar.
+    """
+    cache = _get_cache()
+    key = cache_key(model.model_name, prompt, generation_config)
+    cached = cache.get(key)
+    if cached is not None and (validate is None or validate(cached)):
+        return cached
+
+    rate_limiter.acquire("gemini")
+    if generation_config:
+        response = model.generate_content(prompt, generation_config=generation_config)
+    else:
+        response = model.generate_content(prompt)
+    text = response.text
+    if validate is None or validate(text):
+        cache.set(key, text)
+    return text
+
+def generate_json(model, prompt, schema, validate=None):
+    """
+    Genera una respuesta en modo JSON restringida por `schema` y la devuelve ya
+    parseada. Lanza ValueError si la respuesta no es JSON o no pasa `validate`.
+    """
+    generation_config = {"response_mime_type": "application/json", "response_schema": schema}
+
+    def _is_valid(text):
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return False
+        return validate(data) if validate else True
+
+    text = generate_text(model, prompt, validate=_is_valid, generation_config=generation_config)
+    if not _is_valid(text):
+        raise ValueError(f"Respuesta JSON no válida de Gemini: {text[:200]}")
+    return json.loads(text)
+
+def is_json_response(text):
+    """Indica si `text`, sin los posibles marcadores de bloque de código, es JSON válido."""
+    cleaned = text.replace('```json', '').replace('```', '').strip()
+    try:
+        json.loads(cleaned)
+        return True
+    except ValueError:
+        return False
+
+def _split_batch_response(text, names):
+    """Valida la respuesta de un lote y devuelve {artista: texto} solo con los elementos correctos."""
+    cleaned = text.replace('```json', '').replace('```', '').strip()
+    try:
+        data = json.loads(cleaned)
+    except ValueError:
+        return {}
+    if not isinstance(data, list):
+        return {}
+    expected = set(names)
+    results = {}
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        artist = item.get("artist")
+        value = item.get("text")
+        if artist in expected and artist not in results and isinstance(value, str) and value.strip():
+            results[artist] = value.strip()
+    return results
+
+def generate_batch(model, names, instruction, fallback=None, batch_size=None):
+    """
+    Genera un texto corto para varios artistas con una sola petición por lote.
+
+    `instruction` describe qué escribir para cada artista. Cada lote se pide con
+    salida JSON estructurada ([{"artist", "text"}]) y se valida elemento a
+    elemento; los artistas que falten o vengan mal se generan uno a uno con
+    `fallback(nombre)` si se indica. Devuelve un diccionario {artista: texto}.
+    """
+    batch_size = batch_size or int(os.getenv("GEMINI_BATCH_SIZE", "20"))
+    names = list(dict.fromkeys(names))
+    results = {}
+    for start in range(0, len(names), batch_size):
+        chunk = names[start:start + batch_size]
+        print(f"Generando por lotes {len(chunk)} textos con Gemini ({start + len(chunk)}/{len(names)})...")
+        prompt = (
+            f"{instruction}\n"
+            "Responde únicamente con un array JSON que contenga un objeto por cada artista de la lista, "
+            "con las claves 'artist' (el nombre exactamente como aparece en la lista) y 'text'.\n"
+            f"ARTISTAS:\n{json.dumps(chunk, ensure_ascii=False)}"
+        )
+        try:
+            text = generate_text(model, prompt, validate=is_json_response, generation_config=BATCH_GENERATION_CONFIG)
+            results.update(_split_batch_response(text, chunk))
+        except Exception as e:
+            print(f"  - Error en la petición por lotes a Gemini: {e}")
+
+    missing = [name for name in names if name not in results]
+    if missing and fallback:
+        print(f"  - {len(missing)} artistas sin respuesta válida en los lotes. Generando uno a uno...")
+        for name in missing:
+            value = fallback(name)
+            if value:
+                results[name] = value
+    return results
+
+def print_cache_stats():
+    """Muestra los aciertos y fallos de la caché de Gemini en esta ejecución."""
+    cache = _get_cache()
+    print(f"--- Caché de Gemini: {cache.hits} aciertos, {cache.misses} fallos ---")
@@ -1,17 +1,32 @@
 import os
 import sys
+import unicodedata
 from dotenv import load_dotenv
 import pymongo
-import requests
+from pymongo import UpdateOne
+import http_client
 from pathlib import Path
-import google.generativeai as genai
-import time
-import numpy as np
+import gemini_client
+import templates
+import wordpress_api
+from page_catalog import PageCatalog
+from publish_state import PublishState
+from bulk_writer import BulkWriter
+import popularity
+import artist_repository
+from quota_ledger import QuotaLedger
 
 # Carga las variables de entorno desde la carpeta del script
 env_path = Path(__file__).parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
+SEO_MODEL_NAME = 'gemini-1.5-flash'
+INDEX_SLUG = "artistas"
+INDEX_TITLE = "Índice de Artistas"
+# Secciones publicadas en la última ejecución (publish_state) y forma de sus slugs
+INDEX_SHARDS_KEY = "artist_index:shards"
+INDEX_SHARD_SLUG_PATTERN = rf"^{INDEX_SLUG}-([a-z]|otros)(-[0-9]+)?$"
+
 def get_config():
     """Carga y valida la configuración desde las variables de entorno."""
     config = {
@@ -40,9 +55,9 @@ def get_artists_from_db(config):
         db = client[config['DB_NAME']]
         artists_collection = db["artists"]
         
-        query = {"hasProfilePage": True, "profilePageUrl": {"$exists": True}}
-        
-        artists = list(artists_collection.find(query).sort("eventCount", -1))
+        # Los niveles de popularidad (llamas) se calculan en el servidor antes de leer los artistas
+        popularity.update_popularity_tiers(artists_collection)
+        artists = artist_repository.find_index_artists(artists_collection)
         client.close()
         print(f"Se encontraron {len(artists)} artistas con perfil.")
         return artists
@@ -53,134 +68,228 @@ def get_artists_from_db(config):
         print(f"Error al obtener artistas de la base de datos: {e}")
         return []
 
+def build_seo_prompt(artist_name):
+    """Construye el prompt de la frase SEO de un artista."""
+    return f"Genera una frase corta (máximo 25 palabras), atractiva y única para el/la artista flamenco/a {artist_name}. El objetivo es animar al usuario a hacer clic para leer su biografía completa. La frase debe ser optimizada para SEO. No incluyas el nombre del artista en la respuesta."
+
+def seo_sentence_hash(artist_name):
+    """Hash del modelo + prompt: si cambia el nombre o el prompt, la frase guardada deja de valer."""
+    return gemini_client.cache_key(SEO_MODEL_NAME, build_seo_prompt(artist_name))
+
+def default_seo_sentence(artist_name):
+    return f"Descubre la biografía completa de {artist_name} y su impacto en el mundo del flamenco."
+
 def generate_seo_sentence(artist_name, api_key):
-    """Genera una frase SEO única para un artista usando Gemini."""
+    """Genera una frase SEO única para un artista usando Gemini. Devuelve None si falla."""
     print(f"Generando frase SEO para {artist_name}...")
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    prompt = f"Genera una frase corta (máximo 25 palabras), atractiva y única para el/la artista flamenco/a {artist_name}. El objetivo es animar al usuario a hacer clic para leer su biografía completa. La frase debe ser optimizada para SEO. No incluyas el nombre del artista en la respuesta."
+    model = gemini_client.get_model(api_key, SEO_MODEL_NAME)
     try:
-        response = model.generate_content(prompt)
-        time.sleep(1) # Pausa para no exceder los límites de la API
-        return response.text.strip()
+        return gemini_client.generate_text(model, build_seo_prompt(artist_name)).strip()
     except Exception as e:
         print(f"  - Error al generar frase SEO para {artist_name}: {e}")
-        return f"Descubre la biografía completa de {artist_name} y su impacto en el mundo del flamenco."
+        return None
 
-def build_artist_index_html(artists, config):
-    """Construye el HTML para la página de índice de artistas."""
-    print("Construyendo el HTML del índice de artistas...")
+def generate_seo_sentences(artist_names, api_key):
+    """Genera las frases SEO de varios artistas en peticiones por lotes, con reintento individual."""
+    model = gemini_client.get_model(api_key, SEO_MODEL_NAME)
+    instruction = "Para cada artista flamenco/a de la lista, genera una frase corta (máximo 25 palabras), atractiva y única. El objetivo es animar al usuario a hacer clic para leer su biografía completa. La frase debe ser optimizada para SEO. No incluyas el nombre del artista en la frase."
+    return gemini_client.generate_batch(
+        model, artist_names, instruction,
+        fallback=lambda name: generate_seo_sentence(name, api_key)
+    )
 
-    # Calcula los umbrales de popularidad para las llamas
-    event_counts = [artist.get('eventCount', 0) for artist in artists if artist.get('eventCount', 0) > 0]
-    if event_counts:
-        p90 = np.percentile(event_counts, 90)
-        p70 = np.percentile(event_counts, 70)
-        p40 = np.percentile(event_counts, 40)
-    else:
-        p90, p70, p40 = 0, 0, 0
-
-    styles = """
-<style>
-    h1.entry-title { color: #000000 !important; }
-    .artist-grid { display: grid; grid-template-columns: repeat(auto-fill, minmax(280px, 1fr)); gap: 20px; padding: 20px; max-width: 1200px; margin: auto; }
-    .artist-card { position: relative; background-color: #fff; border-radius: 15px; overflow: hidden; box-shadow: 0 4px 8px rgba(0,0,0,0.1); transition: transform 0.3s ease, box-shadow 0.3s ease; display: flex; flex-direction: column; }
-    .artist-card:hover { transform: translateY(-5px); box-shadow: 0 8px 16px rgba(0,0,0,0.2); }
-    .artist-card-image { width: 100%; height: 200px; object-fit: cover; object-position: center top; }
-    .artist-card-flames { position: absolute; top: 15px; right: 15px; font-size: 1.8em; text-shadow: 0 0 3px rgba(0,0,0,0.5); }
-    .artist-card-content { padding: 20px; flex-grow: 1; display: flex; flex-direction: column; }
-    .artist-card-title { font-size: 1.5em; font-weight: bold; color: #26145F; margin: 0 0 10px 0; padding-right: 40px; } /* Espacio para las llamas */
-    .artist-card-bio { font-size: 1em; color: #333; margin-bottom: 20px; flex-grow: 1; }
-    .artist-card-button { display: inline-block; background-color: #E53935; color: #fff !important; padding: 10px 20px; border-radius: 5px; text-align: center; text-decoration: none; font-weight: bold; transition: background-color 0.3s ease; }
-    .artist-card-button:hover { background-color: #C62828; }
-    @media (max-width: 600px) { .artist-grid { padding: 10px; } }
-</style>
-"""
-
-    cards_html = ""
+def seo_gemini_calls(artist_count):
+    """Llamadas a Gemini que pueden hacer falta como mucho: una por lote y una por artista si el lote falla."""
+    batch_size = int(os.getenv("GEMINI_BATCH_SIZE", "20"))
+    return -(-artist_count // batch_size) + artist_count
+
+def update_seo_sentences(artists, db, config, ledger=None):
+    """
+    Genera la frase SEO solo para los artistas 'complete' que no la tienen o cuyo
+    hash ha cambiado, y la guarda en el documento del artista (`seo_sentence`,
+    `seo_sentence_hash`) para reutilizarla en las siguientes ejecuciones.
+
+    Con `ledger` (QuotaLedger) se reserva de antemano la cuota de Gemini del peor
+    caso; si no alcanza, solo se generan las frases de los primeros artistas
+    (los de más eventos) y el resto usa la frase por defecto.
+    """
+    complete_artists = [artist for artist in artists if artist.profile_status == "complete"]
+    pending = [
+        artist for artist in complete_artists
+        if not artist.seo_sentence or artist.seo_sentence_hash != seo_sentence_hash(artist.name or "")
+    ]
+    print(f"Frases SEO: {len(complete_artists) - len(pending)} reutilizadas, {len(pending)} por generar.")
+    if not pending:
+        return
+    reserved = 0
+    if ledger:
+        reserved = ledger.reserve("gemini", seo_gemini_calls(len(pending)), minimum=seo_gemini_calls(1))
+        if not reserved:
+            # Sin cuota el índice se publica igualmente, con la frase por defecto
+            print("No queda cuota diaria de Gemini: se usará la frase por defecto para los pendientes.")
+            return
+        while seo_gemini_calls(len(pending)) > reserved:
+            pending.pop()
+        print(f"Cuota de Gemini reservada para {len(pending)} frases SEO.")
+
+    try:
+        sentences = generate_seo_sentences([artist.name for artist in pending], config['GEMINI_API_KEY'])
+    finally:
+        if ledger:
+            # El gasto real ya está registrado; se devuelve la reserva
+            ledger.release("gemini", reserved)
+
+    writer = BulkWriter(db["artists"])
+    for artist in pending:
+        sentence = sentences.get(artist.name)
+        if not sentence:
+            continue
+        sentence_hash = seo_sentence_hash(artist.name)
+        artist.seo_sentence = sentence
+        artist.seo_sentence_hash = sentence_hash
+        writer.add(UpdateOne(
+            {"_id": artist.id},
+            {"$set": {"seo_sentence": sentence, "seo_sentence_hash": sentence_hash}}
+        ))
+
+    stats = writer.close()
+    print(f"Frases SEO guardadas en {stats['modified']} artistas.")
+
+def build_index_cards(artists):
+    """Construye los datos de la tarjeta de cada artista del índice."""
+    cards = []
     for artist in artists:
-        artist_name = artist.get("name", "Artista Desconocido")
-        profile_url = artist.get("profilePageUrl", "#")
-        profile_status = artist.get("profileStatus")
-        event_count = artist.get("eventCount", 0)
-        image_url = artist.get("meta", {}).get("main_artist_image_url") or "https://buscador.afland.es/assets/flamenco-placeholder.png"
-
-        if profile_status == "complete":
-            short_bio = generate_seo_sentence(artist_name, config['GEMINI_API_KEY'])
+        artist_name = artist.name or "Artista Desconocido"
+        if artist.profile_status == "complete":
+            short_bio = artist.seo_sentence or default_seo_sentence(artist_name)
         else:
             short_bio = "Biografía no disponible."
 
-        flames = ""
-        if event_count > 0:
-            if event_count >= p90:
-                flames = "🔥🔥🔥"
-            elif event_count >= p70:
-                flames = "🔥🔥"
-            elif event_count >= p40:
-                flames = "🔥"
-
-        cards_html += f"""
-        <div class="artist-card">
-            <img src="{image_url}" alt="Imagen de {artist_name}" class="artist-card-image">
-            <div class="artist-card-flames">{flames}</div>
-            <div class="artist-card-content">
-                <h3 class="artist-card-title">{artist_name}</h3>
-                <p class="artist-card-bio">{short_bio}</p>
-                <a href="{profile_url}" class="artist-card-button">Ver Biografía Completa</a>
-            </div>
-        </div>
-        """
-
-    return f"{styles}<div class='artist-grid'>{cards_html}</div>"
-
-def get_page_by_slug(config, slug):
-    """Obtiene una página de WordPress por su slug."""
-    print(f"Buscando página en WordPress con slug '{slug}'...")
-    wp_api_url = f"{config['WP_URL']}/wp-json/wp/v2/pages"
-    auth = (config['WP_USER'], config['WP_PASSWORD'])
-    params = {'slug': slug, 'per_page': 1}
-    try:
-        response = requests.get(wp_api_url, auth=auth, params=params, timeout=60)
-        response.raise_for_status()
-        pages = response.json()
-        if pages:
-            print(f"Página encontrada con ID: {pages[0]['id']}")
-            return pages[0]
-    except requests.exceptions.RequestException as e:
-        print(f"Error al buscar página en WordPress: {e}")
-    print("No se encontró una página coincidente.")
-    return None
-
-def create_or_update_page(config, page_id, title, content, slug):
-    """Crea o actualiza una página en WordPress."""
-    if page_id:
-        print(f"Actualizando página {page_id}...")
-        url = f"{config['WP_URL']}/wp-json/wp/v2/pages/{page_id}"
-    else:
-        print("Creando nueva página...")
-        url = f"{config['WP_URL']}/wp-json/wp/v2/pages"
+        cards.append({
+            "artist_name": artist_name,
+            "profile_url": artist.profile_page_url or "#",
+            "image_url": artist.image_url or templates.PLACEHOLDER_CARD_IMAGE_URL,
+            "short_bio": short_bio,
+            "flames": popularity.flames(artist.popularity_tier),
+        })
+    return cards
+
+def sort_key(name):
+    """Nombre sin tildes y en minúsculas, para agrupar y ordenar alfabéticamente."""
+    return unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii').strip().casefold()
+
+def index_letter(name):
+    """Inicial de la sección del índice: A-Z, o '#' para nombres que empiezan por otro carácter."""
+    key = sort_key(name)
+    return key[0].upper() if key and 'a' <= key[0] <= 'z' else "#"
+
+def build_index_shards(cards, page_size):
+    """
+    Reparte las tarjetas en secciones por inicial, ordenadas alfabéticamente, y
+    divide cada inicial en páginas de como máximo `page_size` artistas.
+    """
+    by_letter = {}
+    for card in sorted(cards, key=lambda card: sort_key(card["artist_name"])):
+        by_letter.setdefault(index_letter(card["artist_name"]), []).append(card)
+
+    shards = []
+    for letter in sorted(by_letter, key=lambda letter: (letter == "#", letter)):
+        letter_cards = by_letter[letter]
+        base_slug = f"{INDEX_SLUG}-{'otros' if letter == '#' else letter.lower()}"
+        pages = [letter_cards[i:i + page_size] for i in range(0, len(letter_cards), page_size)]
+        for number, page_cards in enumerate(pages, start=1):
+            shards.append({
+                "letter": letter,
+                "number": number,
+                "total": len(pages),
+                "slug": base_slug if number == 1 else f"{base_slug}-{number}",
+                "title": f"Artistas: {letter}" if number == 1 else f"Artistas: {letter} ({number})",
+                "cards": page_cards,
+            })
+    return shards
 
-    auth = (config['WP_USER'], config['WP_PASSWORD'])
+def build_index_pages(artists):
+    """
+    Devuelve las páginas del índice como [(slug, título, html)]: la portada
+    ('artistas', con los más populares) y una página por inicial (y por tramo de
+    INDEX_PAGE_SIZE artistas).
+    """
+    print("Construyendo el HTML del índice de artistas...")
+    page_size = int(os.getenv("INDEX_PAGE_SIZE", "150"))
+    featured_count = int(os.getenv("INDEX_FEATURED_COUNT", "24"))
+    cards = build_index_cards(artists)
+    shards = build_index_shards(cards, page_size)
+
+    # Enlaces relativos, como el botón 'Ver todos los artistas' del slider
+    first_pages = [shard for shard in shards if shard["number"] == 1]
+    def letter_links(current_letter=None):
+        return [(shard["letter"], f"/{shard['slug']}/", shard["letter"] == current_letter) for shard in first_pages]
+
+    # `artists` viene ordenado por eventCount: la portada muestra los más populares
+    pages = [(INDEX_SLUG, INDEX_TITLE, templates.render_artist_index(
+        cards[:featured_count], navigation=[letter_links()], heading="Artistas más populares"
+    ))]
+    for shard in shards:
+        navigation = [letter_links(shard["letter"])]
+        if shard["total"] > 1:
+            siblings = [other for other in shards if other["letter"] == shard["letter"]]
+            navigation.append([(str(other["number"]), f"/{other['slug']}/", other is shard) for other in siblings])
+        pages.append((shard["slug"], shard["title"], templates.render_artist_index(shard["cards"], navigation=navigation)))
+    print(f"Índice dividido en {len(shards)} páginas de sección más la portada.")
+    return pages
+
+def publish_index_page(pages_writer, catalog, publish_state, slug, title, content):
+    """Encola la creación o actualización de una página del índice si su contenido ha cambiado."""
     data = {
         "title": title,
         "content": content,
         "status": "publish",
         "slug": slug
     }
+    existing_page = catalog.find_by_slug(slug)
+    page_id = existing_page['_id'] if existing_page else None
+    if page_id and publish_state.is_unchanged(f"wp_page:{page_id}", data):
+        return
 
-    try:
-        response = requests.post(url, auth=auth, json=data, headers={"Content-Type": "application/json"}, timeout=30)
-        if response.status_code in [200, 201]:
-            page_data = response.json()
-            print(f"¡Página '{title}' guardada con éxito! URL: {page_data['link']}")
-            return page_data['link']
-        else:
-            print(f"Error al guardar en WordPress: {response.status_code}")
-            print(response.text)
-            return None
-    except requests.exceptions.RequestException as e:
-        print(f"Error de comunicación con WordPress: {e}")
-        return None
+    def on_saved(status, page_data):
+        if status not in (200, 201):
+            print(f"Error al guardar la página '{title}' en WordPress: {status}")
+            return
+        print(f"¡Página '{title}' guardada con éxito! URL: {page_data['link']}")
+        catalog.record(page_data)
+        publish_state.record(f"wp_page:{page_data['id']}", data)
+
+    if page_id:
+        pages_writer.update_page(page_id, data, on_saved)
+    else:
+        pages_writer.create_page(data, on_saved)
+
+def retire_stale_index_pages(pages_writer, catalog, publish_state, slugs):
+    """
+    Encola el envío a la papelera de las secciones del índice publicadas antes y
+    que esta ejecución ya no genera (una inicial sin artistas o con menos tramos).
+    Las secciones publicadas se leen de publish_state o, la primera vez, del
+    catálogo por la forma del slug. Devuelve la lista (que se rellena al enviar
+    el lote) de los slugs que no se pudieron retirar.
+    """
+    previous = publish_state.get(INDEX_SHARDS_KEY)
+    known = previous.get("slugs", []) if previous else catalog.find_slugs(INDEX_SHARD_SLUG_PATTERN)
+    failed = []
+    for slug in sorted(set(known) - set(slugs)):
+        entry = catalog.find_by_slug(slug)
+        if not entry:
+            continue
+        print(f"La sección '{slug}' ya no se genera. Se envía a la papelera.")
+
+        def on_trashed(status, page_data, slug=slug, page_id=entry["_id"]):
+            if status == 200:
+                catalog.forget(page_id)
+            else:
+                print(f"Error al retirar la sección '{slug}': {status}")
+                failed.append(slug)
+
+        pages_writer.trash_page(entry["_id"], on_trashed)
+    return failed
 
 def main():
     """Flujo principal del script."""
@@ -193,15 +302,34 @@ def main():
         print("No hay artistas para generar el índice. Saliendo.")
         return
 
-    index_html = build_artist_index_html(artists, config)
-    
-    page_title = "Índice de Artistas"
-    page_slug = "artistas"
-    
-    existing_page = get_page_by_slug(config, page_slug)
-    page_id = existing_page['id'] if existing_page else None
-    
-    create_or_update_page(config, page_id, page_title, index_html, page_slug)
+    client = pymongo.MongoClient(config['MONGO_URI'])
+    try:
+        db = client[config['DB_NAME']]
+        ledger = QuotaLedger(db).install()
+        update_seo_sentences(artists, db, config, ledger)
+        index_pages = build_index_pages(artists)
+
+        catalog = PageCatalog(db, config)
+        catalog.sync()
+
+        # Solo se envían las secciones cuyo HTML ha cambiado (publish_state), en peticiones por lotes
+        publish_state = PublishState(db)
+        pages_writer = wordpress_api.PageBatchWriter(config, catalog=catalog)
+        for slug, title, content in index_pages:
+            publish_index_page(pages_writer, catalog, publish_state, slug, title, content)
+        slugs = [slug for slug, _, _ in index_pages]
+        failed = retire_stale_index_pages(pages_writer, catalog, publish_state, slugs)
+        pages_writer.close()
+        # Las que no se pudieron retirar se vuelven a intentar en la próxima ejecución
+        published_slugs = sorted(set(slugs) | set(failed))
+        publish_state.record(INDEX_SHARDS_KEY, published_slugs, slugs=published_slugs)
+        pages_writer.print_stats()
+        publish_state.print_stats()
+        ledger.print_stats()
+    finally:
+        client.close()
+    gemini_client.print_cache_stats()
+    http_client.print_stats()
     
     print("--- Proceso finalizado ---")
 
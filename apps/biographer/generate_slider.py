@@ -3,6 +3,7 @@ import sys
 from dotenv import load_dotenv
 import pymongo
 from pathlib import Path
+import templates
 
 # Carga las variables de entorno
 env_path = Path(__file__).parent / '.env'
@@ -36,177 +37,14 @@ def get_top_artists(db, limit=10):
 def build_slider_code(artists):
     """Construye el código HTML, CSS y JS para el slider de artistas."""
     print("Construyendo el código del slider...")
-
-    # --- HTML ---
-    cards_html = ""
-    for artist in artists:
-        artist_name = artist.get("name", "Artista Desconocido")
-        profile_url = artist.get("profilePageUrl", "#")
-        image_url = artist.get("meta", {}).get("main_artist_image_url") or "https://buscador.afland.es/assets/flamenco-placeholder.png"
-        
-        cards_html += f"""
-        <div class="swiper-slide">
-            <div class="artist-card">
-                <img src="{image_url}" alt="Imagen de {artist_name}" class="artist-card-image">
-                <div class="artist-card-content">
-                    <h3 class="artist-card-title">{artist_name}</h3>
-                    <a href="{profile_url}" class="artist-card-button">Ver Biografía</a>
-                </div>
-            </div>
-        </div>
-        """
-
-    html_structure = f"""
-    <!-- Slider main container -->
-    <div class="swiper artist-slider">
-        <div class="swiper-wrapper">
-            {cards_html}
-        </div>
-        <!-- Add Pagination -->
-        <div class="swiper-pagination"></div>
-        <!-- Add Navigation -->
-        <div class="swiper-button-next"></div>
-        <div class="swiper-button-prev"></div>
-    </div>
-    <div style="text-align: center; margin-top: 20px;">
-        <a href="/artistas/" class="slider-main-button">Ver todos los artistas</a>
-    </div>
-    """
-
-    # --- CSS ---
-    css_styles = """
-    <style>
-        /* Estilos para el contenedor del slider y el botón principal */
-        .artist-slider-container {
-            padding: 20px;
-            background: #170837;
-        }
-        .artist-slider {
-            width: 100%;
-            height: 100%;
-            padding-bottom: 40px; /* Espacio para la paginación */
-        }
-        .swiper-slide {
-            display: flex;
-            justify-content: center;
-            align-items: center;
-        }
-        .slider-main-button {
-            display: inline-block;
-            background-color: #26145F;
-            color: #fff !important;
-            padding: 12px 25px;
-            border-radius: 5px;
-            text-align: center;
-            text-decoration: none;
-            font-weight: bold;
-            transition: background-color 0.3s ease;
-        }
-        .slider-main-button:hover {
-            background-color: #1a0e4a;
-        }
-
-        /* Estilos de las tarjetas (similares al índice) */
-        .artist-card {
-            width: 280px;
-            background-color: #fff;
-            border-radius: 15px;
-            overflow: hidden;
-            box-shadow: 0 4px 8px rgba(0,0,0,0.1);
-            transition: transform 0.3s ease, box-shadow 0.3s ease;
-            display: flex;
-            flex-direction: column;
-            height: 350px;
-        }
-        .artist-card:hover {
-            transform: translateY(-5px);
-            box-shadow: 0 8px 16px rgba(0,0,0,0.2);
+    return templates.render_slider(
+        {
+            "artist_name": artist.get("name", "Artista Desconocido"),
+            "profile_url": artist.get("profilePageUrl", "#"),
+            "image_url": artist.get("meta", {}).get("main_artist_image_url") or templates.PLACEHOLDER_CARD_IMAGE_URL,
         }
-        .artist-card-image {
-            width: 100%;
-            height: 200px;
-            object-fit: cover;
-            object-position: center top;
-        }
-        .artist-card-content {
-            padding: 20px;
-            flex-grow: 1;
-            display: flex;
-            flex-direction: column;
-            justify-content: center;
-            text-align: center;
-        }
-        .artist-card-title {
-            font-size: 1.5em;
-            font-weight: bold;
-            color: #26145F;
-            margin: 0 0 15px 0;
-        }
-        .artist-card-button {
-            display: inline-block;
-            background-color: #E53935;
-            color: #fff !important;
-            padding: 10px 20px;
-            border-radius: 5px;
-            text-align: center;
-            text-decoration: none;
-            font-weight: bold;
-            transition: background-color 0.3s ease;
-        }
-        .artist-card-button:hover {
-            background-color: #C62828;
-        }
-
-        /* Estilos para la navegación de Swiper */
-        .swiper-button-next, .swiper-button-prev {
-            color: #26145F;
-        }
-        .swiper-pagination-bullet-active {
-            background: #26145F;
-        }
-    </style>
-    """
-
-    # --- JavaScript ---
-    js_code = """
-    <script src="https://unpkg.com/swiper/swiper-bundle.min.js"></script>
-    <script>
-        document.addEventListener('DOMContentLoaded', function () {
-            var swiper = new Swiper('.artist-slider', {
-                slidesPerView: 1,
-                spaceBetween: 30,
-                loop: true,
-                pagination: {
-                    el: '.swiper-pagination',
-                    clickable: true,
-                },
-                navigation: {
-                    nextEl: '.swiper-button-next',
-                    prevEl: '.swiper-button-prev',
-                },
-                breakpoints: {
-                    640: {
-                        slidesPerView: 2,
-                        spaceBetween: 20,
-                    },
-                    768: {
-                        slidesPerView: 3,
-                        spaceBetween: 40,
-                    },
-                    1024: {
-                        slidesPerView: 3,
-                        spaceBetween: 50,
-                    },
-                }
-            });
-        });
-    </script>
-    """
-    
-    # --- Swiper CSS ---
-    swiper_css = '<link rel="stylesheet" href="https://unpkg.com/swiper/swiper-bundle.min.css" />'
-
-    return f"{swiper_css}\n{css_styles}\n<div class='artist-slider-container'>{html_structure}</div>\n{js_code}"
+        for artist in artists
+    )
 
 def main():
     """Flujo principal del script."""
@@ -0,0 +1,31 @@
+"""
+Clientes reutilizables de las APIs de Google (YouTube y Custom Search).
+
+`build()` descarga y parsea el documento de discovery en cada llamada. Aquí cada
+servicio se construye una sola vez a partir del documento estático que incluye
+google-api-python-client (`static_discovery=True`, sin red) y se reutiliza en
+las siguientes búsquedas. La caché es por hilo porque los objetos de servicio
+(httplib2) no son seguros para compartir entre hilos.
+"""
+import threading
+from googleapiclient.discovery import build
+
+_local = threading.local()
+
+def get_service(service_name, version, api_key):
+    """Devuelve el cliente de `service_name`/`version` del hilo actual, construyéndolo una vez."""
+    services = getattr(_local, "services", None)
+    if services is None:
+        services = _local.services = {}
+    key = (service_name, version, api_key)
+    service = services.get(key)
+    if service is None:
+        service = build(service_name, version, developerKey=api_key, static_discovery=True, cache_discovery=False)
+        services[key] = service
+    return service
+
+def youtube(api_key):
+    return get_service("youtube", "v3", api_key)
+
+def custom_search(api_key):
+    return get_service("customsearch", "v1", api_key)
@@ -0,0 +1,105 @@
+"""
+Cliente HTTP compartido por los scripts del biógrafo (WordPress y Payload).
+
+Todas las llamadas usan una única `requests.Session` con keep-alive y pool de
+conexiones, de modo que solo la primera petición a cada host paga el handshake
+TCP+TLS. Se aplican timeouts por defecto y reintentos con backoff exponencial
+con jitter ante 429 y 5xx (los 5xx solo en métodos idempotentes, para no
+duplicar creaciones de páginas o sliders).
+
+Variables de entorno:
+- HTTP_CONNECT_TIMEOUT / HTTP_READ_TIMEOUT: segundos (por defecto 10 / 30).
+- HTTP_MAX_RETRIES: reintentos por petición (por defecto 3).
+- HTTP_POOL_MAXSIZE: conexiones por host en el pool (por defecto 20).
+"""
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+class _RetryPolicy(Retry):
+    """Reintenta 429 en cualquier método (la petición no se procesó) y 5xx solo en los idempotentes."""
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if status_code == 429:
+            return True
+        return super().is_retry(method, status_code, has_retry_after)
+
+class _Session(requests.Session):
+    """Sesión que aplica el timeout por defecto cuando la llamada no indica uno."""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.default_timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.default_timeout)
+        return super().request(method, url, **kwargs)
+
+_session = None
+_adapter = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Devuelve la sesión compartida del proceso, creándola en el primer uso."""
+    global _session, _adapter
+    with _session_lock:
+        if _session is None:
+            timeout = (
+                float(os.getenv("HTTP_CONNECT_TIMEOUT", "10")),
+                float(os.getenv("HTTP_READ_TIMEOUT", "30")),
+            )
+            retries = _RetryPolicy(
+                total=int(os.getenv("HTTP_MAX_RETRIES", "3")),
+                backoff_factor=1,
+                backoff_jitter=1,
+                status_forcelist=RETRY_STATUS_CODES,
+                raise_on_status=False,
+            )
+            pool_size = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+            _adapter = HTTPAdapter(pool_connections=10, pool_maxsize=pool_size, max_retries=retries)
+            _session = _Session(timeout)
+            _session.mount("https://", _adapter)
+            _session.mount("http://", _adapter)
+        return _session
+
+def request(method, url, **kwargs):
+    return get_session().request(method, url, **kwargs)
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+def patch(url, **kwargs):
+    return request("PATCH", url, **kwargs)
+
+def head(url, **kwargs):
+    return request("HEAD", url, **kwargs)
+
+def get_stats():
+    """Peticiones enviadas y conexiones abiertas por los pools de la sesión."""
+    stats = {"requests": 0, "connections": 0}
+    if _adapter is None:
+        return stats
+    pools = _adapter.poolmanager.pools
+    for key in pools.keys():
+        pool = pools.get(key)
+        if pool is None:
+            continue
+        stats["requests"] += pool.num_requests
+        stats["connections"] += pool.num_connections
+    return stats
+
+def print_stats():
+    """Muestra cuántas peticiones HTTP han reutilizado una conexión abierta."""
+    stats = get_stats()
+    if not stats["requests"]:
+        return
+    reused = max(0, stats["requests"] - stats["connections"])
+    print(f"--- HTTP: {stats['requests']} peticiones, {stats['connections']} conexiones nuevas, "
+          f"{reused} reutilizadas ({reused * 100 / stats['requests']:.0f}%) ---")
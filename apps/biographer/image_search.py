@@ -0,0 +1,292 @@
+"""
+Búsqueda de la imagen principal de un artista con Google Custom Search.
+
+Primero se lanza solo la consulta más prioritaria y se comprueban sus
+resultados: si alguno es una imagen válida y de tamaño suficiente, no se gasta
+ninguna consulta más (la cuota de Custom Search es de 100 consultas al día).
+Solo si no hay ninguna aceptable se lanzan las demás consultas en paralelo (con
+un máximo de IMAGE_SEARCH_PARALLELISM simultáneas, por defecto 3); sus
+resultados se comprueban en orden de prioridad, sin repetir URLs ya comprobadas,
+y las consultas pendientes se cancelan en cuanto aparece una imagen aceptable.
+Si ninguna lo es, se elige la mejor válida entre todas las comprobadas.
+
+Antes de elegir, los mejores candidatos se comprueban en paralelo con peticiones
+GET con Range (o HEAD si el servidor no acepta rangos): se descartan las URLs que
+no cargan, que no son imágenes o que pesan demasiado, y se ordenan de forma
+determinista por calidad (resolución y formato retrato/cuadrado), prioridad de
+la consulta y resolución. Los resultados definitivos de cada comprobación (imagen
+válida, demasiado grande o HTTP 404/410) se guardan en la caché en disco para no
+comprobar dos veces la misma URL; los errores de red, 5xx o 429 no se cachean.
+
+Variables de entorno: IMAGE_RESULTS_PER_QUERY (3), IMAGE_PROBE_CANDIDATES (3),
+IMAGE_PROBE_PARALLELISM (4), IMAGE_MAX_BYTES (5 MB), IMAGE_MIN_SIDE (300 px),
+IMAGE_PROBE_TTL_DAYS (7).
+"""
+import os
+import struct
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import requests
+import disk_cache
+import google_clients
+import http_client
+import rate_limiter
+
+PROBE_CACHE_NAMESPACE = "image_probe"
+PROBE_RANGE_BYTES = 65535
+PROBE_TIMEOUT = (5, 10)
+
+def default_search_queries(artist_name):
+    return [
+        f"{artist_name} flamenco retrato primer plano",
+        f"{artist_name} actuando en directo",
+        f"{artist_name} flamenco"
+    ]
+
+def _search(api_key, cx_id, query):
+    """Ejecuta una consulta de imágenes y devuelve sus resultados."""
+    rate_limiter.acquire("custom_search")
+    service = google_clients.custom_search(api_key)
+    num = int(os.getenv("IMAGE_RESULTS_PER_QUERY", "3"))
+    res = service.cse().list(q=query, cx=cx_id, searchType='image', num=num).execute()
+    return res.get('items', [])
+
+def _metadata_rank(item):
+    """Orden secundario entre imágenes de la misma consulta: mayor resolución primero."""
+    image = item.get('image', {})
+    area = int(image.get('width') or 0) * int(image.get('height') or 0)
+    return (-area, item.get('link', ''))
+
+def rank_candidates(results_by_priority):
+    """Ordena los candidatos {prioridad: [items]} por prioridad de consulta y metadatos."""
+    candidates = []
+    for priority, items in results_by_priority.items():
+        for item in items:
+            if item.get('link'):
+                candidates.append(((priority,) + _metadata_rank(item), priority, item))
+    candidates.sort(key=lambda candidate: candidate[0])
+    return [(priority, item) for _, priority, item in candidates]
+
+# --- COMPROBACIÓN DE CANDIDATOS ---
+
+def _image_size_from_header(data):
+    """Obtiene (ancho, alto) de los primeros bytes de un PNG, GIF, JPEG o WebP, o None."""
+    try:
+        if data[:8] == b'\x89PNG\r\n\x1a\n':
+            return struct.unpack('>II', data[16:24])
+        if data[:6] in (b'GIF87a', b'GIF89a'):
+            return struct.unpack('<HH', data[6:10])
+        if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+            chunk = data[12:16]
+            if chunk == b'VP8 ':
+                width, height = struct.unpack('<HH', data[26:30])
+                return width & 0x3fff, height & 0x3fff
+            if chunk == b'VP8L':
+                bits = int.from_bytes(data[21:25], 'little')
+                return (bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1
+            if chunk == b'VP8X':
+                return int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+        if data[:2] == b'\xff\xd8':
+            offset = 2
+            while offset + 9 < len(data):
+                if data[offset] != 0xFF:
+                    offset += 1
+                    continue
+                marker = data[offset + 1]
+                if marker in (0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF):
+                    height, width = struct.unpack('>HH', data[offset + 5:offset + 9])
+                    return width, height
+                segment_length = struct.unpack('>H', data[offset + 2:offset + 4])[0]
+                offset += 2 + segment_length
+    except struct.error:
+        pass
+    return None
+
+def _total_size(response):
+    """Tamaño total del recurso a partir de Content-Range o Content-Length, o None si no se conoce."""
+    content_range = response.headers.get('Content-Range', '')
+    try:
+        if '/' in content_range and not content_range.endswith('/*'):
+            return int(content_range.rsplit('/', 1)[1])
+        if response.status_code == 200 and response.headers.get('Content-Length'):
+            return int(response.headers['Content-Length'])
+    except ValueError:
+        # Cabecera mal formada: se trata como tamaño desconocido
+        pass
+    return None
+
+def _fetch_probe(url, max_bytes):
+    """Comprueba una URL sin descargar la imagen completa."""
+    result = {"ok": False, "reason": None, "content_type": None, "bytes": None, "width": None, "height": None}
+    header_bytes = b''
+    try:
+        # Un GET con Range da estado, tipo, tamaño total y la cabecera de la imagen en una sola petición
+        response = http_client.get(
+            url, headers={"Range": f"bytes=0-{PROBE_RANGE_BYTES}"},
+            allow_redirects=True, stream=True, timeout=PROBE_TIMEOUT
+        )
+        try:
+            if response.ok:
+                header_bytes = next(response.iter_content(PROBE_RANGE_BYTES + 1), b'')
+        finally:
+            response.close()
+        if response.status_code in (405, 416):
+            # Servidores que no aceptan el rango: basta con las cabeceras
+            response = http_client.head(url, allow_redirects=True, timeout=PROBE_TIMEOUT)
+    except requests.exceptions.RequestException as e:
+        result["reason"] = f"error: {e.__class__.__name__}"
+        return result
+
+    content_type = response.headers.get('Content-Type', '')
+    size = _total_size(response)
+    result["content_type"] = content_type
+    result["bytes"] = size
+    if not response.ok:
+        result["reason"] = f"HTTP {response.status_code}"
+        # Solo una URL que ya no existe es un fallo definitivo; 5xx, 429 y demás pueden ser pasajeros
+        result["definitive"] = response.status_code in (404, 410)
+        return result
+    if not content_type.startswith('image/'):
+        result["reason"] = f"no es una imagen ({content_type or 'sin Content-Type'})"
+        return result
+    if size and size > max_bytes:
+        result["reason"] = f"demasiado grande ({size} bytes)"
+        result["definitive"] = True
+        return result
+    dimensions = _image_size_from_header(header_bytes)
+    if dimensions:
+        result["width"], result["height"] = dimensions
+    result["ok"] = True
+    result["definitive"] = True
+    return result
+
+def probe_image(url):
+    """Devuelve el resultado (cacheado) de comprobar que `url` es una imagen válida."""
+    ttl_days = float(os.getenv("IMAGE_PROBE_TTL_DAYS", "7"))
+    cache = disk_cache.get_cache(PROBE_CACHE_NAMESPACE, ttl_days * 86400, 5 * 1024 * 1024)
+    cached = cache.get(url)
+    if cached is not None:
+        return cached
+    result = _fetch_probe(url, int(os.getenv("IMAGE_MAX_BYTES", str(5 * 1024 * 1024))))
+    # Los errores de red o del servidor pueden ser pasajeros: solo se cachean los resultados definitivos
+    if result.get("definitive"):
+        cache.set(url, result)
+    return result
+
+def _quality(probe, item):
+    """Devuelve (nivel de calidad, área) de un candidato comprobado."""
+    metadata = item.get('image', {})
+    width = probe.get("width") or int(metadata.get('width') or 0)
+    height = probe.get("height") or int(metadata.get('height') or 0)
+    if not width or not height:
+        return 1, 0
+    min_side = int(os.getenv("IMAGE_MIN_SIDE", "300"))
+    if min(width, height) < min_side:
+        return 0, width * height
+    aspect = width / height
+    # Las tarjetas recortan con object-fit: cover, así que se prefieren retratos y cuadrados
+    level = 3 if 0.6 <= aspect <= 1.1 else 2 if aspect <= 1.6 else 1
+    return level, width * height
+
+def probe_candidates(ranked, probed):
+    """
+    Comprueba en paralelo los IMAGE_PROBE_CANDIDATES primeros candidatos
+    [(prioridad, item)] cuyo enlace no esté aún en `probed` (que se actualiza) y
+    devuelve [(clave de orden, item)] de los que son imágenes válidas.
+    """
+    limit = int(os.getenv("IMAGE_PROBE_CANDIDATES", "3"))
+    candidates = [candidate for candidate in ranked if candidate[1]['link'] not in probed][:limit]
+    if not candidates:
+        return []
+    probed.update(item['link'] for _, item in candidates)
+    parallelism = max(1, min(len(candidates), int(os.getenv("IMAGE_PROBE_PARALLELISM", "4"))))
+    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+        probes = list(executor.map(lambda candidate: probe_image(candidate[1]['link']), candidates))
+
+    scored = []
+    for (priority, item), probe in zip(candidates, probes):
+        if not probe.get("ok"):
+            print(f"    - Descartada {item['link']}: {probe.get('reason')}")
+            continue
+        level, area = _quality(probe, item)
+        scored.append(((-level, priority, -area, item['link']), item))
+    return scored
+
+def _best(scored, min_level=0):
+    """Devuelve el mejor item de [(clave de orden, item)] con nivel de al menos `min_level`, o None."""
+    eligible = [candidate for candidate in scored if -candidate[0][0] >= min_level]
+    if not eligible:
+        return None
+    return min(eligible, key=lambda candidate: candidate[0])[1]
+
+def choose_best_candidate(ranked, min_level=0):
+    """
+    Comprueba en paralelo los candidatos [(prioridad, item)] y devuelve el mejor
+    item válido con nivel de calidad de al menos `min_level`, o None.
+    """
+    return _best(probe_candidates(ranked, set()), min_level)
+
+def find_main_image(artist_name, api_key, cx_id, search_queries=None):
+    """Busca una imagen principal usando Google Custom Search con varias consultas."""
+    print(f"Buscando imagen principal para {artist_name} con consultas mejoradas...")
+
+    # Si la IA no ha devuelto consultas, usa las de por defecto
+    if not search_queries:
+        search_queries = default_search_queries(artist_name)
+
+    probed = set()
+    scored = []
+
+    def accept(priority, items):
+        """Comprueba los resultados de una consulta y devuelve la mejor imagen aceptable hasta ahora."""
+        scored.extend(probe_candidates(rank_candidates({priority: items}), probed))
+        # Aceptable: válida y no demasiado pequeña
+        return _best(scored, min_level=1)
+
+    print(f"  - Lanzando la consulta: '{search_queries[0]}'")
+    try:
+        best = accept(0, _search(api_key, cx_id, search_queries[0]))
+    except Exception as e:
+        print(f"    - Error en la consulta '{search_queries[0]}': {e}")
+        best = None
+
+    remaining = list(enumerate(search_queries))[1:]
+    if not best and remaining:
+        parallelism = max(1, min(len(remaining), int(os.getenv("IMAGE_SEARCH_PARALLELISM", "3"))))
+        executor = ThreadPoolExecutor(max_workers=parallelism)
+        try:
+            pending = set()
+            priorities = {}
+            for priority, query in remaining:
+                print(f"  - Lanzando la consulta: '{query}'")
+                future = executor.submit(_search, api_key, cx_id, query)
+                priorities[future] = priority
+                pending.add(future)
+            results = {}
+            next_priority = 1
+            # Los resultados se comprueban en orden de prioridad según van llegando:
+            # en cuanto una consulta da una imagen aceptable y todas las más
+            # prioritarias ya se han descartado, se cancelan las pendientes.
+            while not best and next_priority < len(search_queries):
+                if next_priority not in results:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        priority = priorities[future]
+                        try:
+                            results[priority] = future.result()
+                        except Exception as e:
+                            print(f"    - Error en la consulta '{search_queries[priority]}': {e}")
+                            results[priority] = []
+                    continue
+                best = accept(next_priority, results.pop(next_priority))
+                next_priority += 1
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    # Si ninguna es aceptable, se usa la mejor válida aunque sea pequeña
+    best = best or _best(scored)
+    if best:
+        print(f"  ✅ Imagen encontrada con éxito: {best['link']}")
+        return best['link']
+
+    print("  - No se encontró ninguna imagen válida tras varios intentos.")
+    return None
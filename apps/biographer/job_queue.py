@@ -0,0 +1,152 @@
+"""
+Cola de trabajos sobre una colección de MongoDB, con reparto por leases.
+
+El estado de cada trabajo se guarda en el propio documento, en `jobs.<nombre>`:
+
+    pendiente (sin campo) -> leased (owner, expires_at) -> done | failed
+
+- `claim()` reserva atómicamente (`find_one_and_update`) el siguiente documento
+  de la consulta, en el orden indicado, que no tenga un lease vigente. Así
+  varios procesos (o varios shards de GitHub Actions) pueden vaciar la misma
+  cola en paralelo sin procesar dos veces el mismo artista.
+- Mientras se usa como context manager, un hilo renueva los leases del proceso
+  cada tercio de JOB_LEASE_SECONDS (por defecto 900). Si el proceso muere, sus
+  leases caducan y otro proceso puede reclamar esos trabajos.
+- Un trabajo fallido se vuelve a intentar tras JOB_RETRY_DELAY_SECONDS (por
+  defecto 3600) hasta agotar JOB_MAX_ATTEMPTS intentos (por defecto 3).
+- Al salir, los trabajos reclamados que no se han terminado vuelven a pendientes.
+
+El identificador del proceso es JOB_RUNNER_ID o, si no está definido,
+"<host>:<pid>".
+"""
+import os
+import socket
+import threading
+import datetime
+from pymongo import ReturnDocument
+
+class JobQueue:
+    """Reparte los documentos de `query` entre procesos mediante leases con caducidad."""
+
+    def __init__(self, collection, name, query, sort=None):
+        self.collection = collection
+        self.field = f"jobs.{name}"
+        self.query = query
+        self.sort = sort
+        self.owner = os.getenv("JOB_RUNNER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease = datetime.timedelta(seconds=float(os.getenv("JOB_LEASE_SECONDS", "900")))
+        self.retry_delay = datetime.timedelta(seconds=float(os.getenv("JOB_RETRY_DELAY_SECONDS", "3600")))
+        self.max_attempts = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        self._stop = threading.Event()
+        self._heartbeat = None
+        self.stats = {"claimed": 0, "done": 0, "failed": 0, "released": 0}
+
+    def claim_filter(self, now=None):
+        """Filtro de los documentos que se pueden reclamar ahora."""
+        now = now or datetime.datetime.utcnow()
+        f = self.field
+        return {**self.query, "$and": [
+            {"$or": [
+                {f"{f}.status": {"$exists": False}},
+                {f"{f}.status": "pending"},
+                {f"{f}.status": "leased", f"{f}.expires_at": {"$lt": now}},
+                {f"{f}.status": "failed", f"{f}.retry_at": {"$lte": now}},
+            ]},
+            {f"{f}.attempts": {"$not": {"$gte": self.max_attempts}}},
+        ]}
+
+    def claim(self, projection=None):
+        """Reserva el siguiente trabajo y devuelve su documento, o None si la cola está vacía."""
+        now = datetime.datetime.utcnow()
+        document = self.collection.find_one_and_update(
+            self.claim_filter(now),
+            {
+                "$set": {
+                    f"{self.field}.status": "leased",
+                    f"{self.field}.owner": self.owner,
+                    f"{self.field}.claimed_at": now,
+                    f"{self.field}.expires_at": now + self.lease,
+                },
+                "$inc": {f"{self.field}.attempts": 1},
+            },
+            sort=self.sort,
+            projection=projection,
+            return_document=ReturnDocument.AFTER,
+        )
+        if document:
+            self.stats["claimed"] += 1
+        return document
+
+    def claim_many(self, limit, projection=None):
+        """Reserva hasta `limit` trabajos."""
+        documents = []
+        while len(documents) < limit:
+            document = self.claim(projection)
+            if not document:
+                break
+            documents.append(document)
+        return documents
+
+    def _own_lease(self, job_id):
+        return {"_id": job_id, f"{self.field}.owner": self.owner, f"{self.field}.status": "leased"}
+
+    def done_update(self):
+        """
+        `$set` que marca un trabajo como terminado, para encolarlo en un BulkWriter
+        junto al resto de escrituras del documento (cuenta el trabajo como terminado).
+        """
+        self.stats["done"] += 1
+        return {f"{self.field}.status": "done", f"{self.field}.finished_at": datetime.datetime.utcnow()}
+
+    def complete(self, job_id):
+        """Marca como terminado un trabajo reclamado por este proceso."""
+        self.collection.update_one(self._own_lease(job_id), {"$set": self.done_update()})
+
+    def fail(self, job_id, error):
+        """Marca como fallido un trabajo; se reintentará tras JOB_RETRY_DELAY_SECONDS."""
+        self.stats["failed"] += 1
+        self.collection.update_one(self._own_lease(job_id), {"$set": {
+            f"{self.field}.status": "failed",
+            f"{self.field}.error": str(error)[:500],
+            f"{self.field}.retry_at": datetime.datetime.utcnow() + self.retry_delay,
+        }})
+
+    def renew(self):
+        """Alarga los leases vigentes de este proceso."""
+        self.collection.update_many(
+            {f"{self.field}.owner": self.owner, f"{self.field}.status": "leased"},
+            {"$set": {f"{self.field}.expires_at": datetime.datetime.utcnow() + self.lease}}
+        )
+
+    def release_all(self):
+        """Devuelve a pendientes los trabajos reclamados por este proceso y no terminados."""
+        result = self.collection.update_many(
+            {f"{self.field}.owner": self.owner, f"{self.field}.status": "leased"},
+            # No cuenta como intento: el trabajo no llegó a procesarse
+            {"$set": {f"{self.field}.status": "pending"}, "$inc": {f"{self.field}.attempts": -1}}
+        )
+        self.stats["released"] += result.modified_count
+
+    def _renew_periodically(self):
+        while not self._stop.wait(self.lease.total_seconds() / 3):
+            try:
+                self.renew()
+            except Exception as e:
+                print(f"Error al renovar los leases de la cola: {e}")
+
+    def __enter__(self):
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=self._renew_periodically, daemon=True)
+        self._heartbeat.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._heartbeat.join()
+        self.release_all()
+        return False
+
+    def print_stats(self):
+        s = self.stats
+        print(f"--- Cola '{self.field}' ({self.owner}): {s['claimed']} reclamados, {s['done']} terminados, "
+              f"{s['failed']} fallidos, {s['released']} devueltos a pendientes ---")
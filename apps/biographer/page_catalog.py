@@ -0,0 +1,129 @@
+"""
+Catálogo local de las páginas de WordPress, guardado en la colección `wp_pages`.
+
+Cada documento guarda id, slug, título, enlace, fecha de modificación y un hash
+del contenido, de modo que resolver un título o un slug es una consulta
+indexada en MongoDB y no una búsqueda remota en WordPress.
+
+La sincronización es incremental: solo se piden las páginas modificadas desde
+la última sincronización (`modified_after`) y se envía el ETag anterior en
+`If-None-Match`, así que si nada ha cambiado la respuesta es un 304 vacío. Cada
+WP_CATALOG_FULL_SYNC_DAYS días (por defecto 7) se hace una sincronización
+completa que además elimina del catálogo las páginas borradas en WordPress.
+"""
+import os
+import html
+import hashlib
+from datetime import datetime, timedelta
+import pymongo
+from pymongo import UpdateOne
+import wordpress_api
+
+CATALOG_FIELDS = "id,slug,title,link,modified,content"
+SYNC_STATE_ID = "pages"
+
+def normalize_title(title):
+    """Normaliza un título (los de la API vienen con entidades HTML) para compararlo."""
+    return " ".join(html.unescape(title or "").split()).casefold()
+
+def content_hash(page):
+    rendered = page.get('content', {}).get('rendered', '')
+    return hashlib.sha256(rendered.encode('utf-8')).hexdigest()
+
+class PageCatalog:
+    """Réplica local (id/slug/título/modificación/hash) de las páginas de WordPress."""
+
+    def __init__(self, db, config, read_only=False):
+        """Con `read_only` no se crean los índices: solo se consulta el catálogo existente."""
+        self.config = config
+        self.pages = db["wp_pages"]
+        self.state = db["wp_sync_state"]
+        if not read_only:
+            self.pages.create_index("slug")
+            self.pages.create_index("title_normalized")
+
+    def _entry(self, page):
+        title = page.get('title', {}).get('rendered', '')
+        return {
+            "_id": page['id'],
+            "slug": page.get('slug'),
+            "title": html.unescape(title),
+            "title_normalized": normalize_title(title),
+            "link": page.get('link'),
+            "modified": page.get('modified'),
+            "content_hash": content_hash(page),
+        }
+
+    def record(self, page):
+        """Guarda en el catálogo una página recién creada o actualizada."""
+        entry = self._entry(page)
+        self.pages.replace_one({"_id": entry["_id"]}, entry, upsert=True)
+
+    def forget(self, page_id):
+        """Elimina una página del catálogo (por ejemplo, si WordPress devuelve 404)."""
+        self.pages.delete_one({"_id": page_id})
+
+    def sync(self, full=False):
+        """Sincroniza el catálogo con WordPress y devuelve el número de páginas actualizadas."""
+        state = self.state.find_one({"_id": SYNC_STATE_ID}) or {}
+        full_sync_days = float(os.getenv("WP_CATALOG_FULL_SYNC_DAYS", "7"))
+        last_full = state.get("last_full_sync")
+        if not state.get("modified") or not last_full or datetime.utcnow() - last_full > timedelta(days=full_sync_days):
+            full = True
+
+        params = [('per_page', wordpress_api.MAX_PER_PAGE), ('_fields', CATALOG_FIELDS),
+                  ('orderby', 'modified'), ('order', 'asc')]
+        headers = {}
+        since = None
+        if not full:
+            # Un segundo de margen para no perder cambios guardados en el mismo segundo que la marca
+            since = (datetime.fromisoformat(state["modified"]) - timedelta(seconds=1)).isoformat()
+            params.append(('modified_after', since))
+            # El ETag solo es válido para el mismo listado, es decir, la misma marca de modificación
+            if state.get("etag") and state.get("etag_since") == since:
+                headers["If-None-Match"] = state["etag"]
+
+        print(f"Sincronizando catálogo de páginas de WordPress ({'completa' if full else 'incremental'})...")
+        try:
+            response = wordpress_api.list_pages(self.config, params + [('page', 1)], headers=headers)
+            if response.status_code == 304:
+                print("  - Catálogo al día (304 Not Modified).")
+                return 0
+            response.raise_for_status()
+            pages = response.json()
+            total_pages = int(response.headers.get('X-WP-TotalPages', 1))
+            pages += wordpress_api.fetch_remaining_pages(self.config, params, total_pages)
+        except Exception as e:
+            print(f"  - Error al sincronizar el catálogo, se usará la copia local: {e}")
+            return 0
+
+        if pages:
+            operations = [UpdateOne({"_id": entry["_id"]}, {"$set": entry}, upsert=True)
+                          for entry in map(self._entry, pages)]
+            try:
+                self.pages.bulk_write(operations, ordered=False)
+            except pymongo.errors.PyMongoError as e:
+                print(f"  - Error al guardar el catálogo: {e}")
+                return 0
+
+        new_state = {"etag": response.headers.get('ETag'), "etag_since": since}
+        modified = [page['modified'] for page in pages if page.get('modified')]
+        new_state["modified"] = max(modified + ([state["modified"]] if state.get("modified") else []), default=None)
+        if full:
+            removed = self.pages.delete_many({"_id": {"$nin": [page['id'] for page in pages]}}).deleted_count
+            new_state["last_full_sync"] = datetime.utcnow()
+            if removed:
+                print(f"  - {removed} páginas eliminadas del catálogo.")
+        self.state.update_one({"_id": SYNC_STATE_ID}, {"$set": new_state}, upsert=True)
+        print(f"  - {len(pages)} páginas sincronizadas.")
+        return len(pages)
+
+    def find_by_slug(self, slug):
+        return self.pages.find_one({"slug": slug}) if slug else None
+
+    def find_by_title(self, title):
+        return self.pages.find_one({"title_normalized": normalize_title(title)})
+
+    def find_slugs(self, pattern):
+        """Slugs del catálogo que cumplen la expresión regular `pattern`."""
+        return [entry["slug"] for entry in self.pages.find({"slug": {"$regex": pattern}}, {"slug": 1})]
@@ -0,0 +1,96 @@
+"""
+Publicación de sliders en PayloadCMS, compartida por los scripts de sliders.
+
+El ID de cada slider y la última lista de items publicada se guardan junto al
+hash del slider en `published_artifacts` (ver publish_state.py), con la clave
+"payload_slider:<título>":
+
+- Si los items no han cambiado, no se hace ninguna petición.
+- Si han cambiado y el ID está en caché, se envía un único PATCH con solo
+  `sliderItems`. El ID se valida de forma perezosa: si Payload responde 404
+  (slider borrado), se vuelve a buscar por título.
+- Solo sin ID en caché se busca el slider por título (GET) y, si no existe,
+  se crea (POST).
+"""
+import http_client
+
+class SliderPublisher:
+    """Crea o actualiza sliders de Payload usando el ID y los items de la última publicación."""
+
+    def __init__(self, api_url, headers, publish_state):
+        self.api_url = api_url
+        self.headers = headers
+        self.publish_state = publish_state
+
+    def find_slider_id(self, title):
+        """Busca el slider por título y devuelve su ID, o None si no existe."""
+        print(f"Buscando el slider '{title}' en Payload...")
+        res = http_client.get(
+            f"{self.api_url}/sliders",
+            params={"where[title][equals]": title, "limit": 1, "depth": 0},
+            headers=self.headers
+        )
+        res.raise_for_status()
+        docs = res.json().get("docs", [])
+        return docs[0]["id"] if docs else None
+
+    def _patch(self, slider_id, items):
+        """Envía los items nuevos al slider. Devuelve False si el slider ya no existe."""
+        res = http_client.patch(
+            f"{self.api_url}/sliders/{slider_id}", params={"depth": 0},
+            json={"sliderItems": items}, headers=self.headers
+        )
+        if res.status_code == 404:
+            return False
+        res.raise_for_status()
+        return True
+
+    def _create(self, title, items):
+        res = http_client.post(
+            f"{self.api_url}/sliders", params={"depth": 0},
+            json={"title": title, "sliderItems": items}, headers=self.headers
+        )
+        res.raise_for_status()
+        return res.json()["doc"]["id"]
+
+    def publish(self, title, items):
+        """
+        Publica `items` en el slider `title` si han cambiado. Devuelve el ID del
+        slider, o None si no hacía falta publicar. Los errores HTTP se propagan
+        como `requests.exceptions.RequestException`.
+        """
+        artifact_key = f"payload_slider:{title}"
+        payload_data = {"title": title, "sliderItems": items}
+        if self.publish_state.is_unchanged(artifact_key, payload_data):
+            return None
+
+        cached = self.publish_state.get(artifact_key) or {}
+        slider_id = cached.get("slider_id")
+        print(f"Slider '{title}': {describe_changes(cached.get('items'), items)}.")
+
+        if slider_id and not self._patch(slider_id, items):
+            print(f"El slider '{title}' (ID: {slider_id}) ya no existe en Payload.")
+            slider_id = None
+        if not slider_id:
+            slider_id = self.find_slider_id(title)
+            if slider_id:
+                print(f"Slider encontrado (ID: {slider_id}). Actualizando...")
+                if not self._patch(slider_id, items):
+                    slider_id = None
+            if not slider_id:
+                print("Slider no encontrado. Creando uno nuevo...")
+                slider_id = self._create(title, items)
+
+        print(f"¡Slider '{title}' publicado con éxito! ({len(items)} items)")
+        self.publish_state.record(artifact_key, payload_data, slider_id=slider_id, items=items)
+        return slider_id
+
+def describe_changes(previous, items):
+    """Resumen de los cambios entre la lista publicada y la nueva."""
+    if previous is None:
+        return f"{len(items)} items (sin publicación anterior registrada)"
+    added = sum(1 for item in items if item not in previous)
+    removed = sum(1 for item in previous if item not in items)
+    if not added and not removed:
+        return f"{len(items)} items sin cambios (se reordenan o se refresca la publicación)"
+    return f"{added} items nuevos y {removed} eliminados"
@@ -0,0 +1,110 @@
+"""
+Nivel de popularidad de los artistas (las llamas del índice), calculado en MongoDB.
+
+Los umbrales son los percentiles 40, 70 y 90 de `eventCount` entre los artistas
+con página de perfil y al menos un evento. Todo el cálculo se hace en el
+servidor con `$setWindowFields` + `$percentile` (MongoDB 7.0 o superior) y el
+resultado se guarda con `$merge` en el campo `popularityTier` de cada artista:
+
+    3 -> eventCount >= p90     2 -> >= p70     1 -> >= p40     0 -> resto
+
+Así el índice, los sliders y los scripts de Payload leen el nivel con una
+proyección, sin cargar todos los artistas ni depender de numpy.
+
+Uso: python apps/biographer/popularity.py
+"""
+import os
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+import pymongo
+
+# Carga las variables de entorno desde la carpeta del script
+env_path = Path(__file__).parent / '.env'
+load_dotenv(dotenv_path=env_path)
+
+TIER_PERCENTILES = [0.4, 0.7, 0.9]
+PROFILE_QUERY = {"hasProfilePage": True, "profilePageUrl": {"$exists": True}}
+
+def get_config():
+    """Carga y valida la configuración desde las variables de entorno."""
+    config = {
+        "MONGO_URI": os.getenv("MONGO_URI"),
+        "DB_NAME": os.getenv("DB_NAME", "duende-finder"),
+    }
+    for key, value in config.items():
+        if not value:
+            print(f"Error: La variable de entorno {key} no está configurada.")
+            sys.exit(1)
+    return config
+
+def flames(tier):
+    """Llamas que se muestran en la tarjeta de un artista según su nivel."""
+    return "🔥" * (tier or 0)
+
+def tier_pipeline(collection_name):
+    """Pipeline que calcula los umbrales y el nivel de cada artista y lo guarda con $merge."""
+    cutoff = lambda index: {"$arrayElemAt": ["$cutoffs", index]}
+    return [
+        {"$match": {**PROFILE_QUERY, "eventCount": {"$gt": 0}}},
+        {"$project": {"eventCount": 1}},
+        # Sin sortBy ni window: la ventana es toda la colección filtrada
+        {"$setWindowFields": {"output": {"cutoffs": {
+            "$percentile": {"input": "$eventCount", "p": TIER_PERCENTILES, "method": "approximate"}
+        }}}},
+        {"$project": {
+            "popularityTier": {"$switch": {
+                "branches": [
+                    {"case": {"$gte": ["$eventCount", cutoff(2)]}, "then": 3},
+                    {"case": {"$gte": ["$eventCount", cutoff(1)]}, "then": 2},
+                    {"case": {"$gte": ["$eventCount", cutoff(0)]}, "then": 1},
+                ],
+                "default": 0,
+            }},
+        }},
+        {"$merge": {"into": collection_name, "on": "_id", "whenMatched": "merge", "whenNotMatched": "discard"}},
+    ]
+
+def get_cutoffs(collection):
+    """Devuelve los umbrales (p40, p70, p90) actuales, o None si no hay artistas con eventos."""
+    result = list(collection.aggregate([
+        {"$match": {**PROFILE_QUERY, "eventCount": {"$gt": 0}}},
+        {"$group": {"_id": None, "cutoffs": {
+            "$percentile": {"input": "$eventCount", "p": TIER_PERCENTILES, "method": "approximate"}
+        }}},
+    ]))
+    return result[0]["cutoffs"] if result else None
+
+def update_popularity_tiers(collection):
+    """Recalcula `popularityTier` de todos los artistas con perfil. Devuelve False si falla."""
+    print("Calculando niveles de popularidad en MongoDB...")
+    try:
+        # Los artistas sin eventos no pasan por el pipeline: su nivel es 0
+        collection.update_many(
+            {**PROFILE_QUERY, "eventCount": {"$not": {"$gt": 0}}, "popularityTier": {"$ne": 0}},
+            {"$set": {"popularityTier": 0}}
+        )
+        collection.aggregate(tier_pipeline(collection.name))
+        cutoffs = get_cutoffs(collection)
+    except pymongo.errors.OperationFailure as e:
+        # $percentile necesita MongoDB 7.0; se mantienen los niveles guardados
+        print(f"  - Error al calcular los niveles de popularidad, se usarán los guardados: {e}")
+        return False
+    if cutoffs:
+        p40, p70, p90 = cutoffs
+        print(f"  - Umbrales de eventos: p40={p40:g}, p70={p70:g}, p90={p90:g}.")
+    return True
+
+def main():
+    """Flujo principal del script."""
+    config = get_config()
+    try:
+        client = pymongo.MongoClient(config['MONGO_URI'])
+        update_popularity_tiers(client[config['DB_NAME']]["artists"])
+        client.close()
+    except pymongo.errors.ConnectionFailure as e:
+        print(f"Error de conexión a MongoDB: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,14 @@
 import os
 import sys
 import requests
+import http_client
+from publish_state import PublishState
+from payload_sliders import SliderPublisher
 from dotenv import load_dotenv
 import pymongo
 from pathlib import Path
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 def get_config():
     """Carga la configuración desde las variables de entorno."""
@@ -24,105 +28,78 @@ def get_config():
             sys.exit(1)
     return config
 
-def update_payload_slider(config, slider_title, event_ids):
-    """Crea o actualiza un slider en PayloadCMS con una lista de IDs de eventos."""
-    api_url = config["PAYLOAD_API_URL"]
+def get_slider_publisher(config, publish_state):
+    """Publicador de sliders de Payload con la clave de API de este script."""
     headers = {
-    "Authorization": f"api-keys API-Key {config['PAYLOAD_API_KEY']}",
-    "Content-Type": "application/json"
-}
-    
+        "Authorization": f"api-keys API-Key {config['PAYLOAD_API_KEY']}",
+        "Content-Type": "application/json"
+    }
+    return SliderPublisher(config["PAYLOAD_API_URL"], headers, publish_state)
+
+def update_payload_slider(publisher, slider_title, event_ids):
+    """Crea o actualiza un slider en PayloadCMS con una lista de IDs de eventos (si ha cambiado)."""
     print(f"\n--- Procesando slider: {slider_title} ---")
-    print(f"Buscando el slider en Payload...")
-    get_url = f"{api_url}/sliders?where[title][equals]={slider_title}"
-    
+    payload_items = [{"relationTo": "events", "value": event_id} for event_id in event_ids]
     try:
-        res = requests.get(get_url, headers=headers)
-        res.raise_for_status()
-        existing_sliders = res.json()
-        
-        payload_items = [{"relationTo": "events", "value": event_id} for event_id in event_ids]
-        
-        payload_data = {
-            "title": slider_title,
-            "sliderItems": payload_items
-        }
-
-        if existing_sliders.get("totalDocs", 0) > 0:
-            slider_id = existing_sliders["docs"][0]["id"]
-            print(f"Slider encontrado (ID: {slider_id}). Actualizando con {len(event_ids)} items...")
-            patch_url = f"{api_url}/sliders/{slider_id}"
-            update_res = requests.patch(patch_url, json=payload_data, headers=headers)
-            update_res.raise_for_status()
-            print(f"¡Slider '{slider_title}' actualizado con éxito!")
-        else:
-            print(f"Slider no encontrado. Creando uno nuevo con {len(event_ids)} items...")
-            post_url = f"{api_url}/sliders"
-            create_res = requests.post(post_url, json=payload_data, headers=headers)
-            create_res.raise_for_status()
-            print(f"¡Slider '{slider_title}' creado con éxito!")
-
+        publisher.publish(slider_title, payload_items)
     except requests.exceptions.RequestException as e:
         print(f"Error al comunicarse con la API de Payload: {e}")
-        if e.response:
+        if e.response is not None:
             print(f"Detalles del error: {e.response.text}")
 
-def get_newest_events(db, limit=10):
-    """Obtiene los eventos más recientemente creados."""
-    print(f"Buscando los {limit} eventos más nuevos..." )
-    try:
-        events = list(db.events.find({}).sort([("_id", pymongo.DESCENDING)]).limit(limit))
-        print(f"Se encontraron {len(events)} eventos.")
-        return [str(event['_id']) for event in events]
-    except Exception as e:
-        print(f"Error al consultar los eventos más nuevos en MongoDB: {e}")
-        return []
-
-def get_upcoming_events(db, days=15, limit=10):
-    """Obtiene los eventos de los próximos X días."""
-    print(f"Buscando los {limit} eventos para los próximos {days} días...")
-    try:
-        today = datetime.now()
-        end_date = today + timedelta(days=days)
-        
-        query = {
+def build_slider_queries(days=15):
+    """Consulta de cada slider de eventos: (título, filtro, orden)."""
+    today = datetime.now()
+    end_date = today + timedelta(days=days)
+    return [
+        # Los eventos más recientemente creados
+        ("Novedades en Duende Finder", {}, {"_id": -1}),
+        # Los eventos de los próximos X días
+        (f"¡No te lo pierdas! Próximos {days} días", {
             "date": {
                 "$gte": today.strftime('%Y-%m-%d'),
                 "$lte": end_date.strftime('%Y-%m-%d')
             }
-        }
-        
-        events = list(db.events.find(query).sort([("date", pymongo.ASCENDING)]).limit(limit))
-        print(f"Se encontraron {len(events)} eventos.")
-        return [str(event['_id']) for event in events]
-    except Exception as e:
-        print(f"Error al consultar los próximos eventos en MongoDB: {e}")
-        return []
+        }, {"date": 1}),
+        # Los eventos marcados como 'featured'
+        ("Artistas Destacados 2025", {"featured": True}, None),
+        # Eventos que tienen un plan de noche generado
+        ("Noches Temáticas por Duende Finder", {"content.nightPlanMarkdown": {"$exists": True, "$ne": ""}}, {"_id": -1}),
+    ]
 
-def get_featured_events(db, limit=10):
-    """Obtiene los eventos marcados como 'featured'."""
-    print(f"Buscando los {limit} eventos destacados ('featured')...")
-    try:
-        events = list(db.events.find({"featured": True}).limit(limit))
-        print(f"Se encontraron {len(events)} eventos.")
-        return [str(event['_id']) for event in events]
-    except Exception as e:
-        print(f"Error al consultar los eventos destacados en MongoDB: {e}")
-        return []
+def build_slider_pipeline(slider_queries, limit):
+    """
+    Pipeline que devuelve los `_id` de todos los sliders en una sola consulta.
+    Cada slider es una rama `$unionWith` sobre `events` (en lugar de un `$facet`,
+    cuyas ramas no pueden usar índices y recorrerían la colección entera), y cada
+    documento lleva el título de su slider.
+    """
+    branches = []
+    for title, query, sort in slider_queries:
+        stages = [{"$match": query}]
+        if sort:
+            stages.append({"$sort": sort})
+        stages += [{"$limit": limit}, {"$project": {"_id": 1, "slider": {"$literal": title}}}]
+        branches.append(stages)
+    pipeline = branches[0]
+    for stages in branches[1:]:
+        pipeline.append({"$unionWith": {"coll": "events", "pipeline": stages}})
+    return pipeline
 
-def get_themed_nights_events(db, limit=10):
-    """Obtiene eventos que tienen un plan de noche generado."""
-    print(f"Buscando los {limit} eventos con 'Plan de Noche' creado...")
+def get_slider_event_ids(db, days=15, limit=10):
+    """Obtiene los IDs de eventos de cada slider, en orden, con una única agregación."""
+    slider_queries = build_slider_queries(days)
+    print(f"Buscando los {limit} eventos de cada uno de los {len(slider_queries)} sliders...")
+    event_ids = {title: [] for title, _, _ in slider_queries}
     try:
-        query = {
-            "content.nightPlanMarkdown": {"$exists": True, "$ne": ""}
-        }
-        events = list(db.events.find(query).sort([("_id", pymongo.DESCENDING)]).limit(limit))
-        print(f"Se encontraron {len(events)} eventos.")
-        return [str(event['_id']) for event in events]
+        for event in db.events.aggregate(build_slider_pipeline(slider_queries, limit)):
+            event_ids[event["slider"]].append(str(event["_id"]))
     except Exception as e:
-        print(f"Error al consultar eventos con plan de noche en MongoDB: {e}")
-        return []
+        print(f"Error al consultar los eventos de los sliders en MongoDB: {e}")
+        return {}
+    for title, ids in event_ids.items():
+        print(f"  - {title}: {len(ids)} eventos.")
+    return event_ids
 
 def main():
     """Flujo principal del script."""
@@ -136,27 +113,26 @@ def main():
         print(f"Error de conexión a MongoDB: {e}")
         sys.exit(1)
 
-    # --- 1. Poblar "Novedades en Duende Finder" ---
-    newest_event_ids = get_newest_events(db)
-    if newest_event_ids:
-        update_payload_slider(config, "Novedades en Duende Finder", newest_event_ids)
-
-    # --- 2. Poblar "¡No te lo pierdas! Próximos 15 días" ---
-    upcoming_event_ids = get_upcoming_events(db, days=15)
-    if upcoming_event_ids:
-        update_payload_slider(config, "¡No te lo pierdas! Próximos 15 días", upcoming_event_ids)
+    publish_state = PublishState(db)
+    publisher = get_slider_publisher(config, publish_state)
 
-    # --- 3. Poblar "Artistas Destacados 2025" ---
-    featured_event_ids = get_featured_events(db)
-    if featured_event_ids:
-        update_payload_slider(config, "Artistas Destacados 2025", featured_event_ids)
-
-    # --- 4. Poblar "Noches Temáticas por Duende Finder" ---
-    themed_nights_event_ids = get_themed_nights_events(db)
-    if themed_nights_event_ids:
-        update_payload_slider(config, "Noches Temáticas por Duende Finder", themed_nights_event_ids)
+    # Los sliders son independientes: se publican en paralelo
+    slider_event_ids = {title: ids for title, ids in get_slider_event_ids(db).items() if ids}
+    if slider_event_ids:
+        with ThreadPoolExecutor(max_workers=len(slider_event_ids)) as executor:
+            futures = {
+                executor.submit(update_payload_slider, publisher, title, event_ids): title
+                for title, event_ids in slider_event_ids.items()
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"Error al publicar el slider '{futures[future]}': {e}")
 
     client.close()
+    publish_state.print_stats()
+    http_client.print_stats()
     print("\n--- Proceso Finalizado ---")
 
 if __name__ == "__main__":
@@ -1,8 +1,12 @@
 import os
 import sys
 import requests
+import http_client
+from publish_state import PublishState
+from payload_sliders import SliderPublisher
 from dotenv import load_dotenv
 import pymongo
+from pymongo import UpdateOne
 from pathlib import Path
 import base64
 from html.parser import HTMLParser
@@ -63,88 +67,92 @@ def get_wordpress_auth(user, password):
     token = base64.b64encode(credentials.encode())
     return {'Authorization': f'Basic {token.decode("utf-8")}'}
 
-def get_featured_image_url(media_url, auth_headers):
-    """Obtiene la URL de la imagen destacada desde su endpoint de media."""
-    try:
-        res = requests.get(media_url, headers=auth_headers)
-        res.raise_for_status()
-        media_data = res.json()
-        return media_data.get('source_url', None)
-    except requests.exceptions.RequestException as e:
-        print(f"  - Error al obtener la imagen destacada desde {media_url}: {e}")
-        return None
-
-def sync_artist_with_db(db, artist_data):
-    """Crea o encuentra un artista en MongoDB y devuelve su ID."""
-    artist_name = artist_data['name']
-    
-    # 1. Buscar si el artista ya existe
-    existing_artist = db.artists.find_one({"name": artist_name})
-    
-    if existing_artist:
-        print(f"  - Artista '{artist_name}' ya existe en MongoDB (ID: {existing_artist['_id']}).")
-        return str(existing_artist['_id'])
-    else:
-        # 2. Si no existe, crearlo
-        print(f"  - Artista '{artist_name}' no encontrado. Creando nuevo registro...")
-        new_artist = {
-            "name": artist_name,
-            "bio": artist_data.get('bio', ''),
-            "image": artist_data.get('imageUrl', ''), # Asumiendo que tienes un campo de texto para la URL
-            # Aquí podrías añadir más campos si los necesitas
-            "createdAt": datetime.now(),
-            "updatedAt": datetime.now()
-        }
-        result = db.artists.insert_one(new_artist)
-        print(f"  - Nuevo artista creado con ID: {result.inserted_id}")
-        return str(result.inserted_id)
-
-def update_payload_slider(config, slider_title, artist_ids):
+def get_embedded_image_url(post):
+    """URL de la imagen destacada incluida en el post con `_embed=wp:featuredmedia`."""
+    media = post.get('_embedded', {}).get('wp:featuredmedia') or [{}]
+    # Si la imagen no es accesible, WordPress incluye un objeto de error sin source_url
+    return media[0].get('source_url')
+
+def sync_artists_with_db(db, artists_data):
+    """
+    Crea o encuentra en MongoDB los artistas de `artists_data` y devuelve sus
+    IDs en el mismo orden. Usa una consulta `$in` para los existentes y un único
+    `bulk_write` con upserts para los nuevos, sea cual sea el número de artistas.
+    """
+    names = list(dict.fromkeys(artist_data['name'] for artist_data in artists_data))
+    ids_by_name = {
+        artist['name']: artist['_id']
+        for artist in db.artists.find({"name": {"$in": names}}, {"name": 1})
+    }
+    for name in ids_by_name:
+        print(f"  - Artista '{name}' ya existe en MongoDB (ID: {ids_by_name[name]}).")
+
+    new_artists = [artist_data for artist_data in artists_data if artist_data['name'] not in ids_by_name]
+    new_artists = list({artist_data['name']: artist_data for artist_data in new_artists}.values())
+    if new_artists:
+        print(f"  - Creando {len(new_artists)} artistas nuevos en MongoDB...")
+        now = datetime.now()
+        operations = [
+            UpdateOne({"name": artist_data['name']}, {"$setOnInsert": {
+                "name": artist_data['name'],
+                "bio": artist_data.get('bio', ''),
+                "image": artist_data.get('imageUrl', ''), # Asumiendo que tienes un campo de texto para la URL
+                "createdAt": now,
+                "updatedAt": now
+            }}, upsert=True)
+            for artist_data in new_artists
+        ]
+        try:
+            result = db.artists.bulk_write(operations, ordered=False)
+            upserted_ids = result.upserted_ids
+        except pymongo.errors.BulkWriteError as e:
+            print(f"  - Error al crear algunos artistas: {len(e.details.get('writeErrors', []))} fallidos.")
+            upserted_ids = {upsert['index']: upsert['_id'] for upsert in e.details.get('upserted', [])}
+        for index, artist_id in upserted_ids.items():
+            ids_by_name[new_artists[index]['name']] = artist_id
+            print(f"  - Nuevo artista creado: '{new_artists[index]['name']}' (ID: {artist_id})")
+
+        # Los que otro proceso creó entre la consulta y el upsert no aparecen en upserted_ids
+        missing = [artist_data['name'] for artist_data in new_artists if artist_data['name'] not in ids_by_name]
+        if missing:
+            for artist in db.artists.find({"name": {"$in": missing}}, {"name": 1}):
+                ids_by_name[artist['name']] = artist['_id']
+
+    return [str(ids_by_name[name]) for name in (artist_data['name'] for artist_data in artists_data) if name in ids_by_name]
+
+def update_payload_slider(config, slider_title, artist_ids, publish_state):
     # (Esta función es similar a la del otro script, adaptada para artistas)
-    api_url = config["PAYLOAD_API_URL"]
     headers = {
         "Authorization": f"users API-Key {config['PAYLOAD_API_KEY']}",
         "Content-Type": "application/json"
     }
     
     print(f"\n--- Procesando slider: {slider_title} ---")
-    get_url = f"{api_url}/sliders?where[title][equals]={slider_title}"
-    
+    payload_items = [{"relationTo": "artists", "value": artist_id} for artist_id in artist_ids]
+    publisher = SliderPublisher(config["PAYLOAD_API_URL"], headers, publish_state)
     try:
-        res = requests.get(get_url, headers=headers)
-        res.raise_for_status()
-        existing_sliders = res.json()
-        
-        payload_items = [{"relationTo": "artists", "value": artist_id} for artist_id in artist_ids]
-        
-        payload_data = {"title": slider_title, "sliderItems": payload_items}
-
-        if existing_sliders.get("totalDocs", 0) > 0:
-            slider_id = existing_sliders["docs"][0]["id"]
-            print(f"Slider encontrado (ID: {slider_id}). Actualizando con {len(artist_ids)} artistas...")
-            patch_url = f"{api_url}/sliders/{slider_id}"
-            requests.patch(patch_url, json=payload_data, headers=headers).raise_for_status()
-            print(f"¡Slider '{slider_title}' actualizado con éxito!")
-        else:
-            print(f"Slider no encontrado. Creando uno nuevo con {len(artist_ids)} artistas...")
-            requests.post(f"{api_url}/sliders", json=payload_data, headers=headers).raise_for_status()
-            print(f"¡Slider '{slider_title}' creado con éxito!")
-
+        publisher.publish(slider_title, payload_items)
     except requests.exceptions.RequestException as e:
         print(f"Error al comunicarse con la API de Payload: {e}")
-        if e.response: print(f"Detalles: {e.response.text}")
+        if e.response is not None: print(f"Detalles: {e.response.text}")
 
 def main():
     print("--- Iniciando script para poblar slider de Artistas Destacados desde WordPress ---")
     config = get_config()
     auth_headers = get_wordpress_auth(config['WORDPRESS_USER'], config['WORDPRESS_APP_PASSWORD'])
     
-    # 1. Obtener posts de WordPress
-    wp_url = f"{config['WORDPRESS_URL']}/wp-json/wp/v2/posts?categories={config['ARTIST_CATEGORY_ID']}&per_page=20"
+    # 1. Obtener posts de WordPress, con la imagen destacada incluida (_embed) y solo los campos necesarios
+    wp_url = f"{config['WORDPRESS_URL']}/wp-json/wp/v2/posts"
+    params = {
+        "categories": config['ARTIST_CATEGORY_ID'],
+        "per_page": 20,
+        "_embed": "wp:featuredmedia",
+        "_fields": "id,title,content,_links,_embedded",
+    }
     print(f"Obteniendo artistas de WordPress (categoría {config['ARTIST_CATEGORY_ID']})...")
     
     try:
-        response = requests.get(wp_url, headers=auth_headers)
+        response = http_client.get(wp_url, params=params, headers=auth_headers)
         response.raise_for_status()
         posts = response.json()
         print(f"Se encontraron {len(posts)} artistas en WordPress.")
@@ -164,37 +172,36 @@ def main():
         print(f"Error de conexión a MongoDB: {e}")
         sys.exit(1)
 
-    # 3. Procesar cada post y sincronizar con MongoDB
-    artist_ids_for_slider = []
+    # 3. Extraer los datos de cada post y sincronizarlos con MongoDB de una vez
+    artists_data = []
     for post in posts:
         print(f"\nProcesando post: '{post['title']['rendered']}'")
         
         # Extraer datos básicos
         artist_name = post['title']['rendered']
         bio_h2 = get_h2_content(post['content']['rendered'])
-        
-        # Obtener URL de la imagen destacada
-        image_url = None
-        if post['_links'].get('wp:featuredmedia'):
-            media_url = post['_links']['wp:featuredmedia'][0]['href']
-            image_url = get_featured_image_url(media_url, auth_headers)
+        image_url = get_embedded_image_url(post)
         
         if not image_url:
             print("  - Advertencia: No se pudo obtener la imagen destacada para este artista.")
 
-        # Sincronizar con DB y obtener ID
-        artist_id = sync_artist_with_db(db, {
+        artists_data.append({
             "name": artist_name,
             "bio": bio_h2,
             "imageUrl": image_url
         })
-        artist_ids_for_slider.append(artist_id)
+
+    print("\nSincronizando artistas con MongoDB...")
+    artist_ids_for_slider = sync_artists_with_db(db, artists_data)
 
     # 4. Actualizar el slider en Payload
     if artist_ids_for_slider:
-        update_payload_slider(config, "Artistas Destacados 2025", artist_ids_for_slider)
+        publish_state = PublishState(db)
+        update_payload_slider(config, "Artistas Destacados 2025", artist_ids_for_slider, publish_state)
+        publish_state.print_stats()
 
     client.close()
+    http_client.print_stats()
     print("\n--- Proceso Finalizado ---")
 
 if __name__ == "__main__":
@@ -6,6 +6,9 @@ con los artistas más populares obtenidos de la base de datos de MongoDB.
 import os
 import sys
 import requests
+import http_client
+from publish_state import PublishState
+from payload_sliders import SliderPublisher
 from dotenv import load_dotenv
 import pymongo
 from pathlib import Path
@@ -59,49 +62,19 @@ def format_for_payload(artists):
         })
     return items
 
-def update_payload_slider(config, slider_items):
-    '''Crea o actualiza el slider en PayloadCMS.'''
-    slider_title = config["SLIDER_TITLE"]
-    api_url = config["PAYLOAD_API_URL"]
+def update_payload_slider(config, slider_items, publish_state):
+    '''Crea o actualiza el slider en PayloadCMS (si ha cambiado).'''
     headers = {
         # El formato estándar de Payload para claves de API de colección
         "Authorization": f"users API-Key {config['PAYLOAD_API_KEY']}",
         "Content-Type": "application/json"
     }
-    
-    # 1. Buscar si el slider ya existe
-    print(f"Buscando el slider '{slider_title}' en Payload...")
-    get_url = f"{api_url}/sliders?where[title][equals]={slider_title}"
-    
+    publisher = SliderPublisher(config["PAYLOAD_API_URL"], headers, publish_state)
     try:
-        res = requests.get(get_url, headers=headers)
-        res.raise_for_status()
-        existing_sliders = res.json()
-        
-        payload_data = {
-            "title": slider_title,
-            "sliderItems": slider_items
-        }
-
-        if existing_sliders.get("totalDocs", 0) > 0:
-            # 2a. Si existe, se actualiza (PATCH)
-            slider_id = existing_sliders["docs"][0]["id"]
-            print(f"Slider encontrado (ID: {slider_id}). Actualizando...")
-            patch_url = f"{api_url}/sliders/{slider_id}"
-            update_res = requests.patch(patch_url, json=payload_data, headers=headers)
-            update_res.raise_for_status()
-            print("¡Slider actualizado en Payload con éxito!")
-        else:
-            # 2b. Si no existe, se crea (POST)
-            print("Slider no encontrado. Creando uno nuevo...")
-            post_url = f"{api_url}/sliders"
-            create_res = requests.post(post_url, json=payload_data, headers=headers)
-            create_res.raise_for_status()
-            print("¡Slider creado en Payload con éxito!")
-
+        publisher.publish(config["SLIDER_TITLE"], slider_items)
     except requests.exceptions.RequestException as e:
         print(f"Error al comunicarse con la API de Payload: {e}")
-        if e.response:
+        if e.response is not None:
             print(f"Detalles del error: {e.response.text}")
         sys.exit(1)
 
@@ -125,9 +98,12 @@ def main():
         return
 
     payload_items = format_for_payload(top_artists)
-    update_payload_slider(config, payload_items)
+    publish_state = PublishState(db)
+    update_payload_slider(config, payload_items, publish_state)
     
     client.close()
+    publish_state.print_stats()
+    http_client.print_stats()
     print("\n--- Proceso Finalizado ---")
 
 if __name__ == "__main__":
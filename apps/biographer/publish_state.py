@@ -0,0 +1,60 @@
+"""
+Registro de lo publicado en WordPress y Payload (colección `published_artifacts`).
+
+Antes de enviar una página o un slider se calcula el hash de su contenido y se
+compara con el de la última publicación: si coincide, la escritura se omite y
+no se reescribe la página ni se purga la caché de WordPress. Cada artefacto se
+identifica por una clave estable (p. ej. "wp_page:123" o "payload_slider:<título>").
+
+Para recuperarse de cambios hechos a mano en WordPress o Payload, un artefacto
+se vuelve a publicar aunque no haya cambiado si su última publicación tiene más
+de PUBLISH_MAX_AGE_DAYS días (por defecto 7). Con PUBLISH_FORCE=1 se publica
+siempre.
+"""
+import os
+import json
+import hashlib
+import datetime
+
+def content_hash(payload):
+    """Hash estable del contenido a publicar (dict, lista o texto)."""
+    if not isinstance(payload, str):
+        payload = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class PublishState:
+    """Hashes de los artefactos publicados y recuento de escrituras enviadas y omitidas."""
+
+    def __init__(self, db):
+        self.collection = db["published_artifacts"]
+        self.force = os.getenv("PUBLISH_FORCE") == "1"
+        self.max_age = datetime.timedelta(days=float(os.getenv("PUBLISH_MAX_AGE_DAYS", "7")))
+        self.written = 0
+        self.skipped = 0
+
+    def is_unchanged(self, key, payload):
+        """Indica si `payload` es idéntico a lo último publicado con `key` (y cuenta la omisión)."""
+        if self.force:
+            return False
+        doc = self.collection.find_one({"_id": key})
+        if not doc or doc.get("hash") != content_hash(payload):
+            return False
+        published_at = doc.get("published_at")
+        if not published_at or datetime.datetime.utcnow() - published_at > self.max_age:
+            return False
+        self.skipped += 1
+        print(f"Sin cambios en '{key}'. Se omite la escritura.")
+        return True
+
+    def get(self, key):
+        """Documento de la última publicación de `key` (hash, fecha y campos extra), o None."""
+        return self.collection.find_one({"_id": key})
+
+    def record(self, key, payload, **extra):
+        """Guarda el hash de una publicación confirmada."""
+        self.written += 1
+        update = {"hash": content_hash(payload), "published_at": datetime.datetime.utcnow(), **extra}
+        self.collection.update_one({"_id": key}, {"$set": update}, upsert=True)
+
+    def print_stats(self):
+        print(f"--- Publicaciones: {self.written} escrituras enviadas, {self.skipped} omitidas por no tener cambios ---")
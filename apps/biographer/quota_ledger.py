@@ -0,0 +1,142 @@
+"""
+Presupuesto diario de las APIs externas, compartido por todos los scripts del
+biógrafo a través de MongoDB (colección `api_quota`).
+
+Cada API con cuota diaria (DAILY_LIMITS) tiene un documento por día
+("<api>:<AAAA-MM-DD>", en la zona horaria de reinicio de las cuotas de Google,
+QUOTA_TIMEZONE) con dos contadores:
+
+- `used`: unidades realmente gastadas. Se suman solas tras `install()`, porque
+  cada llamada real a una API pasa por `rate_limiter.acquire` (las respuestas
+  cacheadas no gastan cuota). Una búsqueda de YouTube cuesta 100 unidades.
+- `reserved`: unidades reservadas por un trabajo que aún no ha terminado.
+  `reserve()` solo concede lo que cabe en `limit - used - reserved`, de forma
+  atómica, y `release()` devuelve la reserva al terminar (el gasto real ya está
+  en `used`). La reserva se devuelve al documento del día en que se hizo,
+  aunque el trabajo termine después del reinicio diario.
+
+Los límites se ajustan con QUOTA_<API>_DAILY (p. ej. QUOTA_CUSTOM_SEARCH_DAILY=100).
+Si un proceso muere con reservas pendientes, esas unidades quedan bloqueadas
+hasta el reinicio diario de la cuota.
+"""
+import os
+import datetime
+import threading
+from zoneinfo import ZoneInfo
+import pymongo
+import rate_limiter
+
+# Unidades por día y coste en unidades de cada llamada
+DAILY_LIMITS = {"gemini": 1500, "custom_search": 100, "youtube": 10000}
+UNIT_COST = {"youtube": 100}
+
+class QuotaLedger:
+    """Contadores diarios de cuota por API, con reservas atómicas."""
+
+    def __init__(self, db):
+        self.collection = db["api_quota"]
+        self.timezone = ZoneInfo(os.getenv("QUOTA_TIMEZONE", "America/Los_Angeles"))
+        self.limits = {
+            api: int(os.getenv(f"QUOTA_{api.upper()}_DAILY", str(default)))
+            for api, default in DAILY_LIMITS.items()
+        }
+        self.spent = {api: 0 for api in self.limits}
+        # Reservas pendientes de este proceso: {api: {documento del día: unidades}}
+        self._reservations = {api: {} for api in self.limits}
+        self._lock = threading.Lock()
+
+    def _doc_id(self, api):
+        day = datetime.datetime.now(self.timezone).strftime('%Y-%m-%d')
+        return f"{api}:{day}"
+
+    def _counters(self, api):
+        """Documento del día de `api`, creándolo si no existe."""
+        doc_id = self._doc_id(api)
+        return self.collection.find_one_and_update(
+            {"_id": doc_id},
+            {"$setOnInsert": {"api": api, "used": 0, "reserved": 0}, "$set": {"limit": self.limits[api]}},
+            upsert=True, return_document=pymongo.ReturnDocument.AFTER
+        )
+
+    def cost(self, api, calls=1):
+        """Unidades de cuota de `calls` llamadas a `api`."""
+        return calls * UNIT_COST.get(api, 1)
+
+    def remaining(self, api):
+        """Unidades aún disponibles hoy (descontando las reservadas)."""
+        counters = self._counters(api)
+        return max(0, self.limits[api] - counters["used"] - counters["reserved"])
+
+    def reserve(self, api, units, minimum=None):
+        """
+        Reserva hasta `units` unidades de `api` y devuelve las concedidas: `units`
+        si caben, lo que quede si es al menos `minimum`, o 0 en otro caso.
+        """
+        minimum = units if minimum is None else minimum
+        while True:
+            counters = self._counters(api)
+            available = self.limits[api] - counters["used"] - counters["reserved"]
+            granted = min(units, available)
+            if granted < max(minimum, 1):
+                return 0
+            # Solo se concede si los contadores no han cambiado desde la lectura
+            result = self.collection.update_one(
+                {"_id": counters["_id"], "used": counters["used"], "reserved": counters["reserved"]},
+                {"$inc": {"reserved": granted}}
+            )
+            if result.modified_count:
+                with self._lock:
+                    held = self._reservations[api]
+                    held[counters["_id"]] = held.get(counters["_id"], 0) + granted
+                return granted
+
+    def release(self, api, units):
+        """
+        Devuelve `units` unidades reservadas de `api` a los documentos del día en
+        que se reservaron (el gasto real ya está registrado en `used`).
+        """
+        if not units:
+            return
+        releases = []
+        with self._lock:
+            held = self._reservations[api]
+            for doc_id in sorted(held):
+                if not units:
+                    break
+                taken = min(units, held[doc_id])
+                releases.append((doc_id, taken))
+                units -= taken
+                held[doc_id] -= taken
+                if not held[doc_id]:
+                    del held[doc_id]
+        if units:
+            print(f"Se ignoran {units} unidades de {api} devueltas sin una reserva pendiente.")
+        for doc_id, taken in releases:
+            self.collection.update_one({"_id": doc_id}, {"$inc": {"reserved": -taken}})
+
+    def record_usage(self, api, calls=1):
+        """Suma a `used` el coste de `calls` llamadas reales a `api`."""
+        if api not in self.limits:
+            return
+        units = self.cost(api, calls)
+        # Los listeners de rate_limiter se llaman desde varios hilos
+        with self._lock:
+            self.spent[api] += units
+        try:
+            self.collection.update_one(
+                {"_id": self._doc_id(api)},
+                {"$inc": {"used": units}, "$setOnInsert": {"api": api, "reserved": 0}, "$set": {"limit": self.limits[api]}},
+                upsert=True
+            )
+        except pymongo.errors.PyMongoError as e:
+            print(f"Error al registrar el gasto de cuota de {api}: {e}")
+
+    def install(self):
+        """Registra el gasto de cada llamada que pase por rate_limiter."""
+        rate_limiter.add_listener(self.record_usage)
+        return self
+
+    def print_stats(self):
+        print("--- Cuota diaria de APIs (gastado en esta ejecución / disponible hoy) ---")
+        for api in self.limits:
+            print(f"  - {api}: {self.spent[api]} / {self.remaining(api)} de {self.limits[api]}")
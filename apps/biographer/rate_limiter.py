@@ -0,0 +1,97 @@
+"""
+Limitadores de tasa (token bucket) compartidos por los scripts del biógrafo.
+
+Cada backend externo (Gemini, Custom Search, YouTube, WordPress) tiene su propio
+cubo de tokens. Antes de cada llamada se invoca `acquire(<backend>)`, que solo
+bloquea el hilo si se ha agotado la cuota por minuto de ese backend. Así el
+rendimiento lo marcan las cuotas reales de cada API y no pausas fijas.
+
+Los límites se pueden ajustar con variables de entorno, por ejemplo
+`RATE_LIMIT_GEMINI_RPM=60` o `RATE_LIMIT_WORDPRESS_BURST=5`.
+
+Como cada llamada real pasa por `acquire`, otros módulos pueden contarlas con
+`add_listener` (quota_ledger lleva así el gasto de la cuota diaria).
+"""
+import os
+import threading
+import time
+
+# Peticiones por minuto y ráfaga máxima por defecto para cada backend.
+DEFAULT_LIMITS = {
+    "gemini": {"rpm": 60, "burst": 5},
+    "custom_search": {"rpm": 90, "burst": 5},
+    "youtube": {"rpm": 30, "burst": 3},
+    "wordpress": {"rpm": 60, "burst": 4},
+}
+
+class TokenBucket:
+    """Cubo de tokens thread-safe que se rellena a `rate` tokens por segundo."""
+
+    def __init__(self, name, rate, capacity):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.waited_seconds = 0.0
+
+    def acquire(self, tokens=1):
+        """Bloquea hasta disponer de `tokens` tokens y devuelve los segundos esperados."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self.acquired += tokens
+                    self.waited_seconds += waited
+                    return waited
+                deficit = (tokens - self._tokens) / self.rate
+            time.sleep(deficit)
+            waited += deficit
+
+_limiters = {}
+_listeners = []
+_registry_lock = threading.Lock()
+
+def _limit_from_env(name, key, default):
+    value = os.getenv(f"RATE_LIMIT_{name.upper()}_{key.upper()}")
+    return float(value) if value else default
+
+def get_limiter(name):
+    """Devuelve (creándolo si hace falta) el limitador del backend indicado."""
+    with _registry_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            defaults = DEFAULT_LIMITS.get(name, {"rpm": 60, "burst": 1})
+            rpm = _limit_from_env(name, "rpm", defaults["rpm"])
+            burst = _limit_from_env(name, "burst", defaults["burst"])
+            limiter = TokenBucket(name, rpm / 60.0, burst)
+            _limiters[name] = limiter
+        return limiter
+
+def add_listener(callback):
+    """Registra `callback(name, tokens)`, que se llama tras cada `acquire` (p. ej. quota_ledger)."""
+    with _registry_lock:
+        _listeners.append(callback)
+
+def acquire(name, tokens=1):
+    """Consume `tokens` del limitador `name`, esperando si es necesario."""
+    waited = get_limiter(name).acquire(tokens)
+    for callback in list(_listeners):
+        callback(name, tokens)
+    return waited
+
+def print_stats():
+    """Muestra cuántas llamadas ha concedido cada limitador y cuánto se ha esperado."""
+    with _registry_lock:
+        limiters = list(_limiters.values())
+    if not limiters:
+        return
+    print("--- Estadísticas de limitadores de tasa ---")
+    for limiter in limiters:
+        print(f"  - {limiter.name}: {limiter.acquired:g} llamadas, {limiter.waited_seconds:.1f}s de espera")
@@ -0,0 +1,172 @@
+"""
+Vuelve a renderizar las páginas de perfil de WordPress a partir de los campos
+guardados en cada artista (short_bio, long_bio_html, video_urls e imagen), sin
+llamar a Gemini, YouTube ni Custom Search. Sirve para aplicar un cambio de
+plantilla a todos los perfiles: la única llamada externa es la escritura en
+WordPress (por lotes, y omitida si la página no ha cambiado).
+
+Los perfiles completos sin `long_bio_html` guardado (creados antes de que se
+guardaran los campos) se omiten: hay que regenerarlos una vez con
+corrector_biografias.py o force_update_artist.py.
+
+Uso: python apps/biographer/rerender_profiles.py [--status complete|placeholder] [--artist NOMBRE] [--limit N] [--dry-run]
+"""
+import os
+import sys
+import argparse
+from pathlib import Path
+from dotenv import load_dotenv
+import pymongo
+from pymongo import UpdateOne
+import http_client
+import templates
+import wordpress_api
+from bulk_writer import BulkWriter
+from page_catalog import PageCatalog
+from publish_state import PublishState
+
+# Carga las variables de entorno desde la carpeta del script
+env_path = Path(__file__).parent / '.env'
+load_dotenv(dotenv_path=env_path)
+
+PROFILE_FIELDS = {
+    "name": 1, "profileStatus": 1, "profilePageUrl": 1, "wpPageId": 1,
+    "short_bio": 1, "long_bio_html": 1, "video_urls": 1, "meta.main_artist_image_url": 1,
+}
+
+def get_config():
+    """Carga y valida la configuración desde las variables de entorno."""
+    config = {
+        "MONGO_URI": os.getenv("MONGO_URI"),
+        "DB_NAME": os.getenv("DB_NAME", "duende-finder"),
+        "WP_URL": os.getenv("WP_URL"),
+        "WP_USER": os.getenv("WP_USER"),
+        "WP_PASSWORD": os.getenv("WP_PASSWORD"),
+    }
+    for key, value in config.items():
+        if not value:
+            print(f"Error: La variable de entorno {key} no está configurada.")
+            sys.exit(1)
+    config["WP_URL"] = config["WP_URL"].rstrip('/')
+    return config
+
+def parse_args():
+    """Lee los argumentos de línea de comandos."""
+    parser = argparse.ArgumentParser(description="Vuelve a renderizar los perfiles de WordPress desde los campos guardados en MongoDB.")
+    parser.add_argument("--status", choices=["complete", "placeholder"], help="Solo perfiles con este estado (por defecto: ambos).")
+    parser.add_argument("--artist", help="Solo el artista con este nombre.")
+    parser.add_argument("--limit", type=int, default=0, help="Número máximo de artistas (por defecto: todos).")
+    parser.add_argument("--dry-run", action="store_true", help="Muestra qué páginas se reescribirían sin escribir nada en WordPress ni en MongoDB (el catálogo de páginas se lee tal cual, sin sincronizarlo).")
+    return parser.parse_args()
+
+def build_page_update(artist):
+    """Devuelve los datos de la página del artista, o None si faltan campos para renderizarla."""
+    artist_name = artist["name"]
+    image_url = artist.get("meta", {}).get("main_artist_image_url")
+    if artist.get("profileStatus") == "complete":
+        if not artist.get("long_bio_html"):
+            return None
+        content = templates.render_profile(
+            artist_name, artist.get("short_bio") or "", artist["long_bio_html"], image_url, artist.get("video_urls") or []
+        )
+        meta = {"main_artist_image_url": image_url or ""}
+    else:
+        image_url = image_url or templates.PLACEHOLDER_PAGE_IMAGE_URL
+        content = templates.render_placeholder(artist_name, image_url)
+        meta = {"main_artist_image_url": image_url}
+    return {"title": artist_name, "content": content, "meta": meta}
+
+def resolve_page_id(artist, catalog):
+    """ID de la página del artista: el guardado o, si no lo hay, el del catálogo local por slug."""
+    if artist.get("wpPageId"):
+        return artist["wpPageId"]
+    profile_url = artist.get("profilePageUrl")
+    if not profile_url:
+        return None
+    entry = catalog.find_by_slug(profile_url.strip('/').split('/')[-1])
+    return entry["_id"] if entry else None
+
+def main():
+    """Flujo principal del script."""
+    args = parse_args()
+    print("--- Iniciando el re-renderizado de perfiles de artistas ---")
+    config = get_config()
+
+    try:
+        client = pymongo.MongoClient(config['MONGO_URI'])
+        db = client[config['DB_NAME']]
+        artists_collection = db["artists"]
+        print("Conectado a MongoDB.")
+    except pymongo.errors.ConnectionFailure as e:
+        print(f"Error de conexión a MongoDB: {e}")
+        sys.exit(1)
+
+    query = {"hasProfilePage": True, "profileStatus": {"$in": [args.status] if args.status else ["complete", "placeholder"]}}
+    if args.artist:
+        query["name"] = args.artist
+    artists = list(artists_collection.find(query, PROFILE_FIELDS).limit(args.limit))
+    print(f"Se encontraron {len(artists)} perfiles.")
+
+    # En modo prueba solo se consulta el catálogo ya guardado, sin índices ni sincronización
+    catalog = PageCatalog(db, config, read_only=args.dry_run)
+    if not args.dry_run and any(not artist.get("wpPageId") for artist in artists):
+        # Solo hace falta leer WordPress para los artistas sin ID de página guardado
+        catalog.sync()
+
+    publish_state = PublishState(db)
+    pages_writer = wordpress_api.PageBatchWriter(config)
+    artists_writer = BulkWriter(artists_collection)
+    missing_fields = []
+    missing_page = []
+    queued = 0
+
+    try:
+        for artist in artists:
+            page_update = build_page_update(artist)
+            if page_update is None:
+                missing_fields.append(artist["name"])
+                continue
+            page_id = resolve_page_id(artist, catalog)
+            if not page_id:
+                missing_page.append(artist["name"])
+                continue
+            artifact_key = f"wp_page:{page_id}"
+            page_unchanged = publish_state.is_unchanged(artifact_key, page_update)
+            if args.dry_run:
+                if not page_unchanged:
+                    queued += 1
+                    print(f"Se reescribiría la página {page_id} de {artist['name']}.")
+                continue
+            if not artist.get("wpPageId"):
+                artists_writer.add(UpdateOne({"_id": artist["_id"]}, {"$set": {"wpPageId": page_id}}))
+            if page_unchanged:
+                continue
+            queued += 1
+
+            def on_updated(status, page_data, artist_name=artist["name"], artifact_key=artifact_key, page_update=page_update):
+                if status == 200:
+                    publish_state.record(artifact_key, page_update)
+                else:
+                    print(f"Error al re-renderizar la página de {artist_name}: {status}")
+
+            pages_writer.update_page(page_id, page_update, on_updated)
+    finally:
+        pages_writer.close()
+        artists_writer.close()
+
+    print("\n--- Proceso Finalizado ---")
+    print(f"Páginas {'a reescribir' if args.dry_run else 'enviadas'}: {queued}.")
+    if missing_fields:
+        print(f"{len(missing_fields)} perfiles completos sin campos guardados (regenéralos con corrector_biografias.py o force_update_artist.py).")
+    if missing_page:
+        print(f"{len(missing_page)} perfiles sin página localizable en WordPress: {', '.join(missing_page[:10])}")
+    pages_writer.print_stats()
+    artists_writer.print_stats()
+    publish_state.print_stats()
+    http_client.print_stats()
+
+    client.close()
+    print("Conexión a MongoDB cerrada.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""
+Plantillas HTML compartidas: perfil completo, perfil placeholder, índice de
+artistas y slider.
+
+Cada plantilla es una f-string. Las listas (tarjetas, vídeos) se generan como
+secuencias de fragmentos y se unen con un único `"".join`; `iter_artist_index`
+e `iter_slider` permiten además escribir el resultado en streaming.
+"""
+
+PLACEHOLDER_PAGE_IMAGE_URL = "https://buscador.afland.es/assets/flamenco-placeholder.webp"
+PLACEHOLDER_CARD_IMAGE_URL = "https://buscador.afland.es/assets/flamenco-placeholder.png"
+
+# --- PERFIL COMPLETO ---
+
+def _profile_image(main_image_url, artist_name):
+    return (
+        '<div class="wp-block-column" style="flex-basis:33.33%"><figure class="wp-block-image size-large">'
+        f'<img src="{main_image_url}" alt="{artist_name}"/></figure></div>'
+    )
+
+def _video_embed(embed_url):
+    return f'''<div style="position: relative; padding-bottom: 56.25%; height: 0; overflow: hidden; margin-bottom: 1em;">
+<iframe src="{embed_url}" style="position: absolute; top: 0; left: 0; width: 100%; height: 100%;" frameborder="0" allowfullscreen></iframe>
+</div>'''
+
+def _profile(image_html, text_column_style, artist_name, short_bio, long_bio_html, videos_html):
+    return f"""
+<style>
+h1.entry-title {{ color: #000000 !important; }}
+.artist-profile-content p {{color: #333333 !important;}}
+.artist-profile-content h2 {{color: #26145F !important;}}
+.artist-title-box {{ background-color: #26145F; border-radius: 15px; padding: 20px; margin-bottom: 20px; }}
+.artist-title-box h2 {{ color: #FFFFFF !important; }}
+.artist-title-box p {{ color: #FFFFFF !important; font-style:italic; font-weight:700; }}
+</style>
+<div class="wp-block-group artist-profile-content">
+  <div class="wp-block-columns">
+    {image_html}
+    <div class="wp-block-column" style="{text_column_style}">
+      <div class="artist-title-box">
+        <h2>{artist_name}</h2>
+        <p>{short_bio}</p>
+      </div>
+    </div>
+  </div>
+  <hr class="wp-block-separator has-alpha-channel-opacity"/>
+  {long_bio_html}
+  {videos_html}
+</div>
+"""
+
+def render_videos(video_urls):
+    parts = ["<h2>Actuaciones Destacadas</h2>"]
+    for url in video_urls or []:
+        if "watch?v=" in url:
+            parts.append(_video_embed(url.replace("watch?v=", "embed/")))
+    return "".join(parts)
+
+def render_profile(artist_name, short_bio, long_bio_html, main_image_url, video_urls):
+    """HTML de una página de perfil completa."""
+    image_html = ""
+    text_column_style = "flex-basis:100%;"
+    if main_image_url:
+        image_html = _profile_image(main_image_url, artist_name)
+        text_column_style = "flex-basis:66.66%; margin-left: 20px;"
+    return _profile(image_html, text_column_style, artist_name, short_bio, long_bio_html, render_videos(video_urls))
+
+# --- PERFIL PLACEHOLDER ---
+
+def _placeholder_image(image_url):
+    return f'<figure class="wp-block-image size-large artist-placeholder-image"><img src="{image_url}" alt="Imagen no disponible"/></figure>'
+
+def _placeholder_text(artist_name, search_query):
+    return f"""
+<p>En Andalucía Flamenco Land, estamos continuamente comprobando y verificando datos y biografías de los artistas flamencos de todo el mundo.</p>
+<p>Actualmente no disponemos de información biográfica detallada para <strong>{artist_name}</strong>. Nuestro equipo está trabajando para ampliar nuestro archivo.</p>
+<p>Mientras tanto, te invitamos a buscar sus próximas actuaciones y eventos en nuestro buscador especializado:</p>
+<div class="wp-block-buttons"><div class="wp-block-button is-style-fill"><a class="wp-block-button__link has-white-color has-vivid-red-background-color has-text-color has-background" href="https://buscador.afland.es/?q={search_query}" target="_blank" rel="noreferrer noopener">Buscar eventos de {artist_name}</a></div></div>
+"""
+
+def _placeholder(artist_name, image_html, placeholder_text):
+    return f"""
+<style>
+h1.entry-title {{ color: #000000 !important; }}
+.artist-placeholder-image {{
+    max-width: 300px;
+    margin: auto;
+}}
+.artist-profile-content p {{color: #333333 !important;}}
+.artist-title-box {{ background-color: #26145F; border-radius: 15px; padding: 20px; margin-bottom: 20px; }}
+.artist-title-box h2 {{ color: #FFFFFF !important; }}
+</style>
+<div class="wp-block-group artist-profile-content">
+    <div class="artist-title-box">
+        <h2>{artist_name}</h2>
+    </div>
+  {image_html}
+  {placeholder_text}
+</div>
+"""
+
+def render_placeholder(artist_name, image_url=None):
+    """HTML de una página placeholder (artista sin información verificada)."""
+    return _placeholder(
+        artist_name,
+        _placeholder_image(image_url or PLACEHOLDER_PAGE_IMAGE_URL),
+        _placeholder_text(artist_name, artist_name.replace(' ', '%20')),
+    )
+
+# --- ÍNDICE DE ARTISTAS ---
+
+INDEX_STYLES = """
+<style>
+    h1.entry-title { color: #000000 !important; }
+    .artist-grid { display: grid; grid-template-columns: repeat(auto-fill, minmax(280px, 1fr)); gap: 20px; padding: 20px; max-width: 1200px; margin: auto; }
+    .artist-card { position: relative; background-color: #fff; border-radius: 15px; overflow: hidden; box-shadow: 0 4px 8px rgba(0,0,0,0.1); transition: transform 0.3s ease, box-shadow 0.3s ease; display: flex; flex-direction: column; }
+    .artist-card:hover { transform: translateY(-5px); box-shadow: 0 8px 16px rgba(0,0,0,0.2); }
+    .artist-card-image { width: 100%; height: 200px; object-fit: cover; object-position: center top; }
+    .artist-card-flames { position: absolute; top: 15px; right: 15px; font-size: 1.8em; text-shadow: 0 0 3px rgba(0,0,0,0.5); }
+    .artist-card-content { padding: 20px; flex-grow: 1; display: flex; flex-direction: column; }
+    .artist-card-title { font-size: 1.5em; font-weight: bold; color: #26145F; margin: 0 0 10px 0; padding-right: 40px; } /* Espacio para las llamas */
+    .artist-card-bio { font-size: 1em; color: #333; margin-bottom: 20px; flex-grow: 1; }
+    .artist-card-button { display: inline-block; background-color: #E53935; color: #fff !important; padding: 10px 20px; border-radius: 5px; text-align: center; text-decoration: none; font-weight: bold; transition: background-color 0.3s ease; }
+    .artist-card-button:hover { background-color: #C62828; }
+    .artist-index-nav { display: flex; flex-wrap: wrap; justify-content: center; gap: 8px; max-width: 1200px; margin: 20px auto; padding: 0 20px; }
+    .artist-index-nav-link { display: inline-block; min-width: 2.2em; padding: 6px 10px; border-radius: 5px; background-color: #26145F; color: #fff !important; text-align: center; text-decoration: none; font-weight: bold; }
+    .artist-index-nav-link.is-current { background-color: #E53935; }
+    .artist-index-heading { max-width: 1200px; margin: 20px auto 0; padding: 0 20px; color: #26145F; }
+    @media (max-width: 600px) { .artist-grid { padding: 10px; } }
+</style>
+"""
+
+def render_index_card(card):
+    """Tarjeta de un artista del índice (dict con los campos de generate_artist_index.build_index_cards)."""
+    return f"""
+        <div class="artist-card">
+            <img src="{card['image_url']}" alt="Imagen de {card['artist_name']}" class="artist-card-image" loading="lazy" decoding="async">
+            <div class="artist-card-flames">{card['flames']}</div>
+            <div class="artist-card-content">
+                <h3 class="artist-card-title">{card['artist_name']}</h3>
+                <p class="artist-card-bio">{card['short_bio']}</p>
+                <a href="{card['profile_url']}" class="artist-card-button">Ver Biografía Completa</a>
+            </div>
+        </div>
+        """
+
+def _index_nav_link(url, current_class, label):
+    return f'<a href="{url}" class="artist-index-nav-link{current_class}">{label}</a>'
+
+def _index_heading(heading):
+    return f'<h2 class="artist-index-heading">{heading}</h2>'
+
+def render_index_nav(links):
+    """Barra de navegación del índice; `links` es una lista de (texto, url, es_la_actual)."""
+    if not links:
+        return ""
+    return "".join([
+        '<nav class="artist-index-nav">',
+        *(_index_nav_link(url, " is-current" if current else "", label) for label, url, current in links),
+        "</nav>",
+    ])
+
+def iter_artist_index(cards, navigation=(), heading=""):
+    """
+    Fragmentos de una página del índice; `cards` es un iterable de dicts con los
+    campos de render_index_card y `navigation` las filas de enlaces (ver render_index_nav).
+    """
+    yield INDEX_STYLES
+    for links in navigation:
+        yield render_index_nav(links)
+    if heading:
+        yield _index_heading(heading)
+    yield "<div class='artist-grid'>"
+    yield from map(render_index_card, cards)
+    yield "</div>"
+
+def render_artist_index(cards, navigation=(), heading=""):
+    return "".join(iter_artist_index(cards, navigation, heading))
+
+# --- SLIDER DE ARTISTAS ---
+
+def render_slider_card(card):
+    """Tarjeta de un artista del slider."""
+    return f"""
+        <div class="swiper-slide">
+            <div class="artist-card">
+                <img src="{card['image_url']}" alt="Imagen de {card['artist_name']}" class="artist-card-image">
+                <div class="artist-card-content">
+                    <h3 class="artist-card-title">{card['artist_name']}</h3>
+                    <a href="{card['profile_url']}" class="artist-card-button">Ver Biografía</a>
+                </div>
+            </div>
+        </div>
+        """
+
+SLIDER_HEAD = """<link rel="stylesheet" href="https://unpkg.com/swiper/swiper-bundle.min.css" />
+
+    <style>
+        /* Estilos para el contenedor del slider y el botón principal */
+        .artist-slider-container {
+            padding: 20px;
+            background: #170837;
+        }
+        .artist-slider {
+            width: 100%;
+            height: 100%;
+            padding-bottom: 40px; /* Espacio para la paginación */
+        }
+        .swiper-slide {
+            display: flex;
+            justify-content: center;
+            align-items: center;
+        }
+        .slider-main-button {
+            display: inline-block;
+            background-color: #26145F;
+            color: #fff !important;
+            padding: 12px 25px;
+            border-radius: 5px;
+            text-align: center;
+            text-decoration: none;
+            font-weight: bold;
+            transition: background-color 0.3s ease;
+        }
+        .slider-main-button:hover {
+            background-color: #1a0e4a;
+        }
+
+        /* Estilos de las tarjetas (similares al índice) */
+        .artist-card {
+            width: 280px;
+            background-color: #fff;
+            border-radius: 15px;
+            overflow: hidden;
+            box-shadow: 0 4px 8px rgba(0,0,0,0.1);
+            transition: transform 0.3s ease, box-shadow 0.3s ease;
+            display: flex;
+            flex-direction: column;
+            height: 350px;
+        }
+        .artist-card:hover {
+            transform: translateY(-5px);
+            box-shadow: 0 8px 16px rgba(0,0,0,0.2);
+        }
+        .artist-card-image {
+            width: 100%;
+            height: 200px;
+            object-fit: cover;
+            object-position: center top;
+        }
+        .artist-card-content {
+            padding: 20px;
+            flex-grow: 1;
+            display: flex;
+            flex-direction: column;
+            justify-content: center;
+            text-align: center;
+        }
+        .artist-card-title {
+            font-size: 1.5em;
+            font-weight: bold;
+            color: #26145F;
+            margin: 0 0 15px 0;
+        }
+        .artist-card-button {
+            display: inline-block;
+            background-color: #E53935;
+            color: #fff !important;
+            padding: 10px 20px;
+            border-radius: 5px;
+            text-align: center;
+            text-decoration: none;
+            font-weight: bold;
+            transition: background-color 0.3s ease;
+        }
+        .artist-card-button:hover {
+            background-color: #C62828;
+        }
+
+        /* Estilos para la navegación de Swiper */
+        .swiper-button-next, .swiper-button-prev {
+            color: #26145F;
+        }
+        .swiper-pagination-bullet-active {
+            background: #26145F;
+        }
+    </style>
+
+<div class='artist-slider-container'>
+    <!-- Slider main container -->
+    <div class="swiper artist-slider">
+        <div class="swiper-wrapper">
+            """
+
+SLIDER_TAIL = """
+        </div>
+        <!-- Add Pagination -->
+        <div class="swiper-pagination"></div>
+        <!-- Add Navigation -->
+        <div class="swiper-button-next"></div>
+        <div class="swiper-button-prev"></div>
+    </div>
+    <div style="text-align: center; margin-top: 20px;">
+        <a href="/artistas/" class="slider-main-button">Ver todos los artistas</a>
+    </div>
+    </div>
+
+    <script src="https://unpkg.com/swiper/swiper-bundle.min.js"></script>
+    <script>
+        document.addEventListener('DOMContentLoaded', function () {
+            var swiper = new Swiper('.artist-slider', {
+                slidesPerView: 1,
+                spaceBetween: 30,
+                loop: true,
+                pagination: {
+                    el: '.swiper-pagination',
+                    clickable: true,
+                },
+                navigation: {
+                    nextEl: '.swiper-button-next',
+                    prevEl: '.swiper-button-prev',
+                },
+                breakpoints: {
+                    640: {
+                        slidesPerView: 2,
+                        spaceBetween: 20,
+                    },
+                    768: {
+                        slidesPerView: 3,
+                        spaceBetween: 40,
+                    },
+                    1024: {
+                        slidesPerView: 3,
+                        spaceBetween: 50,
+                    },
+                }
+            });
+        });
+    </script>
+    """
+
+def iter_slider(cards):
+    """Fragmentos del slider (HTML, CSS y JS); `cards` es un iterable de dicts con los campos de render_slider_card."""
+    yield SLIDER_HEAD
+    yield from map(render_slider_card, cards)
+    yield SLIDER_TAIL
+
+def render_slider(cards):
+    return "".join([SLIDER_HEAD, *map(render_slider_card, cards), SLIDER_TAIL])
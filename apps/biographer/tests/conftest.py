@@ -0,0 +1,10 @@
+"""
+Los módulos del biógrafo se importan por su nombre (scripts planos en
+apps/biographer), así que la carpeta se añade al path de los tests.
+
+Uso: pip install -r apps/biographer/requirements-dev.txt && python -m pytest apps/biographer/tests
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
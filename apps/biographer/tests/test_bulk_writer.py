@@ -0,0 +1,60 @@
+import mongomock
+import pymongo
+from pymongo import InsertOne, UpdateOne
+from bulk_writer import BulkWriter
+
+def make_collection():
+    return mongomock.MongoClient()["test"]["artists"]
+
+def test_flushes_when_batch_is_full():
+    collection = make_collection()
+    writer = BulkWriter(collection, batch_size=2, flush_interval=3600)
+    writer.add(InsertOne({"_id": 1}))
+    assert collection.count_documents({}) == 0
+    writer.add(InsertOne({"_id": 2}))
+    assert collection.count_documents({}) == 2
+    assert writer.stats["batches"] == 1
+
+def test_flushes_when_interval_has_passed():
+    collection = make_collection()
+    writer = BulkWriter(collection, batch_size=100, flush_interval=0)
+    writer.add(InsertOne({"_id": 1}))
+    assert collection.count_documents({}) == 1
+
+def test_close_sends_pending_and_returns_stats():
+    collection = make_collection()
+    collection.insert_one({"_id": 1, "name": "A"})
+    writer = BulkWriter(collection, batch_size=100, flush_interval=3600)
+    writer.add(UpdateOne({"_id": 1}, {"$set": {"name": "B"}}))
+    writer.add(UpdateOne({"_id": 2}, {"$set": {"name": "C"}}, upsert=True))
+    stats = writer.close()
+    assert stats["operations"] == 2
+    assert stats["batches"] == 1
+    assert stats["matched"] == 1
+    assert stats["modified"] == 1
+    assert stats["upserted"] == 1
+    assert stats["errors"] == 0
+    assert writer.close()["batches"] == 1
+
+def test_counts_failed_operations_of_a_bulk_write():
+    collection = make_collection()
+    collection.insert_one({"_id": 1})
+    writer = BulkWriter(collection, batch_size=100, flush_interval=3600)
+    writer.add(InsertOne({"_id": 1}))
+    writer.add(InsertOne({"_id": 2}))
+    stats = writer.close()
+    assert stats["errors"] == 1
+    assert stats["inserted"] == 1
+    assert collection.count_documents({}) == 2
+
+def test_counts_every_operation_when_the_batch_fails():
+    class FailingCollection:
+        name = "artists"
+
+        def bulk_write(self, operations, ordered):
+            raise pymongo.errors.AutoReconnect("sin conexión")
+
+    writer = BulkWriter(FailingCollection(), batch_size=100, flush_interval=3600)
+    writer.add(InsertOne({"_id": 1}))
+    writer.add(InsertOne({"_id": 2}))
+    assert writer.close()["errors"] == 2
@@ -0,0 +1,30 @@
+import json
+from gemini_client import _split_batch_response
+
+NAMES = ["Camarón", "Paco de Lucía"]
+
+def test_keeps_valid_items_for_requested_artists():
+    text = json.dumps([
+        {"artist": "Camarón", "text": " Voz eterna. "},
+        {"artist": "Paco de Lucía", "text": "Guitarra."},
+    ], ensure_ascii=False)
+    assert _split_batch_response(text, NAMES) == {"Camarón": "Voz eterna.", "Paco de Lucía": "Guitarra."}
+
+def test_strips_markdown_fences():
+    text = '```json\n[{"artist": "Camarón", "text": "Voz."}]\n```'
+    assert _split_batch_response(text, NAMES) == {"Camarón": "Voz."}
+
+def test_drops_unknown_duplicate_and_invalid_items():
+    text = json.dumps([
+        {"artist": "Otro", "text": "No pedido."},
+        {"artist": "Camarón", "text": "Primera."},
+        {"artist": "Camarón", "text": "Repetida."},
+        {"artist": "Paco de Lucía", "text": "   "},
+        {"artist": "Paco de Lucía", "text": 3},
+        "no es un objeto",
+    ], ensure_ascii=False)
+    assert _split_batch_response(text, NAMES) == {"Camarón": "Primera."}
+
+def test_invalid_json_or_shape_returns_nothing():
+    assert _split_batch_response("no es json", NAMES) == {}
+    assert _split_batch_response('{"artist": "Camarón", "text": "Voz."}', NAMES) == {}
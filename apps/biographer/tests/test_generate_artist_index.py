@@ -0,0 +1,24 @@
+from generate_artist_index import build_index_shards
+
+def cards(*names):
+    return [{"artist_name": name} for name in names]
+
+def test_groups_by_initial_ignoring_accents_and_case():
+    shards = build_index_shards(cards("Ángel", "antonio", "Beatriz", "1 de Mayo", "Zambra"), page_size=10)
+    assert [shard["letter"] for shard in shards] == ["A", "B", "Z", "#"]
+    assert [card["artist_name"] for card in shards[0]["cards"]] == ["Ángel", "antonio"]
+    assert shards[-1]["slug"] == "artistas-otros"
+    assert shards[0]["slug"] == "artistas-a"
+    assert shards[0]["title"] == "Artistas: A"
+
+def test_splits_a_letter_into_pages():
+    shards = build_index_shards(cards("Ana", "Alba", "Aurora", "Adela", "Blas"), page_size=2)
+    a_shards = [shard for shard in shards if shard["letter"] == "A"]
+    assert [shard["slug"] for shard in a_shards] == ["artistas-a", "artistas-a-2"]
+    assert [shard["title"] for shard in a_shards] == ["Artistas: A", "Artistas: A (2)"]
+    assert all(shard["total"] == 2 for shard in a_shards)
+    assert [card["artist_name"] for shard in a_shards for card in shard["cards"]] == ["Adela", "Alba", "Ana", "Aurora"]
+    assert [shard["slug"] for shard in shards if shard["letter"] == "B"] == ["artistas-b"]
+
+def test_no_cards_no_shards():
+    assert build_index_shards([], page_size=10) == []
@@ -0,0 +1,97 @@
+import struct
+import time
+import image_search
+from image_search import _image_size_from_header, _total_size
+
+def test_png():
+    data = b'\x89PNG\r\n\x1a\n' + b'\x00\x00\x00\rIHDR' + struct.pack('>II', 640, 480)
+    assert _image_size_from_header(data) == (640, 480)
+
+def test_gif():
+    assert _image_size_from_header(b'GIF89a' + struct.pack('<HH', 320, 200)) == (320, 200)
+
+def test_jpeg_skips_segments_until_the_frame_header():
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9
+    sof0 = b'\xff\xc0' + struct.pack('>H', 17) + b'\x08' + struct.pack('>HH', 600, 800) + b'\x03' + b'\x00' * 9
+    assert _image_size_from_header(b'\xff\xd8' + app0 + sof0) == (800, 600)
+
+def test_webp_variants():
+    header = b'RIFF' + b'\x00' * 4 + b'WEBP'
+    vp8 = header + b'VP8 ' + b'\x00' * 10 + struct.pack('<HH', 1024, 768)
+    assert _image_size_from_header(vp8) == (1024, 768)
+    bits = (500 - 1) | ((300 - 1) << 14)
+    vp8l = header + b'VP8L' + b'\x00' * 5 + bits.to_bytes(4, 'little')
+    assert _image_size_from_header(vp8l) == (500, 300)
+    vp8x = header + b'VP8X' + b'\x00' * 8 + (1999).to_bytes(3, 'little') + (999).to_bytes(3, 'little')
+    assert _image_size_from_header(vp8x) == (2000, 1000)
+
+def test_unknown_or_truncated_data():
+    assert _image_size_from_header(b'<html>') is None
+    assert _image_size_from_header(b'\x89PNG\r\n\x1a\n\x00') is None
+    assert _image_size_from_header(b'') is None
+
+class Response:
+    def __init__(self, status_code, headers):
+        self.status_code = status_code
+        self.headers = headers
+
+def test_total_size_from_headers():
+    assert _total_size(Response(206, {"Content-Range": "bytes 0-65535/204800"})) == 204800
+    assert _total_size(Response(200, {"Content-Length": "1024"})) == 1024
+    assert _total_size(Response(206, {"Content-Range": "bytes 0-65535/*"})) is None
+
+def test_total_size_with_malformed_headers_is_unknown():
+    assert _total_size(Response(206, {"Content-Range": "bytes */abc"})) is None
+    assert _total_size(Response(200, {"Content-Length": "mucho"})) is None
+
+def _item(link, width=800, height=900):
+    return {'link': link, 'image': {'width': width, 'height': height}}
+
+def _fake_search(monkeypatch, results, searched, delays=None):
+    def search(api_key, cx_id, query):
+        searched.append(query)
+        time.sleep((delays or {}).get(query, 0))
+        return results[query]
+    monkeypatch.setattr(image_search, '_search', search)
+
+def _fake_probe(monkeypatch, valid, probed):
+    def probe(url):
+        probed.append(url)
+        return {'ok': url in valid, 'reason': None if url in valid else 'HTTP 404'}
+    monkeypatch.setattr(image_search, 'probe_image', probe)
+
+def test_first_query_with_acceptable_image_skips_the_rest(monkeypatch):
+    searched, probed = [], []
+    _fake_search(monkeypatch, {'q0': [_item('a')], 'q1': [_item('b')]}, searched)
+    _fake_probe(monkeypatch, {'a', 'b'}, probed)
+    assert image_search.find_main_image('X', 'key', 'cx', ['q0', 'q1']) == 'a'
+    assert searched == ['q0']
+
+def test_fan_out_probes_only_the_new_results(monkeypatch):
+    searched, probed = [], []
+    results = {'q0': [_item('dead')], 'q1': [_item('dead'), _item('b')], 'q2': [_item('c')]}
+    _fake_search(monkeypatch, results, searched)
+    _fake_probe(monkeypatch, {'b', 'c'}, probed)
+    assert image_search.find_main_image('X', 'key', 'cx', ['q0', 'q1', 'q2']) == 'b'
+    assert probed.count('dead') == 1
+    assert 'b' in probed
+
+def test_fan_out_cancels_queries_after_an_acceptable_image(monkeypatch):
+    monkeypatch.setenv('IMAGE_SEARCH_PARALLELISM', '1')
+    searched, probed = [], []
+    results = {'q0': [], 'q1': [_item('b')], 'q2': [_item('c')], 'q3': [_item('d')]}
+    # q2 sigue en curso cuando llega q1, así que q3 todavía está en cola
+    _fake_search(monkeypatch, results, searched, delays={'q2': 0.2})
+    _fake_probe(monkeypatch, {'b', 'c', 'd'}, probed)
+    assert image_search.find_main_image('X', 'key', 'cx', ['q0', 'q1', 'q2', 'q3']) == 'b'
+    assert 'q3' not in searched
+    assert probed == ['b']
+
+def test_small_images_are_a_last_resort(monkeypatch):
+    searched, probed = [], []
+    results = {'q0': [_item('small', 100, 100)], 'q1': [_item('big')]}
+    _fake_search(monkeypatch, results, searched)
+    _fake_probe(monkeypatch, {'small', 'big'}, probed)
+    assert image_search.find_main_image('X', 'key', 'cx', ['q0', 'q1']) == 'big'
+    monkeypatch.setitem(results, 'q1', [])
+    assert image_search.find_main_image('X', 'key', 'cx', ['q0', 'q1']) == 'small'
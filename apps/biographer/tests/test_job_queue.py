@@ -0,0 +1,107 @@
+import datetime
+import mongomock
+import pytest
+from job_queue import JobQueue
+
+@pytest.fixture
+def collection():
+    collection = mongomock.MongoClient()["test"]["artists"]
+    collection.insert_many([
+        {"_id": 1, "name": "A", "eventCount": 5},
+        {"_id": 2, "name": "B", "eventCount": 50},
+        {"_id": 3, "name": "C", "eventCount": 10, "hasProfilePage": True},
+    ])
+    return collection
+
+def make_queue(collection, monkeypatch, owner="runner-1", **env):
+    monkeypatch.setenv("JOB_RUNNER_ID", owner)
+    for key, value in env.items():
+        monkeypatch.setenv(key, value)
+    return JobQueue(collection, "profile", {"hasProfilePage": {"$ne": True}}, sort=[("eventCount", -1)])
+
+def test_claim_follows_query_and_sort(collection, monkeypatch):
+    queue = make_queue(collection, monkeypatch)
+    claimed = queue.claim_many(5, {"name": 1})
+    assert [doc["_id"] for doc in claimed] == [2, 1]
+    job = collection.find_one({"_id": 2})["jobs"]["profile"]
+    assert job["status"] == "leased"
+    assert job["owner"] == "runner-1"
+    assert job["attempts"] == 1
+    assert queue.claim() is None
+
+def test_leased_jobs_are_not_claimed_by_another_runner(collection, monkeypatch):
+    first = make_queue(collection, monkeypatch, owner="runner-1")
+    assert first.claim()["_id"] == 2
+    second = make_queue(collection, monkeypatch, owner="runner-2")
+    assert second.claim()["_id"] == 1
+    assert second.claim() is None
+
+def test_expired_lease_can_be_reclaimed(collection, monkeypatch):
+    crashed = make_queue(collection, monkeypatch, owner="runner-1", JOB_LEASE_SECONDS="-1")
+    assert crashed.claim()["_id"] == 2
+    other = make_queue(collection, monkeypatch, owner="runner-2")
+    document = other.claim()
+    assert document["_id"] == 2
+    assert document["jobs"]["profile"]["owner"] == "runner-2"
+    assert document["jobs"]["profile"]["attempts"] == 2
+
+def test_claim_filter_states(collection, monkeypatch):
+    queue = make_queue(collection, monkeypatch)
+    now = datetime.datetime.utcnow()
+    past = now - datetime.timedelta(minutes=1)
+    future = now + datetime.timedelta(minutes=1)
+    jobs = {
+        1: {"status": "done"},
+        2: {"status": "failed", "retry_at": future, "attempts": 1},
+    }
+    for job_id, job in jobs.items():
+        collection.update_one({"_id": job_id}, {"$set": {"jobs.profile": job}})
+    collection.insert_many([
+        {"_id": 4, "jobs": {"profile": {"status": "pending", "attempts": 0}}},
+        {"_id": 5, "jobs": {"profile": {"status": "failed", "retry_at": past, "attempts": 1}}},
+        {"_id": 6, "jobs": {"profile": {"status": "leased", "expires_at": future, "attempts": 1}}},
+        {"_id": 7, "jobs": {"profile": {"status": "leased", "expires_at": past, "attempts": 1}}},
+    ])
+    claimable = {doc["_id"] for doc in collection.find(queue.claim_filter(now))}
+    assert claimable == {4, 5, 7}
+
+def test_fail_retries_until_max_attempts(collection, monkeypatch):
+    queue = make_queue(collection, monkeypatch, JOB_RETRY_DELAY_SECONDS="0", JOB_MAX_ATTEMPTS="2")
+    collection.delete_many({"_id": {"$ne": 2}})
+    assert queue.claim()["_id"] == 2
+    queue.fail(2, "error")
+    job = collection.find_one({"_id": 2})["jobs"]["profile"]
+    assert job["status"] == "failed"
+    assert job["error"] == "error"
+    assert queue.claim()["_id"] == 2
+    queue.fail(2, "error")
+    # Dos intentos agotados: ya no se reclama
+    assert queue.claim() is None
+    assert queue.stats["failed"] == 2
+
+def test_complete_marks_done(collection, monkeypatch):
+    queue = make_queue(collection, monkeypatch)
+    queue.claim()
+    queue.complete(2)
+    assert collection.find_one({"_id": 2})["jobs"]["profile"]["status"] == "done"
+    assert queue.claim()["_id"] == 1
+    assert queue.stats["done"] == 1
+
+def test_complete_ignores_jobs_leased_by_others(collection, monkeypatch):
+    owner = make_queue(collection, monkeypatch, owner="runner-1")
+    owner.claim()
+    other = make_queue(collection, monkeypatch, owner="runner-2")
+    other.complete(2)
+    assert collection.find_one({"_id": 2})["jobs"]["profile"]["status"] == "leased"
+
+def test_exit_releases_unfinished_jobs_without_counting_the_attempt(collection, monkeypatch):
+    queue = make_queue(collection, monkeypatch)
+    with queue:
+        queue.claim_many(2)
+        queue.complete(2)
+    assert collection.find_one({"_id": 2})["jobs"]["profile"]["status"] == "done"
+    released = collection.find_one({"_id": 1})["jobs"]["profile"]
+    assert released["status"] == "pending"
+    assert released["attempts"] == 0
+    assert queue.stats["released"] == 1
+    assert make_queue(collection, monkeypatch, owner="runner-2").claim()["_id"] == 1
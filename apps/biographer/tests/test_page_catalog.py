@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+import mongomock
+import pytest
+import wordpress_api
+from page_catalog import PageCatalog, SYNC_STATE_ID
+
+def page(page_id, modified, title="Artista"):
+    return {"id": page_id, "slug": f"pagina-{page_id}", "title": {"rendered": title}, "link": f"https://wp.test/pagina-{page_id}/",
+            "modified": modified, "content": {"rendered": f"<p>{page_id}</p>"}}
+
+class FakeResponse:
+    def __init__(self, status_code, pages=(), etag=None):
+        self.status_code = status_code
+        self.pages = list(pages)
+        self.headers = {"X-WP-TotalPages": "1"}
+        if etag:
+            self.headers["ETag"] = etag
+
+    def json(self):
+        return self.pages
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+@pytest.fixture
+def wordpress(monkeypatch):
+    """Cola de respuestas del listado de páginas; guarda los parámetros y cabeceras de cada petición."""
+    calls = []
+    responses = []
+
+    def list_pages(config, params, headers=None):
+        calls.append((dict(params), headers or {}))
+        return responses.pop(0)
+
+    monkeypatch.setattr(wordpress_api, "list_pages", list_pages)
+    monkeypatch.setattr(wordpress_api, "fetch_remaining_pages", lambda config, params, total_pages: [])
+    return calls, responses
+
+@pytest.fixture
+def catalog():
+    return PageCatalog(mongomock.MongoClient()["test"], {"WP_URL": "https://wp.test"})
+
+def test_first_sync_is_full_and_stores_the_watermark(catalog, wordpress):
+    calls, responses = wordpress
+    responses.append(FakeResponse(200, [page(1, "2026-01-01T10:00:00"), page(2, "2026-01-02T10:00:00", "Niña &amp; Pastori")], etag='"a"'))
+    assert catalog.sync() == 2
+    assert "modified_after" not in calls[0][0]
+    assert catalog.find_by_slug("pagina-1")["_id"] == 1
+    assert catalog.find_by_title("niña & pastori")["_id"] == 2
+    state = catalog.state.find_one({"_id": SYNC_STATE_ID})
+    assert state["modified"] == "2026-01-02T10:00:00"
+    assert state["last_full_sync"] is not None
+
+def test_incremental_sync_sends_watermark_and_etag(catalog, wordpress):
+    calls, responses = wordpress
+    responses.append(FakeResponse(200, [page(1, "2026-01-02T10:00:00")]))
+    catalog.sync()
+    responses.append(FakeResponse(200, [page(3, "2026-01-03T10:00:00")], etag='"b"'))
+    assert catalog.sync() == 1
+    params, headers = calls[1]
+    assert params["modified_after"] == "2026-01-02T09:59:59"
+    # El primer listado incremental no tiene un ETag del mismo listado
+    assert "If-None-Match" not in headers
+    assert catalog.state.find_one({"_id": SYNC_STATE_ID})["modified"] == "2026-01-03T10:00:00"
+
+    responses.append(FakeResponse(200, [], etag='"c"'))
+    catalog.sync()
+    responses.append(FakeResponse(304))
+    assert catalog.sync() == 0
+    assert calls[3][1]["If-None-Match"] == '"c"'
+    # Un 304 no borra nada ni cambia la marca
+    assert catalog.pages.count_documents({}) == 2
+    assert catalog.state.find_one({"_id": SYNC_STATE_ID})["modified"] == "2026-01-03T10:00:00"
+
+def test_full_sync_removes_deleted_pages(catalog, wordpress):
+    calls, responses = wordpress
+    responses.append(FakeResponse(200, [page(1, "2026-01-01T10:00:00"), page(2, "2026-01-02T10:00:00")]))
+    catalog.sync()
+    # Una sincronización incremental no ve las páginas borradas
+    responses.append(FakeResponse(200, []))
+    catalog.sync()
+    assert catalog.pages.count_documents({}) == 2
+
+    catalog.state.update_one({"_id": SYNC_STATE_ID}, {"$set": {"last_full_sync": datetime.utcnow() - timedelta(days=8)}})
+    responses.append(FakeResponse(200, [page(2, "2026-01-02T10:00:00")]))
+    catalog.sync()
+    assert "modified_after" not in calls[2][0]
+    assert [entry["_id"] for entry in catalog.pages.find()] == [2]
+
+def test_failed_sync_keeps_the_local_copy(catalog, wordpress):
+    calls, responses = wordpress
+    responses.append(FakeResponse(200, [page(1, "2026-01-01T10:00:00")]))
+    catalog.sync()
+    responses.append(FakeResponse(500))
+    assert catalog.sync(full=True) == 0
+    assert catalog.pages.count_documents({}) == 1
@@ -0,0 +1,89 @@
+import mongomock
+import pytest
+import payload_sliders
+from payload_sliders import SliderPublisher, describe_changes
+from publish_state import PublishState
+
+API_URL = "https://payload.test/api"
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.data = data
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+class FakePayload:
+    """Sliders de Payload en memoria; registra cada petición como (método, ruta)."""
+
+    def __init__(self, sliders=None):
+        self.sliders = dict(sliders or {})
+        self.requests = []
+
+    def get(self, url, params=None, headers=None):
+        self.requests.append(("GET", url[len(API_URL):]))
+        title = params["where[title][equals]"]
+        docs = [{"id": slider_id} for slider_id, slider in self.sliders.items() if slider["title"] == title]
+        return FakeResponse(200, {"docs": docs[:1]})
+
+    def patch(self, url, params=None, json=None, headers=None):
+        self.requests.append(("PATCH", url[len(API_URL):]))
+        slider_id = url.rsplit("/", 1)[1]
+        if slider_id not in self.sliders:
+            return FakeResponse(404)
+        self.sliders[slider_id]["sliderItems"] = json["sliderItems"]
+        return FakeResponse(200)
+
+    def post(self, url, params=None, json=None, headers=None):
+        self.requests.append(("POST", url[len(API_URL):]))
+        slider_id = f"s{len(self.sliders) + 1}"
+        self.sliders[slider_id] = dict(json)
+        return FakeResponse(201, {"doc": {"id": slider_id}})
+
+@pytest.fixture
+def payload(monkeypatch):
+    def install(sliders=None):
+        fake = FakePayload(sliders)
+        for method in ("get", "patch", "post"):
+            monkeypatch.setattr(payload_sliders.http_client, method, getattr(fake, method))
+        return fake
+    return install
+
+@pytest.fixture
+def publisher():
+    return SliderPublisher(API_URL, {}, PublishState(mongomock.MongoClient()["test"]))
+
+def test_creates_the_slider_and_then_patches_by_cached_id(payload, publisher):
+    fake = payload()
+    assert publisher.publish("Destacados", [{"artist": 1}]) == "s1"
+    assert fake.requests == [("GET", "/sliders"), ("POST", "/sliders")]
+
+    fake.requests.clear()
+    assert publisher.publish("Destacados", [{"artist": 1}]) is None
+    assert publisher.publish("Destacados", [{"artist": 2}]) == "s1"
+    assert fake.requests == [("PATCH", "/sliders/s1")]
+    assert fake.sliders["s1"]["sliderItems"] == [{"artist": 2}]
+
+def test_finds_an_existing_slider_by_title(payload, publisher):
+    fake = payload({"s7": {"title": "Destacados", "sliderItems": []}})
+    assert publisher.publish("Destacados", [{"artist": 1}]) == "s7"
+    assert fake.requests == [("GET", "/sliders"), ("PATCH", "/sliders/s7")]
+
+def test_looks_the_slider_up_again_after_a_404(payload, publisher):
+    fake = payload()
+    publisher.publish("Destacados", [{"artist": 1}])
+    # El slider se borró en Payload y se volvió a crear con otro ID
+    fake.sliders = {"s9": {"title": "Destacados", "sliderItems": []}}
+    fake.requests.clear()
+    assert publisher.publish("Destacados", [{"artist": 2}]) == "s9"
+    assert fake.requests == [("PATCH", "/sliders/s1"), ("GET", "/sliders"), ("PATCH", "/sliders/s9")]
+    assert publisher.publish_state.get("payload_slider:Destacados")["slider_id"] == "s9"
+
+def test_describe_changes():
+    assert describe_changes(None, [1, 2]) == "2 items (sin publicación anterior registrada)"
+    assert describe_changes([1, 2], [2, 3]) == "1 items nuevos y 1 eliminados"
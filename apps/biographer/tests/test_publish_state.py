@@ -0,0 +1,36 @@
+import datetime
+import mongomock
+import pytest
+from publish_state import PublishState, content_hash
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient()["test"]
+
+def test_content_hash_ignores_key_order():
+    assert content_hash({"a": 1, "b": 2}) == content_hash({"b": 2, "a": 1})
+    assert content_hash({"a": 1}) != content_hash({"a": 2})
+
+def test_skips_unchanged_payloads(db):
+    state = PublishState(db)
+    assert not state.is_unchanged("wp_page:1", {"title": "A"})
+    state.record("wp_page:1", {"title": "A"}, link="https://wp.test/a/")
+    assert state.is_unchanged("wp_page:1", {"title": "A"})
+    assert not state.is_unchanged("wp_page:1", {"title": "B"})
+    assert state.get("wp_page:1")["link"] == "https://wp.test/a/"
+    assert (state.written, state.skipped) == (1, 1)
+
+def test_republishes_after_max_age(db, monkeypatch):
+    monkeypatch.setenv("PUBLISH_MAX_AGE_DAYS", "7")
+    state = PublishState(db)
+    state.record("wp_page:1", {"title": "A"})
+    old = datetime.datetime.utcnow() - datetime.timedelta(days=8)
+    db["published_artifacts"].update_one({"_id": "wp_page:1"}, {"$set": {"published_at": old}})
+    assert not state.is_unchanged("wp_page:1", {"title": "A"})
+
+def test_force_always_republishes(db, monkeypatch):
+    PublishState(db).record("wp_page:1", {"title": "A"})
+    monkeypatch.setenv("PUBLISH_FORCE", "1")
+    state = PublishState(db)
+    assert not state.is_unchanged("wp_page:1", {"title": "A"})
+    assert state.skipped == 0
@@ -0,0 +1,82 @@
+import mongomock
+import pytest
+import rate_limiter
+from quota_ledger import QuotaLedger
+
+@pytest.fixture
+def ledger(monkeypatch):
+    monkeypatch.setenv("QUOTA_CUSTOM_SEARCH_DAILY", "10")
+    monkeypatch.setenv("QUOTA_YOUTUBE_DAILY", "250")
+    return QuotaLedger(mongomock.MongoClient()["test"])
+
+def test_reserve_grants_up_to_the_limit(ledger):
+    assert ledger.reserve("custom_search", 4) == 4
+    assert ledger.reserve("custom_search", 4) == 4
+    # Solo quedan 2: sin mínimo se pide todo o nada
+    assert ledger.reserve("custom_search", 4) == 0
+    assert ledger.reserve("custom_search", 4, minimum=1) == 2
+    assert ledger.remaining("custom_search") == 0
+    assert ledger.reserve("custom_search", 1, minimum=1) == 0
+
+def test_release_returns_units(ledger):
+    granted = ledger.reserve("custom_search", 10)
+    assert ledger.remaining("custom_search") == 0
+    ledger.release("custom_search", granted)
+    assert ledger.remaining("custom_search") == 10
+    ledger.release("custom_search", 0)
+    assert ledger.remaining("custom_search") == 10
+
+def test_usage_and_reservations_share_the_limit(ledger):
+    ledger.record_usage("custom_search", 3)
+    assert ledger.reserve("custom_search", 10, minimum=1) == 7
+    ledger.release("custom_search", 7)
+    assert ledger.remaining("custom_search") == 7
+    assert ledger.spent["custom_search"] == 3
+
+def test_youtube_counts_search_units(ledger):
+    assert ledger.cost("youtube") == 100
+    assert ledger.reserve("youtube", ledger.cost("youtube")) == 100
+    assert ledger.reserve("youtube", ledger.cost("youtube")) == 100
+    assert ledger.reserve("youtube", ledger.cost("youtube")) == 0
+    ledger.record_usage("youtube")
+    assert ledger.spent["youtube"] == 100
+
+def test_record_usage_ignores_apis_without_limit(ledger):
+    ledger.record_usage("wordpress")
+    assert "wordpress" not in ledger.spent
+
+def test_reserve_retries_when_counters_change(ledger, monkeypatch):
+    update_one = ledger.collection.update_one
+    calls = []
+
+    def concurrent_update(filter, update, **kwargs):
+        # Otro proceso gasta 8 unidades justo antes de la primera reserva
+        if not calls:
+            update_one({"_id": filter["_id"]}, {"$inc": {"used": 8}})
+        calls.append(filter)
+        return update_one(filter, update, **kwargs)
+
+    monkeypatch.setattr(ledger.collection, "update_one", concurrent_update)
+    assert ledger.reserve("custom_search", 5, minimum=1) == 2
+    assert len(calls) == 2
+
+def test_install_counts_rate_limited_calls(ledger, monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_listeners", [])
+    ledger.install()
+    rate_limiter.acquire("custom_search")
+    assert ledger.spent["custom_search"] == 1
+    assert ledger.remaining("custom_search") == 9
+
+def test_release_goes_to_the_day_of_the_reservation(ledger, monkeypatch):
+    monkeypatch.setattr(ledger, "_doc_id", lambda api: f"{api}:2026-01-01")
+    granted = ledger.reserve("custom_search", 6)
+    # El trabajo termina después del reinicio diario de la cuota
+    monkeypatch.setattr(ledger, "_doc_id", lambda api: f"{api}:2026-01-02")
+    ledger.reserve("custom_search", 3)
+    ledger.release("custom_search", granted)
+    assert ledger.collection.find_one({"_id": "custom_search:2026-01-01"})["reserved"] == 0
+    assert ledger.collection.find_one({"_id": "custom_search:2026-01-02"})["reserved"] == 3
+
+def test_release_without_reservation_is_ignored(ledger):
+    ledger.release("custom_search", 5)
+    assert ledger.remaining("custom_search") == 10
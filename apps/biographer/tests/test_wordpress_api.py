@@ -0,0 +1,133 @@
+import pytest
+import requests
+import wordpress_api
+from wordpress_api import PageBatchWriter
+
+CONFIG = {"WP_URL": "https://wp.test", "WP_USER": "user", "WP_PASSWORD": "secret"}
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.data = data
+        self.text = str(data)
+
+    def json(self):
+        return self.data
+
+class FakeWordPress:
+    """Sustituye las peticiones de http_client y registra las que se hacen una a una."""
+
+    def __init__(self, batch):
+        self.batch = batch
+        self.batches = 0
+        self.single = []
+
+    def post(self, url, auth=None, json=None):
+        self.batches += 1
+        if isinstance(self.batch, Exception):
+            raise self.batch
+        return self.batch(json["requests"])
+
+    def request(self, method, url, auth=None, json=None):
+        route = url[len(CONFIG["WP_URL"]) + len("/wp-json"):]
+        self.single.append((method, route))
+        return FakeResponse(201 if route == "/wp/v2/pages" else 200, {"id": 1, "route": route})
+
+@pytest.fixture
+def wordpress(monkeypatch):
+    def install(batch):
+        fake = FakeWordPress(batch)
+        monkeypatch.setattr(wordpress_api.http_client, "post", fake.post)
+        monkeypatch.setattr(wordpress_api.http_client, "request", fake.request)
+        monkeypatch.setattr(wordpress_api.rate_limiter, "acquire", lambda name, tokens=1: 0.0)
+        return fake
+    return install
+
+def collect(results):
+    return lambda status, data: results.append(status)
+
+def test_sends_operations_in_one_batch(wordpress):
+    fake = wordpress(lambda operations: FakeResponse(207, {"responses": [{"status": 200, "body": {}} for _ in operations]}))
+    results = []
+    writer = PageBatchWriter(CONFIG, flush_interval=3600)
+    writer.update_page(1, {"title": "A"}, collect(results))
+    writer.update_page(2, {"title": "B"}, collect(results))
+    stats = writer.close()
+    assert results == [200, 200]
+    assert fake.batches == 1 and fake.single == []
+    assert stats["batches"] == 1 and stats["succeeded"] == 2
+
+def test_falls_back_to_single_requests_without_batch_support(wordpress):
+    fake = wordpress(lambda operations: FakeResponse(404))
+    results = []
+    writer = PageBatchWriter(CONFIG, flush_interval=3600)
+    writer.update_page(1, {}, collect(results))
+    writer.update_page(2, {}, collect(results))
+    writer.flush()
+    writer.update_page(3, {}, collect(results))
+    writer.update_page(4, {}, collect(results))
+    writer.close()
+    assert results == [200, 200, 200, 200]
+    # Tras el primer 404 no se vuelve a intentar el endpoint de lotes
+    assert fake.batches == 1
+    assert len(fake.single) == 4
+
+def test_retries_items_not_allowed_in_a_batch(wordpress):
+    not_allowed = {"status": 400, "body": {"code": "rest_batch_not_allowed"}}
+    fake = wordpress(lambda operations: FakeResponse(207, {"responses": [{"status": 200, "body": {}}, not_allowed]}))
+    results = []
+    writer = PageBatchWriter(CONFIG, flush_interval=3600)
+    writer.update_page(1, {}, collect(results))
+    writer.trash_page(2, collect(results))
+    writer.close()
+    assert results == [200, 200]
+    assert fake.single == [("DELETE", "/wp/v2/pages/2")]
+
+def test_network_failure_resends_updates_but_not_creations_without_catalog(wordpress):
+    fake = wordpress(requests.exceptions.ConnectionError("reset"))
+    results = []
+    writer = PageBatchWriter(CONFIG, flush_interval=3600)
+    writer.update_page(1, {}, collect(results))
+    writer.create_page({"title": "Nueva", "slug": "nueva"}, collect(results))
+    writer.close()
+    assert results == [200, None]
+    assert fake.single == [("POST", "/wp/v2/pages/1")]
+
+class FakeCatalog:
+    def __init__(self, pages):
+        self.pages = pages
+        self.synced = 0
+
+    def sync(self, full=False):
+        self.synced += 1
+
+    def find_by_slug(self, slug):
+        return self.pages.get(slug)
+
+    def find_by_title(self, title):
+        return None
+
+def test_network_failure_only_recreates_pages_missing_from_the_catalog(wordpress, monkeypatch):
+    fake = wordpress(requests.exceptions.ReadTimeout("timeout"))
+    monkeypatch.setattr(wordpress_api, "get_page", lambda config, page_id: {"id": page_id})
+    catalog = FakeCatalog({"creada": {"_id": 7}})
+    results = []
+    writer = PageBatchWriter(CONFIG, flush_interval=3600, catalog=catalog)
+    writer.create_page({"title": "Creada", "slug": "creada"}, lambda status, data: results.append((status, data)))
+    writer.create_page({"title": "Perdida", "slug": "perdida"}, lambda status, data: results.append((status, data["id"])))
+    writer.close()
+    assert catalog.synced == 1
+    assert results == [(201, {"id": 7}), (201, 1)]
+    assert fake.single == [("POST", "/wp/v2/pages")]
+
+def test_http_error_on_the_batch_is_recovered_like_a_network_failure(wordpress):
+    fake = wordpress(lambda operations: FakeResponse(500, "error interno"))
+    results = []
+    writer = PageBatchWriter(CONFIG, flush_interval=3600)
+    writer.update_page(1, {}, collect(results))
+    writer.update_page(2, {}, collect(results))
+    stats = writer.close()
+    assert results == [200, 200]
+    assert len(fake.single) == 2
+    assert stats["failed"] == 0
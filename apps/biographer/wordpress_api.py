@@ -0,0 +1,260 @@
+"""
+Acceso compartido a la API REST de WordPress para los scripts del biógrafo.
+
+Todas las peticiones usan la sesión compartida de `http_client` y respetan el
+limitador de tasa de WordPress. `config` es el diccionario de `get_config()`
+de cada script (WP_URL, WP_USER, WP_PASSWORD).
+"""
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+import http_client
+import rate_limiter
+
+MAX_PER_PAGE = 100
+
+def pages_url(config):
+    return f"{config['WP_URL']}/wp-json/wp/v2/pages"
+
+def auth(config):
+    return (config['WP_USER'], config['WP_PASSWORD'])
+
+def list_pages(config, params, headers=None):
+    """Hace un GET a /pages respetando el limitador y devuelve la respuesta sin procesar."""
+    rate_limiter.acquire("wordpress")
+    return http_client.get(pages_url(config), auth=auth(config), params=params, headers=headers)
+
+def _get_pages(config, params):
+    """Hace un GET a /pages y devuelve (páginas, número total de páginas de resultados)."""
+    response = list_pages(config, params)
+    response.raise_for_status()
+    return response.json(), int(response.headers.get('X-WP-TotalPages', 1))
+
+def fetch_remaining_pages(config, params, total_pages, max_workers=4):
+    """Obtiene en paralelo las páginas de resultados 2..total_pages de un listado."""
+    if total_pages < 2:
+        return []
+    pages = []
+    with ThreadPoolExecutor(max_workers=min(max_workers, total_pages - 1)) as executor:
+        for more, _ in executor.map(lambda n: _get_pages(config, params + [('page', n)]), range(2, total_pages + 1)):
+            pages.extend(more)
+    return pages
+
+def get_page(config, page_id, context='view'):
+    """Obtiene una página por su ID (con `context='edit'` incluye el contenido sin renderizar)."""
+    rate_limiter.acquire("wordpress")
+    response = http_client.get(f"{pages_url(config)}/{page_id}", auth=auth(config), params={'context': context})
+    response.raise_for_status()
+    return response.json()
+
+def _fetch_slug_chunk(config, slugs, fields):
+    """Obtiene todas las páginas de un grupo de slugs, pidiendo en paralelo las páginas de resultados."""
+    params = [('slug[]', slug) for slug in slugs]
+    params += [('per_page', MAX_PER_PAGE), ('_fields', ','.join(fields))]
+    pages, total_pages = _get_pages(config, params + [('page', 1)])
+    return pages + fetch_remaining_pages(config, params, total_pages)
+
+def fetch_pages_by_slugs(config, slugs, fields=("id", "slug", "content"), chunk_size=MAX_PER_PAGE, max_workers=4):
+    """
+    Obtiene las páginas de WordPress de muchos slugs con pocas peticiones:
+    hasta `chunk_size` slugs por llamada (`slug[]=`), solo los campos `fields`
+    (`_fields=`) y los grupos en paralelo. Devuelve un diccionario {slug: página};
+    los grupos que fallan se informan y se omiten.
+    """
+    slugs = list(dict.fromkeys(slug for slug in slugs if slug))
+    chunks = [slugs[i:i + chunk_size] for i in range(0, len(slugs), chunk_size)]
+    if not chunks:
+        return {}
+    print(f"Obteniendo {len(slugs)} páginas de WordPress en {len(chunks)} peticiones por lotes...")
+
+    def fetch(chunk):
+        try:
+            return _fetch_slug_chunk(config, chunk, fields)
+        except Exception as e:
+            print(f"  - Error al obtener un lote de {len(chunk)} slugs de WordPress: {e}")
+            return []
+
+    pages_by_slug = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+        for pages in executor.map(fetch, chunks):
+            for page in pages:
+                pages_by_slug[page.get('slug')] = page
+    print(f"Se obtuvieron {len(pages_by_slug)} páginas.")
+    return pages_by_slug
+
+# --- ESCRITURA POR LOTES ---
+
+BATCH_ENDPOINT = "/wp-json/batch/v1"
+MAX_BATCH_SIZE = 25
+
+class PageBatchWriter:
+    """
+    Agrupa creaciones y actualizaciones de páginas en peticiones a `/batch/v1`
+    (hasta 25 por llamada, el máximo por defecto de WordPress). Cada operación
+    lleva un callback `callback(status, datos)` que recibe el código HTTP y el
+    JSON de su respuesta, para asociar el resultado a su artista. Si el servidor
+    no admite lotes, las operaciones se envían una a una.
+
+    Si un lote falla por la red o con un error HTTP (salvo los que indican que no
+    hay soporte de lotes), WordPress pudo procesarlo en parte: las
+    actualizaciones se reenvían una a una y las creaciones solo si, tras
+    sincronizar `catalog` (PageCatalog), la página no aparece por slug o título.
+    Sin catálogo las creaciones de ese lote se dan por fallidas.
+    """
+
+    def __init__(self, config, batch_size=None, flush_interval=30.0, catalog=None):
+        self.config = config
+        self.catalog = catalog
+        self.batch_size = min(batch_size or int(os.getenv("WP_BATCH_SIZE", str(MAX_BATCH_SIZE))), MAX_BATCH_SIZE)
+        self.flush_interval = flush_interval
+        self._operations = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._batch_supported = None
+        self.stats = {"operations": 0, "batches": 0, "single": 0, "succeeded": 0, "failed": 0}
+
+    def add(self, method, route, body, callback=None):
+        """Encola una operación; `route` es relativa a /wp-json (p. ej. '/wp/v2/pages/123')."""
+        with self._lock:
+            self._operations.append((method, route, body, callback))
+            due = (len(self._operations) >= self.batch_size
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+            operations = self._take_locked() if due else []
+        self._send(operations)
+
+    def create_page(self, data, callback=None):
+        self.add("POST", "/wp/v2/pages", data, callback)
+
+    def update_page(self, page_id, data, callback=None):
+        self.add("POST", f"/wp/v2/pages/{page_id}", data, callback)
+
+    def trash_page(self, page_id, callback=None):
+        """Manda la página a la papelera de WordPress (se puede restaurar desde el escritorio)."""
+        self.add("DELETE", f"/wp/v2/pages/{page_id}", {}, callback)
+
+    def flush(self):
+        with self._lock:
+            operations = self._take_locked()
+        self._send(operations)
+
+    def _take_locked(self):
+        self._last_flush = time.monotonic()
+        operations, self._operations = self._operations, []
+        return operations
+
+    def _send(self, operations):
+        # Los callbacks se ejecutan fuera del lock: pueden encolar más operaciones
+        for start in range(0, len(operations), self.batch_size):
+            chunk = operations[start:start + self.batch_size]
+            results = self._send_batch(chunk) if len(chunk) > 1 and self._batch_supported is not False else None
+            if results is None:
+                results = [self._send_single(operation) for operation in chunk]
+            for (method, route, body, callback), (status, data) in zip(chunk, results):
+                # Varios hilos envían sus propias operaciones a la vez
+                with self._lock:
+                    self.stats["operations"] += 1
+                    self.stats["succeeded" if status in (200, 201) else "failed"] += 1
+                if status not in (200, 201):
+                    print(f"Error en WordPress ({method} {route}): {status} {data}")
+                if callback:
+                    try:
+                        callback(status, data)
+                    except Exception as e:
+                        print(f"Error al procesar la respuesta de WordPress ({method} {route}): {e}")
+
+    def _send_batch(self, chunk):
+        """Envía un lote; devuelve [(status, datos)] o None si el servidor no admite lotes."""
+        payload = {
+            "validation": "normal",
+            "requests": [{"method": method, "path": route, "body": body} for method, route, body, _ in chunk],
+        }
+        try:
+            rate_limiter.acquire("wordpress")
+            response = http_client.post(f"{self.config['WP_URL']}{BATCH_ENDPOINT}", auth=auth(self.config), json=payload)
+        except requests.exceptions.RequestException as e:
+            print(f"Error de red en el lote de WordPress: {e}. Comprobando qué operaciones se aplicaron...")
+            return self._recover_chunk(chunk, e)
+        if response.status_code in (404, 405, 501):
+            print("El servidor de WordPress no admite peticiones por lotes. Se enviarán una a una.")
+            self._batch_supported = False
+            return None
+        if not response.ok:
+            print(f"Error HTTP {response.status_code} en el lote de WordPress. Comprobando qué operaciones se aplicaron...")
+            return self._recover_chunk(chunk, f"HTTP {response.status_code}: {response.text[:200]}")
+        self._batch_supported = True
+        with self._lock:
+            self.stats["batches"] += 1
+        responses = response.json().get("responses", [])
+        results = []
+        for operation, item in zip(chunk, responses + [None] * (len(chunk) - len(responses))):
+            if item is None:
+                results.append((None, "sin respuesta en el lote"))
+            elif isinstance(item.get("body"), dict) and item["body"].get("code") == "rest_batch_not_allowed":
+                results.append(self._send_single(operation))
+            else:
+                results.append((item.get("status"), item.get("body")))
+        return results
+
+    def _recover_chunk(self, chunk, error):
+        """Resultados de un lote fallido, sin volver a crear páginas que ya existan."""
+        catalog_synced = False
+        if self.catalog:
+            try:
+                self.catalog.sync()
+                catalog_synced = True
+            except Exception as e:
+                print(f"Error al sincronizar el catálogo de páginas: {e}")
+
+        results = []
+        for operation in chunk:
+            method, route, body, _ = operation
+            if route != "/wp/v2/pages":
+                # Repetir una actualización no duplica nada
+                results.append(self._send_single(operation))
+                continue
+            if not catalog_synced:
+                # No se reintenta: el lote pudo procesarse y se duplicaría la página
+                results.append((None, str(error)))
+                continue
+            entry = self.catalog.find_by_slug(body.get("slug")) or self.catalog.find_by_title(body.get("title"))
+            if not entry:
+                results.append(self._send_single(operation))
+                continue
+            print(f"La página '{body.get('title')}' ya se creó en el lote fallido (ID: {entry['_id']}).")
+            try:
+                results.append((201, get_page(self.config, entry["_id"])))
+            except requests.exceptions.RequestException as e:
+                results.append((None, str(e)))
+        return results
+
+    def _send_single(self, operation):
+        method, route, body, _ = operation
+        with self._lock:
+            self.stats["single"] += 1
+        try:
+            rate_limiter.acquire("wordpress")
+            response = http_client.request(method, f"{self.config['WP_URL']}/wp-json{route}", auth=auth(self.config), json=body)
+        except requests.exceptions.RequestException as e:
+            return None, str(e)
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, response.text
+
+    def close(self):
+        """Envía lo pendiente y devuelve las estadísticas."""
+        self.flush()
+        return self.stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def print_stats(self):
+        stats = self.stats
+        print(f"--- Escrituras en WordPress: {stats['operations']} operaciones en {stats['batches']} lotes "
+              f"y {stats['single']} peticiones individuales ({stats['failed']} fallidas) ---")